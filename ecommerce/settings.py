@@ -33,6 +33,12 @@ EMAIL_HOST_PASSWORD = env("EMAIL_HOST_PASSWORD", default="")
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER 
 SITE_NAME = env("SITE_NAME", default="eCommerce")
 
+# Outbound mail is queued (shop.outbox) and sent by `manage.py send_queued_email`
+OUTBOX_MAX_ATTEMPTS = env.int("OUTBOX_MAX_ATTEMPTS", default=5)
+OUTBOX_BACKOFF_SECONDS = env.int("OUTBOX_BACKOFF_SECONDS", default=30)
+# A claimed message is retried by another worker if not sent within this
+OUTBOX_LEASE_SECONDS = env.int("OUTBOX_LEASE_SECONDS", default=300)
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -71,6 +77,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so connections opened by the other middleware are counted too
+    'shop.dbconn.ConnectStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -107,15 +115,30 @@ WSGI_APPLICATION = 'ecommerce.wsgi.application'
 #Maria DB / MySQL
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.mysql",
+        # Django's MySQL backend plus connect timing and optional pooling (shop.dbconn)
+        "ENGINE": "shop.backends.mysql",
         "NAME": env("DATABASE_NAME", default="myproject_db"),
         "USER": env("DATABASE_USER", default="myproject_user"),
         "PASSWORD": env("DATABASE_PASSWORD", default="StrongAppPW123!"),
         "HOST": env("DATABASE_HOST", default="127.0.0.1"),
         "PORT": env("DATABASE_PORT", default="3306"),
+        # Seconds a connection is kept for later requests (0 = close after each)
+        "CONN_MAX_AGE": env.int("DATABASE_CONN_MAX_AGE", default=60),
+        # Check a reused connection is alive before the request's first query
+        "CONN_HEALTH_CHECKS": env.bool("DATABASE_CONN_HEALTH_CHECKS", default=True),
         "OPTIONS": {"charset": "utf8mb4"},
     }
 }
+# Pooled mode: persistent connections are per thread, so threaded workers
+# hold workers x threads connections. The pool caps them per process and
+# takes one back at the end of every request.
+if env.bool("DATABASE_POOL", default=False):
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "max_size": env.int("DATABASE_POOL_MAX_SIZE", default=10),
+        "timeout": env.float("DATABASE_POOL_TIMEOUT", default=10.0),
+        "max_lifetime": env.float("DATABASE_POOL_MAX_LIFETIME", default=300.0),
+    }
 #SQL Lite
 """
 DATABASES = {
@@ -126,13 +149,36 @@ DATABASES = {
 }
 """
 
+# Cache
+# Any django-environ cache URL works (e.g. redis://redis:6379/1);
+# LocMem keeps local runs dependency-free.
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+SHOP_PAGE_CACHE_ALIAS = "default"
+SHOP_PAGE_CACHE_TIMEOUT = env.int("SHOP_PAGE_CACHE_TIMEOUT", default=300)
+# Cross-request cache of "is this user a vendor" (0 = per-request only)
+SHOP_ROLE_CACHE_TIMEOUT = env.int("SHOP_ROLE_CACHE_TIMEOUT", default=300)
+# How long ?pagination=cursor&with_count=1 reuses a list count
+SHOP_API_COUNT_TIMEOUT = env.int("SHOP_API_COUNT_TIMEOUT", default=60)
+
 TWITTER_ENABLED = env.bool("TWITTER_ENABLED", default=False)
 TWITTER_AUTH_MODE = env("TWITTER_AUTH_MODE", default="oauth2")
 TWITTER_CLIENT_ID = env("TW_CLIENT_ID", default=None)
 TWITTER_CLIENT_SECRET = env("TW_CLIENT_SECRET", default=None)
 TWITTER_REDIRECT_URI = env("TW_REDIRECT_URI", default="http://127.0.0.1:8000/twitter/callback")
 TWITTER_SCOPES = ["tweet.read", "tweet.write", "users.read", "offline.access","media.write"]
-TWITTER_TOKEN_PATH = str(BASE_DIR / ".twitter_tokens.json")
+TWITTER_TOKEN_PATH = env("TWITTER_TOKEN_PATH", default=str(BASE_DIR / ".twitter_tokens.json"))
+# Announcements are queued (shop.functions.announce) and posted by
+# `manage.py post_announcements`
+TWITTER_JOB_MAX_ATTEMPTS = env.int("TWITTER_JOB_MAX_ATTEMPTS", default=5)
+TWITTER_JOB_BACKOFF_SECONDS = env.int("TWITTER_JOB_BACKOFF_SECONDS", default=60)
+# One keep-alive pool per process is shared by every TwitterAPI
+TWITTER_API_BASE = env("TWITTER_API_BASE", default="https://api.x.com")
+TWITTER_HTTP_POOL_CONNECTIONS = env.int("TWITTER_HTTP_POOL_CONNECTIONS", default=2)
+TWITTER_HTTP_POOL_MAXSIZE = env.int("TWITTER_HTTP_POOL_MAXSIZE", default=10)
+TWITTER_HTTP_RETRIES = env.int("TWITTER_HTTP_RETRIES", default=3)
+TWITTER_HTTP_BACKOFF = env.float("TWITTER_HTTP_BACKOFF", default=0.5)
 
 """
 TWITTER = {
@@ -181,10 +227,25 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# WhiteNoise serves collected static files from the app server: hashed
+# names cached for a year, with .gz/.br variants compressed at
+# collectstatic time. On by default when DEBUG is off.
+SERVE_STATIC = env.bool("SERVE_STATIC", default=not DEBUG)
+if SERVE_STATIC:
+    MIDDLEWARE.insert(MIDDLEWARE.index("django.middleware.security.SecurityMiddleware") + 1,
+                      "whitenoise.middleware.WhiteNoiseMiddleware")
+    STORAGES = {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+    }
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-BASKET_SESSION_ID = "basket"
\ No newline at end of file
+BASKET_SESSION_ID = "basket"
+# "shop.basket.SessionBasketStore" (default) or "shop.basket.CacheBasketStore",
+# which keeps baskets in the BASKET_CACHE_ALIAS cache instead of the session row
+BASKET_STORE = env("BASKET_STORE", default="shop.basket.SessionBasketStore")
+BASKET_CACHE_ALIAS = "default"
\ No newline at end of file
@@ -62,10 +62,15 @@ urlpatterns = [
     path('get/stores/', views.view_stores, name='view_stores'),
     path('post/stores/', views.add_store, name='add_store'),
     path('stores/<int:store_id>/products/add/', views.add_product, name="add_product"),
+    path('stores/<int:store_id>/products/import/', views.import_products, name="import_products"),
     path('stores/<int:store_id>/products/', views.list_products, name="list_products"),
+    path('stores/export/', views.export_catalog, name="export_catalog"),
+    path('products/bulk-update/', views.bulk_update_products, name="bulk_update_products"),
     path('vendors/stores/', views.vendor_stores, name="vendor_stores"),    
     path('stores/products/', views.stores_products_api, name="stores_products_api"),
     path('my/reviews/', views.my_product_reviews, name="my_product_reviews"),
+    path('cache/stats/', views.page_cache_stats, name="page_cache_stats"),
+    path('db/stats/', views.db_connect_stats, name="db_connect_stats"),
 
     # Twitter
     path("twitter/start/", twitter_views.start_auth, name="twitter_start_auth"),
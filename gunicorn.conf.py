@@ -0,0 +1,42 @@
+"""
+Gunicorn settings for production, every value overridable from the
+environment (see env.template):
+
+    gunicorn -c gunicorn.conf.py
+
+SERVER_INTERFACE=asgi runs ecommerce.asgi under uvicorn workers instead
+of ecommerce.wsgi under threaded sync workers.
+"""
+import multiprocessing
+import os
+
+
+def _int(name: str, default: int) -> int:
+    return int(os.environ.get(name) or default)
+
+
+interface = os.environ.get("SERVER_INTERFACE", "wsgi")
+
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+workers = _int("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1)
+threads = _int("GUNICORN_THREADS", 4)
+if interface == "asgi":
+    wsgi_app = "ecommerce.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "ecommerce.wsgi:application"
+    worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread" if threads > 1 else "sync")
+
+# Seconds an idle client connection is held open for its next request
+keepalive = _int("GUNICORN_KEEPALIVE", 5)
+timeout = _int("GUNICORN_TIMEOUT", 30)
+graceful_timeout = _int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+# Recycle workers now and then so slow leaks can't accumulate
+max_requests = _int("GUNICORN_MAX_REQUESTS", 2000)
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+# Heartbeat files on tmpfs: a container's overlay filesystem can stall them
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Store, Product
+from django.utils import timezone
+from .models import AnnouncementJob, Store, Product, OutboundEmail
 
 @admin.register(Store)
 class StoreAdmin(admin.ModelAdmin):
@@ -12,3 +13,23 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ("store",)
     search_fields = ("name", "store__name")
 
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "status", "attempts", "next_attempt_at", "created_at")
+    list_filter = ("status",)
+    search_fields = ("subject",)
+
+
+@admin.register(AnnouncementJob)
+class AnnouncementJobAdmin(admin.ModelAdmin):
+    list_display = ("text", "status", "attempts", "next_attempt_at", "created_at", "posted_at")
+    list_filter = ("status",)
+    search_fields = ("text", "last_error")
+    actions = ["requeue"]
+
+    @admin.action(description="Requeue selected jobs")
+    def requeue(self, request, queryset):
+        n = queryset.exclude(status=AnnouncementJob.POSTED).update(
+            status=AnnouncementJob.PENDING, attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f"Requeued {n} job(s).")
@@ -0,0 +1,10 @@
+from django.db.backends.mysql import base
+
+from shop.dbconn import InstrumentedConnectionMixin, PooledConnectionMixin
+
+
+class DatabaseWrapper(PooledConnectionMixin, InstrumentedConnectionMixin, base.DatabaseWrapper):
+    """
+    Django's MySQL backend with connect timing (shop.dbconn) and, when
+    OPTIONS["pool"] is set, a per-process connection pool.
+    """
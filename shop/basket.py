@@ -1,28 +1,114 @@
 from decimal import Decimal
 from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
 from .models import Product
 
 
 BASKET_SESSION_ID = getattr(settings, "BASKET_SESSION_ID", "basket")
+BASKET_CACHE_ALIAS = getattr(settings, "BASKET_CACHE_ALIAS", "default")
+BASKET_CACHE_TIMEOUT = getattr(settings, "BASKET_CACHE_TIMEOUT", 60 * 60 * 24 * 14)
+
+
+# ---------- storage backends ----------
+
+class SessionBasketStore:
+    """
+    Keeps the basket dict in request.session (the original behaviour).
+    The session is only marked modified when the basket actually changes.
+    """
+    def __init__(self, session):
+        self.session = session
+
+    @classmethod
+    def from_request(cls, request):
+        return cls(request.session)
+
+    def load(self) -> dict:
+        return self.session.get(BASKET_SESSION_ID) or {}
+
+    def save(self, data: dict) -> None:
+        self.session[BASKET_SESSION_ID] = data
+        self.session.modified = True
+
+    def clear(self) -> None:
+        if BASKET_SESSION_ID in self.session:
+            self.session.pop(BASKET_SESSION_ID)
+            self.session.modified = True
+
+
+class CacheBasketStore:
+    """
+    Keeps the basket in a Django cache (Redis/Memcached in production,
+    LocMem locally) under a per-user key, so basket writes never touch
+    the session row and the basket follows the user across sessions.
+    """
+    def __init__(self, key: str, alias: str = BASKET_CACHE_ALIAS):
+        self.key = f"basket:{key}"
+        self.cache = caches[alias]
+
+    @classmethod
+    def from_request(cls, request):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return cls(f"user:{user.pk}")
+        if request.session.session_key is None:
+            request.session.save()
+        return cls(f"session:{request.session.session_key}")
+
+    def load(self) -> dict:
+        return self.cache.get(self.key) or {}
+
+    def save(self, data: dict) -> None:
+        self.cache.set(self.key, data, BASKET_CACHE_TIMEOUT)
+
+    def clear(self) -> None:
+        self.cache.delete(self.key)
+
+
+def get_basket_store(request):
+    path = getattr(settings, "BASKET_STORE", "shop.basket.SessionBasketStore")
+    return import_string(path).from_request(request)
+
+
+# ---------- basket ----------
+
+class BasketProduct:
+    """
+    Product snapshot taken when a line was added; enough to render the
+    basket and invoice without querying Product.
+    """
+    def __init__(self, id, name, image=""):
+        self.id = self.pk = int(id)
+        self.name = name
+        self.image = image
+
+    def __repr__(self):
+        return f"BasketProduct({self.id}, {self.name!r})"
+
 
 class Basket:
     """
-    Handles shopping basket logic stored in the session. Supports adding,
-    removing, and iterating over items, as well as calculating totals.
+    Handles shopping basket logic on top of a pluggable store (session by
+    default, see settings.BASKET_STORE). Supports adding, removing, and
+    iterating over items, as well as calculating totals. Lines, total and
+    item count are computed in one pass and memoized until the next change.
     """
-    def __init__(self, request):
-        self.session = request.session
-        basket = self.session.get(BASKET_SESSION_ID)
-        if basket is None:
-            basket = {}
-            self.session[BASKET_SESSION_ID] = basket
-        self.basket = basket
+    def __init__(self, request=None, store=None):
+        self.store = store or get_basket_store(request)
+        self.basket = self.store.load()
+        self._summary = None
 
     def add(self, product, quantity=1, update_quantity=False):
         product_id = str(product.id)
 
         if product_id not in self.basket:
-            self.basket[product_id] = {'quantity': 0, 'price': str(product.price)}
+            self.basket[product_id] = {
+                'quantity': 0,
+                'price': str(product.price),
+                'name': product.name,
+                'image': product.image.name if product.image else "",
+            }
 
         if update_quantity:
             self.basket[product_id]['quantity'] = quantity
@@ -32,34 +118,81 @@ class Basket:
         self._commit()
 
     def _commit(self):
-        self.session[BASKET_SESSION_ID] = self.basket
-        self.session.modified = True
+        self._summary = None
+        self.store.save(self.basket)
 
     def save(self):
         self._commit()
 
     def remove(self, product):
-        product_id = str(product.id)
+        """
+        Drop a line, given the product or just its id (the product may
+        have been deleted since it was added).
+        """
+        product_id = str(getattr(product, "id", product))
         if product_id in self.basket:
             del self.basket[product_id]
             self._commit()
 
-    def __iter__(self):
-        product_ids = self.basket.keys()
-        products = Product.objects.filter(id__in=product_ids)
+    def _summarize(self, fetch_products=False) -> dict:
+        """
+        Build every line plus the total and count in a single pass, with
+        at most one query: the products themselves when fetched, else
+        just which ids still exist. Lines whose product has been deleted
+        are pruned from the stored basket either way.
+        """
+        fetch = fetch_products or any('name' not in item for item in self.basket.values())
+        if not self.basket:
+            products = {}
+        elif fetch:
+            products = {str(p.id): p for p in Product.objects.filter(id__in=self.basket.keys())}
+        else:
+            live = Product.objects.filter(id__in=self.basket.keys()).values_list("id", flat=True)
+            products = {str(pid): BasketProduct(pid, self.basket[str(pid)]['name'],
+                                                self.basket[str(pid)].get('image', ""))
+                        for pid in live}
+        stale = [pid for pid in self.basket if pid not in products]
+        if stale:
+            for pid in stale:
+                del self.basket[pid]
+            self.store.save(self.basket)
 
-        for product in products:
-            item = self.basket[str(product.id)].copy() 
-            item['product'] = product
-            item['total_price'] = Decimal(item['price']) * item['quantity']
-            yield item
+        lines = []
+        total = Decimal("0")
+        count = 0
+        for pid, item in self.basket.items():
+            line = item.copy()
+            line['product'] = products[pid]
+            line['total_price'] = Decimal(item['price']) * item['quantity']
+            lines.append(line)
+            total += line['total_price']
+            count += item['quantity']
+        return {"fetched": fetch, "lines": lines, "total": total, "count": count}
+
+    def _get_summary(self, fetch_products=False) -> dict:
+        if self._summary is None or (fetch_products and not self._summary["fetched"]):
+            self._summary = self._summarize(fetch_products)
+        return self._summary
+
+    def lines(self, fetch_products=False) -> list:
+        """
+        Basket lines as dicts with 'product', 'quantity', 'price' and
+        'total_price'. Uses the stored snapshots unless `fetch_products`
+        is set (or a line predates snapshots), in which case real
+        Product instances are loaded.
+        """
+        return self._get_summary(fetch_products)["lines"]
+
+    def __iter__(self):
+        return iter(self.lines())
 
     def __len__(self):
-        return sum(item['quantity'] for item in self.basket.values())
+        return self._get_summary()["count"]
 
     def get_total_price(self):
-        return sum(Decimal(item['price']) * item['quantity'] for item in self.basket.values())
+        return self._get_summary()["total"]
 
     def clear(self):
-        self.session.pop(BASKET_SESSION_ID, None) 
-        self.session.modified = True
\ No newline at end of file
+        self.basket = {}
+        self._summary = None
+        self.store.clear()
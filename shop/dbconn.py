@@ -0,0 +1,223 @@
+import os
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+from django.db import OperationalError
+
+
+# ---------- connect instrumentation ----------
+
+class _RequestCounters(threading.local):
+    connects = 0
+    connect_seconds = 0.0
+    checkouts = 0
+
+
+_request = _RequestCounters()
+_totals_lock = threading.Lock()
+_totals = {"requests": 0, "requests_with_connect": 0, "connects": 0,
+           "connect_seconds": 0.0, "pool_checkouts": 0}
+
+
+def _record_connect(seconds: float) -> None:
+    _request.connects += 1
+    _request.connect_seconds += seconds
+    with _totals_lock:
+        _totals["connects"] += 1
+        _totals["connect_seconds"] += seconds
+
+
+def _record_checkout() -> None:
+    _request.checkouts += 1
+    with _totals_lock:
+        _totals["pool_checkouts"] += 1
+
+
+def connect_stats() -> dict:
+    """
+    Totals for this process: requests seen by ConnectStatsMiddleware, new
+    database connections opened (and seconds spent opening them, in
+    requests or not), and connections taken from the pool.
+    """
+    with _totals_lock:
+        stats = dict(_totals)
+    stats["connect_seconds"] = round(stats["connect_seconds"], 4)
+    stats["connects_per_request"] = (round(stats["connects"] / stats["requests"], 3)
+                                     if stats["requests"] else 0.0)
+    stats["pools"] = {alias: pool.stats() for (alias, pid), pool in _pools.items()
+                      if pid == os.getpid()}
+    return stats
+
+
+def reset_connect_stats() -> None:
+    with _totals_lock:
+        for key in _totals:
+            _totals[key] = 0.0 if key == "connect_seconds" else 0
+
+
+class ConnectStatsMiddleware:
+    """
+    Counts the connections each request opens and the time spent opening
+    them, reported in a Server-Timing header (visible in browser dev
+    tools) and in connect_stats(). Goes first in MIDDLEWARE so the
+    session and auth middleware's queries are included.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _request.connects = _request.checkouts = 0
+        _request.connect_seconds = 0.0
+        response = self.get_response(request)
+        connects, seconds = _request.connects, _request.connect_seconds
+        with _totals_lock:
+            _totals["requests"] += 1
+            if connects:
+                _totals["requests_with_connect"] += 1
+        response["Server-Timing"] = (
+            f'db-connect;dur={seconds * 1000:.1f};desc="{connects} new, '
+            f'{_request.checkouts} pooled"')
+        return response
+
+
+class InstrumentedConnectionMixin:
+    """
+    DatabaseWrapper mixin timing every new connection.
+    """
+    def get_new_connection(self, conn_params):
+        start = time.perf_counter()
+        conn = super().get_new_connection(conn_params)
+        _record_connect(time.perf_counter() - start)
+        return conn
+
+
+# ---------- pooled mode ----------
+
+class ConnectionPool:
+    """
+    Thread-safe pool of raw DB-API connections for one database alias in
+    one process. At most `max_size` are checked out at once (further
+    callers wait up to `timeout` seconds); idle ones are reused newest
+    first and closed after `max_lifetime` seconds, and one idle longer
+    than `check_after` seconds is pinged before it is handed out.
+    """
+    def __init__(self, max_size: int = 10, timeout: float = 10.0,
+                 max_lifetime: float = 300.0, check_after: float = 10.0):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._born: dict[int, float] = {}
+        self._lock = threading.Lock()
+        self.in_use = 0
+
+    def stats(self) -> dict:
+        return {"max_size": self.max_size, "in_use": self.in_use, "idle": self._idle.qsize()}
+
+    @staticmethod
+    def _alive(conn) -> bool:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn) -> None:
+        self._born.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self, connect: Callable[[], object]):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise OperationalError(
+                f"Connection pool exhausted: {self.max_size} connections in use "
+                f"for {self.timeout}s.")
+        try:
+            now = time.monotonic()
+            conn = None
+            while conn is None:
+                try:
+                    candidate, idle_since = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if now - self._born.get(id(candidate), now) > self.max_lifetime:
+                    self._discard(candidate)
+                elif now - idle_since > self.check_after and not self._alive(candidate):
+                    self._discard(candidate)
+                else:
+                    conn = candidate
+                    _record_checkout()
+            if conn is None:
+                conn = connect()
+                self._born[id(conn)] = time.monotonic()
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.in_use += 1
+        return conn
+
+    def release(self, conn, reusable: bool = True) -> None:
+        if reusable:
+            self._idle.put((conn, time.monotonic()))
+        else:
+            self._discard(conn)
+        with self._lock:
+            self.in_use -= 1
+        self._slots.release()
+
+
+_pools: dict[tuple[str, int], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_for(alias: str, options: dict) -> ConnectionPool:
+    # Keyed by pid too: a forked worker must not reuse its parent's sockets
+    key = (alias, os.getpid())
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(**options)
+        return _pools[key]
+
+
+class PooledConnectionMixin:
+    """
+    DatabaseWrapper mixin: with OPTIONS["pool"] set, connect() takes a
+    connection from the process's ConnectionPool and close() hands it
+    back (rolled back if a transaction was left open) instead of
+    disconnecting. Pair it with CONN_MAX_AGE = 0 so every request returns
+    its connection and idle threads hold none.
+    """
+    pool_options: Optional[dict] = None
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pool_options = params.pop("pool", None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        if self.pool_options is None:
+            return super().get_new_connection(conn_params)
+        pool = _pool_for(self.alias, self.pool_options)
+        return pool.acquire(lambda: super(PooledConnectionMixin, self).get_new_connection(conn_params))
+
+    def _close(self):
+        if self.pool_options is None or self.connection is None:
+            return super()._close()
+        conn = self.connection
+        reusable = not self.errors_occurred
+        if reusable and (self.in_atomic_block or not self.autocommit):
+            try:
+                conn.rollback()
+            except Exception:
+                reusable = False
+        _pool_for(self.alias, self.pool_options).release(conn, reusable)
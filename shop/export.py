@@ -0,0 +1,58 @@
+from typing import Iterable, Iterator, Sequence
+
+from .models import Product, Review
+from .streaming import (STREAM_CHUNK_SIZE, csv_chunks, gzip_chunks, iter_rows,
+                        ndjson_chunks)
+
+FORMATS = ("csv", "ndjson")
+
+PRODUCT_EXPORT_FIELDS = ("id", "store_id", "sku", "name", "description", "price", "stock",
+                         "image", "created_at", "rating_count", "rating_avg")
+REVIEW_EXPORT_FIELDS = ("id", "product_id", "user__username", "rating", "comment",
+                        "created_at")
+
+# CSV needs one header: a `record` column tells products and reviews apart
+# and each record type leaves the other's columns empty.
+CSV_HEADER = ("record", *PRODUCT_EXPORT_FIELDS,
+              *[f for f in REVIEW_EXPORT_FIELDS if f not in PRODUCT_EXPORT_FIELDS])
+
+
+def export_records(store_ids: Sequence[int], include_reviews: bool = False,
+                   chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Every product of the given stores (then, optionally, every review of
+    those products) as flat dicts tagged with "record", read in keyset
+    chunks so memory does not grow with the catalog.
+    """
+    products = Product.objects.filter(store_id__in=store_ids).values(*PRODUCT_EXPORT_FIELDS)
+    for row in iter_rows(products, ("id",), chunk_size):
+        yield {"record": "product", **row}
+    if include_reviews:
+        reviews = (Review.objects.filter(product__store_id__in=store_ids)
+                   .values(*REVIEW_EXPORT_FIELDS))
+        for row in iter_rows(reviews, ("id",), chunk_size):
+            yield {"record": "review", **row}
+
+
+def export_chunks(records: Iterable[dict], fmt: str, gzip: bool = False,
+                  chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator:
+    """
+    Encode export records as CSV or NDJSON text chunks, or gzip bytes.
+    """
+    if fmt == "csv":
+        chunks = csv_chunks(CSV_HEADER, records, chunk_size)
+    elif fmt == "ndjson":
+        chunks = ndjson_chunks(records, chunk_size)
+    else:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {FORMATS}.")
+    return gzip_chunks(chunks) if gzip else chunks
+
+
+def content_type(fmt: str, gzip: bool = False) -> str:
+    if gzip:
+        return "application/gzip"
+    return "text/csv" if fmt == "csv" else "application/x-ndjson"
+
+
+def filename(fmt: str, gzip: bool = False) -> str:
+    return f"catalog.{fmt}" + (".gz" if gzip else "")
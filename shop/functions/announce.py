@@ -0,0 +1,126 @@
+import logging
+from datetime import datetime, timezone as dt_timezone
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from ..jobs import RetryPolicy, claim
+from ..models import AnnouncementJob
+from .tweet import TwitterAPI, TwitterHTTPError
+
+log = logging.getLogger(__name__)
+
+# X answers these for requests that will never succeed as sent
+PERMANENT_STATUSES = {400, 403, 404, 422}
+RATE_LIMITED = 429
+
+
+def enqueue_announcement(text: str, image=None, store=None, product=None) -> AnnouncementJob:
+    """
+    Queue a post for the announcement worker instead of calling X inside
+    the request. `image` is an optional FieldFile to attach.
+    """
+    return AnnouncementJob.objects.create(
+        text=text,
+        image=image.name if image else "",
+        store=store,
+        product=product,
+    )
+
+
+def _policy(max_attempts: Optional[int]) -> RetryPolicy:
+    return RetryPolicy(
+        max_attempts if max_attempts is not None else getattr(settings, "TWITTER_JOB_MAX_ATTEMPTS", 5),
+        getattr(settings, "TWITTER_JOB_BACKOFF_SECONDS", 60),
+        getattr(settings, "TWITTER_JOB_BACKOFF_MAX_SECONDS", 3600),
+    )
+
+
+def _post(api: TwitterAPI, job: AnnouncementJob) -> str:
+    media_ids = None
+    if job.image:
+        try:
+            media_ids = [api.upload_media(default_storage.path(job.image))]
+        except TwitterHTTPError as exc:
+            if exc.status_code == RATE_LIMITED:
+                raise
+            log.warning("Announcement %s: media upload failed, posting text only: %s", job.pk, exc)
+        except Exception as exc:
+            log.warning("Announcement %s: media upload failed, posting text only: %s", job.pk, exc)
+    result = api.post_tweet(job.text, media_ids=media_ids)
+    return str((result.get("data") or {}).get("id", ""))
+
+
+def _defer_queue(until) -> None:
+    """
+    Rate limited: hold every pending job until the window resets, so no
+    worker spends requests (or attempts) hitting the limit again.
+    """
+    AnnouncementJob.objects.filter(
+        status=AnnouncementJob.PENDING, next_attempt_at__lt=until
+    ).update(next_attempt_at=until)
+
+
+def process_pending(batch_size: int = 10, max_attempts: Optional[int] = None,
+                    api_factory: Callable[[], TwitterAPI] = TwitterAPI) -> tuple[int, int]:
+    """
+    Post up to `batch_size` due announcements with one TwitterAPI client.
+    Each job's outcome is saved as soon as it is known, so a worker killed
+    mid-batch never posts a sent announcement again once the lease expires.
+    Failures back off exponentially; permanent API errors and jobs out of
+    attempts become DEAD. A 429 defers the claimed jobs and the rest of
+    the queue to the rate-limit reset without spending an attempt.
+    Returns (posted, failed_attempts).
+    """
+    policy = _policy(max_attempts)
+    now = timezone.now()
+    jobs = claim(AnnouncementJob, batch_size, now,
+                 getattr(settings, "TWITTER_JOB_LEASE_SECONDS", 600))
+    if not jobs:
+        return 0, 0
+    fields = ["status", "attempts", "next_attempt_at", "last_error", "tweet_id", "posted_at"]
+
+    try:
+        api = api_factory()
+        if not getattr(api, "token", None):
+            raise RuntimeError("Twitter is not connected; authorize via /twitter/start/.")
+    except Exception as exc:
+        log.warning("Announcement worker cannot reach X: %s", exc)
+        for job in jobs:
+            policy.record_failure(job, exc, now, AnnouncementJob.DEAD)
+        AnnouncementJob.objects.bulk_update(jobs, fields)
+        return 0, len(jobs)
+
+    posted = failed = 0
+    for i, job in enumerate(jobs):
+        try:
+            job.tweet_id = _post(api, job)
+        except TwitterHTTPError as exc:
+            if exc.status_code == RATE_LIMITED:
+                until = (datetime.fromtimestamp(exc.retry_at, tz=dt_timezone.utc)
+                         if exc.retry_at else now + policy.backoff(1))
+                log.warning("X rate limit hit; deferring announcements until %s", until)
+                for waiting in jobs[i:]:
+                    waiting.next_attempt_at = until
+                    waiting.last_error = f"Rate limited until {until.isoformat()}"
+                AnnouncementJob.objects.bulk_update(jobs[i:], fields)
+                _defer_queue(until)
+                return posted, failed
+            log.warning("Announcement %s failed: %s", job.pk, exc)
+            policy.record_failure(job, exc, now, AnnouncementJob.DEAD,
+                                  permanent=exc.status_code in PERMANENT_STATUSES)
+            failed += 1
+        except Exception as exc:
+            log.warning("Announcement %s failed: %s", job.pk, exc)
+            policy.record_failure(job, exc, now, AnnouncementJob.DEAD)
+            failed += 1
+        else:
+            job.attempts += 1
+            job.status = AnnouncementJob.POSTED
+            job.posted_at = timezone.now()
+            job.last_error = ""
+            posted += 1
+        job.save(update_fields=fields)
+    return posted, failed
@@ -0,0 +1,120 @@
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads in this process are serialized
+    fcntl = None
+
+
+class FileTokenStore:
+    """
+    The X OAuth token as a JSON file shared by every process (web
+    workers, announcement worker). Writes go to a temp file renamed over
+    the old one, so readers never see half a token; reads are cached in
+    process and only re-parsed when the file's stat changes. Refreshes
+    run under an exclusive flock on a sibling `.lock` file.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self._mutex = threading.RLock()
+        self._cached: Optional[dict] = None
+        self._signature = None
+
+    @staticmethod
+    def _stat_signature(st: os.stat_result) -> tuple:
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def load(self) -> Optional[dict]:
+        """
+        The saved token, or None. Costs one stat() while unchanged.
+        """
+        with self._mutex:
+            try:
+                signature = self._stat_signature(os.stat(self.path))
+            except FileNotFoundError:
+                self._cached = self._signature = None
+                return None
+            if signature != self._signature:
+                try:
+                    with open(self.path, "r") as f:
+                        self._cached = json.load(f)
+                except (OSError, ValueError):
+                    return None
+                self._signature = signature
+            return self._cached
+
+    def _write(self, token: dict) -> None:
+        parent = os.path.dirname(self.path) or "."
+        os.makedirs(parent, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=parent, prefix=".tokens-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(token, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._cached = token
+        self._signature = self._stat_signature(os.stat(self.path))
+
+    @contextmanager
+    def locked(self):
+        """
+        Exclusive across threads of this process and, with fcntl, across
+        processes sharing the file.
+        """
+        with self._mutex:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def save(self, token: dict) -> None:
+        with self.locked():
+            self._write(token)
+
+    def refresh(self, stale: dict, exchange: Callable[[dict], dict]) -> dict:
+        """
+        Replace `stale` with exchange(stale) unless another thread or
+        process already did while we waited for the lock, in which case
+        its token is returned and `exchange` is not called.
+        """
+        with self.locked():
+            current = self.load()
+            if current and current.get("access_token") != stale.get("access_token"):
+                return current
+            token = exchange(stale)
+            self._write(token)
+            return token
+
+
+_stores: dict[str, FileTokenStore] = {}
+_stores_lock = threading.Lock()
+
+
+def token_store(path: str) -> FileTokenStore:
+    """
+    One store per path per process, so its cache and lock are shared.
+    """
+    path = os.path.abspath(path)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = FileTokenStore(path)
+        return _stores[path]
@@ -1,12 +1,15 @@
 
+import io
 import json
+import logging
+import math
 import os
+import threading
 import time
 import uuid
 import base64
 import hashlib
 import secrets
-import mimetypes
 from typing import Optional, Tuple, List, Dict
 
 import requests
@@ -14,70 +17,92 @@ from oauthlib.oauth2 import OAuth2Error
 from requests_oauthlib import OAuth2Session
 from urllib.parse import urlparse, parse_qs
 from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
 from PIL import Image, UnidentifiedImageError
-from tempfile import NamedTemporaryFile
+
+from .token_store import token_store
+
+log = logging.getLogger(__name__)
 
 # Pull config from settings.py 
 TOKEN_STORE_PATH = settings.TWITTER_TOKEN_PATH 
+API_BASE = getattr(settings, "TWITTER_API_BASE", "https://api.x.com").rstrip("/")
+# Keep-alive pool shared by every TwitterAPI in the process
+POOL_CONNECTIONS = getattr(settings, "TWITTER_HTTP_POOL_CONNECTIONS", 2)
+POOL_MAXSIZE = getattr(settings, "TWITTER_HTTP_POOL_MAXSIZE", 10)
+HTTP_RETRIES = getattr(settings, "TWITTER_HTTP_RETRIES", 3)
+HTTP_BACKOFF = getattr(settings, "TWITTER_HTTP_BACKOFF", 0.5)
+# Refresh the access token this long before X expires it
+TOKEN_REFRESH_MARGIN = 60
 
 #Tweet Length
 MAX_TWEET_CHARS = 250
 
+# X's limits for tweet images; larger sources are scaled and re-encoded
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+MAX_IMAGE_SIDE = getattr(settings, "TWITTER_MAX_IMAGE_SIDE", 4096)
+MEDIA_CHUNK_BYTES = getattr(settings, "TWITTER_MEDIA_CHUNK_BYTES", 1024 * 1024)
+# Uploaded media ids are reused until X expires them (24h unless FINALIZE says)
+MEDIA_CACHE_KEY = "shop:xmedia:{digest}"
+MEDIA_LIFETIME_SECONDS = 24 * 3600
+MEDIA_EXPIRY_MARGIN = 300
+
 
 # API endpoints
 AUTH_URL = "https://x.com/i/oauth2/authorize" 
-TOKEN_URL = "https://api.x.com/2/oauth2/token"
-TWEET_URL = "https://api.x.com/2/tweets"
-MEDIA_UPLOAD_URL = "https://api.x.com/2/media/upload"
-MEDIA_STATUS_URL = "https://api.x.com/2/media/upload?command=STATUS&media_id={id}"
-MEDIA_INIT_URL = "https://api.x.com/2/media/upload/initialize"
-MEDIA_APPEND_URL_TMPL = "https://api.x.com/2/media/upload/{media_id}/append"
-MEDIA_FINALIZE_URL_TMPL = "https://api.x.com/2/media/upload/{media_id}/finalize"
+TOKEN_URL = f"{API_BASE}/2/oauth2/token"
+# Paths below are resolved against the client's base URL
+TOKEN_PATH = "/2/oauth2/token"
+TWEET_PATH = "/2/tweets"
+MEDIA_UPLOAD_PATH = "/2/media/upload"
+MEDIA_INIT_PATH = "/2/media/upload/initialize"
+MEDIA_APPEND_PATH_TMPL = "/2/media/upload/{media_id}/append"
+MEDIA_FINALIZE_PATH_TMPL = "/2/media/upload/{media_id}/finalize"
 
 
-# --- add state storage  ---
-_STATE_PATH = os.getenv("TW_STATE_PATH", ".twitter_oauth_state.txt")
+def _load_tokens(path: Optional[str] = None) -> Optional[dict]:
+    """Return saved token dict or None."""
+    return token_store(path or TOKEN_STORE_PATH).load()
 
 
-def _load_tokens() -> Optional[dict]:
-    """Return saved token dict or None."""
-    try:
-        with open(TOKEN_STORE_PATH, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return None
-    except Exception:
-        return None  # optionally log
+def has_saved_token() -> bool:
+    """True once a vendor has completed the OAuth flow."""
+    return _load_tokens() is not None
 
 
-def _save_tokens(tokens: dict) -> None:
-    """Persist token dict to disk."""
-    parent = os.path.dirname(TOKEN_STORE_PATH)
-    if parent:
-        os.makedirs(parent, exist_ok=True)
-    with open(TOKEN_STORE_PATH, "w") as f:
-        json.dump(tokens, f)
+def _save_tokens(tokens: dict, path: Optional[str] = None) -> None:
+    """Persist token dict to disk (atomically, under the store's lock)."""
+    token_store(path or TOKEN_STORE_PATH).save(tokens)
 
 
-def _save_state(value: str) -> None:
-    with open(_STATE_PATH, "w") as f:
-        f.write(value)
+class TwitterHTTPError(RuntimeError):
+    """
+    A non-2xx answer from the X API, carrying the status code and, when
+    rate limited, the epoch second at which the limit resets.
+    """
+    def __init__(self, message: str, resp):
+        super().__init__(message)
+        self.status_code = resp.status_code
+        self.retry_at = _retry_at(resp)
 
 
-def _load_state() -> Optional[str]:
-    try:
-        with open(_STATE_PATH, "r") as f:
-            return f.read().strip()
-    except FileNotFoundError:
-        return None
+class TwitterMediaError(RuntimeError):
+    """
+    An upload X accepted but could not process (or did not finish in time).
+    """
 
 
-def _clear_state():
-    try:
-        os.remove(_STATE_PATH)
-    except Exception:
-        pass
+def _retry_at(resp) -> Optional[float]:
+    reset = resp.headers.get("x-rate-limit-reset")
+    if reset and reset.isdigit():
+        return float(reset)
+    retry_after = resp.headers.get("retry-after")
+    if retry_after and retry_after.isdigit():
+        return time.time() + int(retry_after)
+    return None
 
 
 def safe_text(text: str) -> str:
@@ -86,6 +111,182 @@ def safe_text(text: str) -> str:
     return text
 
 
+# ---------- shared HTTP client ----------
+def _retry_policy(total: int) -> Retry:
+    """
+    Retry connection failures on any method (nothing reached X), but
+    read errors and 5xx answers only on idempotent methods: replaying a
+    POST could publish a tweet twice. 429s are left to the job queue.
+    """
+    return Retry(
+        total=total,
+        connect=total,
+        read=total,
+        status=total,
+        backoff_factor=HTTP_BACKOFF,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def _expiring(token: dict) -> bool:
+    expires_at = token.get("expires_at")
+    return bool(expires_at) and float(expires_at) - TOKEN_REFRESH_MARGIN <= time.time()
+
+
+class TwitterClient:
+    """
+    Process-wide X API transport: one requests session whose keep-alive
+    pool and retry adapter every TwitterAPI shares. The OAuth2 token lives
+    in a FileTokenStore shared with the other processes; only one of them
+    refreshes it and the rest reuse the result (X refresh tokens are
+    single-use).
+    """
+    def __init__(self, base_url: str = API_BASE, token_path: Optional[str] = None,
+                 pool_connections: int = POOL_CONNECTIONS, pool_maxsize: int = POOL_MAXSIZE,
+                 retries: int = HTTP_RETRIES):
+        self.base_url = base_url.rstrip("/")
+        self.store = token_store(token_path or TOKEN_STORE_PATH)
+        self.client_id = settings.TWITTER_CLIENT_ID
+        self.client_secret = settings.TWITTER_CLIENT_SECRET
+        self.pid = os.getpid()
+
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                              max_retries=_retry_policy(retries))
+        self.http.mount("https://", adapter)
+        self.http.mount("http://", adapter)
+
+    @property
+    def token(self) -> Optional[dict]:
+        # Cached in process; re-read only when another process rewrote it
+        return self.store.load()
+
+    def set_token(self, token: dict) -> None:
+        self.store.save(token)
+
+    def _exchange(self, stale: dict) -> dict:
+        if not stale.get("refresh_token"):
+            raise RuntimeError("Token expired and has no refresh_token; reconnect via /twitter/start/.")
+        data = {"grant_type": "refresh_token", "refresh_token": stale["refresh_token"]}
+        auth = None
+        if self.client_secret:
+            auth = HTTPBasicAuth(self.client_id, self.client_secret)
+        else:
+            data["client_id"] = self.client_id
+        resp = self.http.post(self.base_url + TOKEN_PATH, data=data, auth=auth, timeout=20)
+        if resp.status_code // 100 != 2:
+            raise TwitterHTTPError(f"Token refresh failed: {resp.status_code} {resp.text}", resp)
+        token = resp.json()
+        token.setdefault("refresh_token", stale["refresh_token"])
+        token["expires_at"] = time.time() + float(token.get("expires_in", 7200))
+        return token
+
+    def refresh(self, stale: dict) -> dict:
+        """
+        Exchange `stale`'s refresh token for a new token, unless another
+        thread or process replaced it while we waited for the lock.
+        """
+        return self.store.refresh(stale, self._exchange)
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Send an authenticated request to `path` (or an absolute URL),
+        refreshing the token when it is about to expire or X answers 401.
+        """
+        token = self.token
+        if not token:
+            raise RuntimeError("Not authenticated. Call begin_oauth() then finish_oauth().")
+        if _expiring(token):
+            token = self.refresh(token)
+        url = path if "://" in path else self.base_url + path
+        headers = kwargs.pop("headers", None) or {}
+        kwargs.setdefault("timeout", 15)
+
+        def send(token):
+            auth = {"Authorization": f"Bearer {token['access_token']}"}
+            return self.http.request(method, url, headers={**headers, **auth}, **kwargs)
+
+        resp = send(token)
+        if resp.status_code == 401 and token.get("refresh_token"):
+            resp.close()
+            resp = send(self.refresh(token))
+        return resp
+
+
+_shared_client: Optional[TwitterClient] = None
+_shared_client_lock = threading.Lock()
+
+
+def shared_client() -> TwitterClient:
+    """
+    The process's TwitterClient, built on first use. A forked child
+    (e.g. a preloading app server) builds its own rather than sharing
+    the parent's sockets.
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None or _shared_client.pid != os.getpid():
+            _shared_client = TwitterClient()
+        return _shared_client
+
+
+def reset_shared_client() -> None:
+    """
+    Drop the process's client; the next TwitterAPI builds a fresh one.
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is not None:
+            _shared_client.http.close()
+        _shared_client = None
+
+
+# ---------- image preparation ----------
+def _fits(im: Image.Image, max_side: int) -> bool:
+    return max(im.size) <= max_side
+
+
+def prepare_image(data: bytes, max_side: int = MAX_IMAGE_SIDE,
+                  max_bytes: int = MAX_IMAGE_BYTES) -> bytes:
+    """
+    JPEG bytes for upload, built in memory. An RGB/greyscale JPEG
+    already within `max_side` and `max_bytes` is returned untouched;
+    anything else is decoded at reduced scale (draft() for JPEG, then
+    reduce()), flattened onto white if it has alpha, and re-encoded.
+    """
+    try:
+        im = Image.open(io.BytesIO(data))
+        if (im.format == "JPEG" and im.mode in ("RGB", "L") and _fits(im, max_side)
+                and len(data) <= max_bytes):
+            return data
+        if im.format == "JPEG":
+            # Let libjpeg skip DCT detail we would throw away anyway
+            im.draft("RGB", (max_side, max_side))
+        im.load()
+    except (UnidentifiedImageError, OSError) as e:
+        raise RuntimeError(f"Could not read image: {e}")
+
+    if not _fits(im, max_side):
+        im = im.reduce(math.ceil(max(im.size) / max_side))
+    if im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info):
+        rgba = im.convert("RGBA")
+        bg = Image.new("RGB", im.size, (255, 255, 255))
+        bg.paste(rgba, mask=rgba.getchannel("A"))
+        im = bg
+    elif im.mode not in ("RGB", "L"):
+        im = im.convert("RGB")
+
+    for quality in (90, 80, 70):
+        buf = io.BytesIO()
+        im.save(buf, "JPEG", quality=quality, optimize=True)
+        if buf.tell() <= max_bytes:
+            return buf.getvalue()
+    raise RuntimeError(f"Image is still over {max_bytes} bytes after re-encoding.")
+
+
 # --- PKCE helpers ---
 def _make_code_verifier_challenge() -> Tuple[str, str]:
     verifier = base64.urlsafe_b64encode(secrets.token_bytes(64)).decode().rstrip("=")
@@ -94,20 +295,24 @@ def _make_code_verifier_challenge() -> Tuple[str, str]:
 
 
 class TwitterAPI:
-    def __init__(self):
+    def __init__(self, client: Optional[TwitterClient] = None):
         self.client_id = settings.TWITTER_CLIENT_ID
         self.client_secret = settings.TWITTER_CLIENT_SECRET
         self.redirect_uri = settings.TWITTER_REDIRECT_URI  # <- use settings
         self.scopes = settings.TWITTER_SCOPES
-        self.token = _load_tokens()
+        # OAuth2Session for the authorization flow only; API calls go
+        # through the shared client
         self.session: Optional[OAuth2Session] = None
         self.code_verifier: Optional[str] = None
 
         if not self.client_id:
             raise RuntimeError("TW_CLIENT_ID is not set")
 
-        if self.token:
-            self._build_session_with_token(self.token)
+        self.client = client or shared_client()
+
+    @property
+    def token(self) -> Optional[dict]:
+        return self.client.token
 
 # ---------- OAuth 2.0 PKCE ----------
     def begin_oauth(self) -> str:
@@ -166,9 +371,7 @@ class TwitterAPI:
         except requests.RequestException as e:
             raise RuntimeError(f"Network error during token exchange: {e}") from e
 
-        _save_tokens(token)
-        self.token = token
-        self._build_session_with_token(token)  # ensures auto-refresh is configured
+        self.client.set_token(token)
         self.code_verifier = None
         return token
 
@@ -180,155 +383,100 @@ class TwitterAPI:
         if not expected_state or returned != expected_state:
             raise RuntimeError("OAuth state mismatch (possible CSRF)")
 
-    def _build_session_with_token(self, token: dict):
-        """
-        Create an OAuth2Session that can auto-refresh 
-        using HTTP Basic when confidential.
-        """
-        auto_refresh_kwargs = {"client_id": self.client_id}
-        if getattr(self, "client_secret", None):
-            auto_refresh_kwargs["client_secret"] = self.client_secret
-            auto_refresh_kwargs["auth"] = HTTPBasicAuth(self.client_id, self.client_secret)
+    # Small helpers that send through the shared client
+    def _post(self, path, **kwargs):
+        return self.client.request("POST", path, **kwargs)
 
-        self.session = OAuth2Session(
-            client_id=self.client_id,
-            token=token,
-            redirect_uri=self.redirect_uri,
-            scope=self.scopes,
-            auto_refresh_url=TOKEN_URL,
-            auto_refresh_kwargs=auto_refresh_kwargs,
-            token_updater=_save_tokens,
-                )
-
-    def _ensure_session(self):
-        if self.session:
-            return
-        if not self.token:
-            raise RuntimeError("Not authenticated. Call begin_oauth() then finish_oauth().")
-        self._build_session_with_token(self.token)
-
-    # Small helper to call requests with timeout
-    def _post(self, url, **kwargs):
-        self._ensure_session()
-        kwargs.setdefault("timeout", 15)
-        return self.session.post(url, **kwargs)
-
-    def _get(self, url, **kwargs):
-        self._ensure_session()
-        kwargs.setdefault("timeout", 15)
-        return self.session.get(url, **kwargs)
-
-
-    # ---------- Media handling (v1.1) ----------
-    def _reencode_to_jpeg(self, path_or_file) -> str:
-        path = path_or_file.path if hasattr(path_or_file, "path") and path_or_file.path else str(path_or_file)
-        if not os.path.exists(path):
-            raise FileNotFoundError(f"Image file not found: {path}")
-
-        tmp = NamedTemporaryFile(suffix=".jpg", delete=False)
-        tmp_path = tmp.name
-        tmp.close()
+    def _get(self, path, **kwargs):
+        return self.client.request("GET", path, **kwargs)
 
-        try:
-            with Image.open(path) as im:
-                if im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info):
-                    bg = Image.new("RGB", im.size, (255, 255, 255))
-                    bg.paste(im.convert("RGBA"), mask=im.convert("RGBA").split()[-1])
-                    to_save = bg
-                else:
-                    to_save = im.convert("RGB")
-                to_save.save(tmp_path, "JPEG", quality=90, optimize=True)
-        except UnidentifiedImageError as e:
-            try: os.remove(tmp_path)
-            except Exception: pass
-            raise RuntimeError(f"Could not read image: {e}")
-
-        if os.path.getsize(tmp_path) <= 0:
-            try: os.remove(tmp_path)
-            except Exception: pass
-            raise RuntimeError("Converted JPEG is empty.")
-        return tmp_path
 
+    # ---------- Media handling ----------
     def _check_2xx(resp, label):
         if resp.status_code // 100 != 2:
             raise RuntimeError(f"{label} failed: {resp.status_code} {resp.text}")
 
-    def upload_media(self, image, media_category: str = "tweet_image", timeout_s: int = 30) -> str:
+    def upload_media(self, image, media_category: str = "tweet_image", timeout_s: int = 30,
+                     chunk_size: int = MEDIA_CHUNK_BYTES) -> str:
         """
-        v2 subpaths flow: initialize (JSON) → append (multipart) → finalize.
+        v2 subpaths flow: initialize (JSON) → append (multipart, one
+        segment per `chunk_size` bytes) → finalize. The media id is cached
+        by the source file's hash until X expires it, so an image already
+        uploaded is neither re-encoded nor sent again.
         Requires OAuth2 user token with 'media.write'.
         """
-        import os, time, mimetypes
-
-        self._ensure_session()
-
-        # Resolve path and normalize to JPEG (handles alpha)
         path = image.path if hasattr(image, "path") and image.path else str(image)
         if not os.path.exists(path):
             raise FileNotFoundError(f"Image file not found: {path}")
-        tmp_path = self._reencode_to_jpeg(path)
-
-        try:
-            media_type = mimetypes.guess_type(tmp_path)[0] or "image/jpeg"
-            total_bytes = os.path.getsize(tmp_path)
-
-            # 1) INIT (JSON)
-            init = self.session.post(
-                MEDIA_INIT_URL,
-                json={"media_type": media_type, "total_bytes": total_bytes, "media_category": media_category},
+        with open(path, "rb") as f:
+            source = f.read()
+        cache_key = MEDIA_CACHE_KEY.format(digest=hashlib.sha256(source).hexdigest())
+        media_id = cache.get(cache_key)
+        if media_id:
+            return media_id
+
+        payload = prepare_image(source)
+        media_type = "image/jpeg"
+
+        # 1) INIT (JSON)
+        init = self._post(
+            MEDIA_INIT_PATH,
+            json={"media_type": media_type, "total_bytes": len(payload), "media_category": media_category},
+            timeout=timeout_s,
+            )
+        if init.status_code // 100 != 2:
+            raise TwitterHTTPError(f"INIT failed: {init.status_code} {init.text}", init)
+        media_id = str(init.json()["data"]["id"])
+
+        # 2) APPEND (multipart), straight from the in-memory buffer
+        view = memoryview(payload)
+        for index, offset in enumerate(range(0, len(payload), chunk_size)):
+            append = self._post(
+                MEDIA_APPEND_PATH_TMPL.format(media_id=media_id),
+                files={"media": ("media.jpg", bytes(view[offset:offset + chunk_size]), media_type)},
+                data={"segment_index": index},
                 timeout=timeout_s,
                 )
-            if init.status_code // 100 != 2:
-                raise RuntimeError(f"INIT failed: {init.status_code} {init.text}")
-            media_id = init.json()["data"]["id"]
-
-            # 2) APPEND (multipart)
-            with open(tmp_path, "rb") as f:
-                append = self.session.post(
-                    MEDIA_APPEND_URL_TMPL.format(media_id=media_id),
-                    files={"media": (os.path.basename(tmp_path), f, media_type)},
-                    data={"segment_index": 0},
-                    timeout=timeout_s,
-                    )
             if append.status_code // 100 != 2:
-                raise RuntimeError(f"APPEND failed: {append.status_code} {append.text}")
+                raise TwitterHTTPError(f"APPEND failed: {append.status_code} {append.text}", append)
 
-            # 3) FINALIZE (no body)
-            finalize = self.session.post(
-                MEDIA_FINALIZE_URL_TMPL.format(media_id=media_id),
-                timeout=timeout_s,
+        # 3) FINALIZE (no body)
+        finalize = self._post(
+            MEDIA_FINALIZE_PATH_TMPL.format(media_id=media_id),
+            timeout=timeout_s,
+            )
+        if finalize.status_code // 100 != 2:
+            raise TwitterHTTPError(f"FINALIZE failed: {finalize.status_code} {finalize.text}", finalize)
+        data = finalize.json().get("data", {})
+
+        # Poll STATUS while finalize reports processing_info (mainly video);
+        # an id that failed or is still processing must not be cached
+        proc = data.get("processing_info")
+        deadline = time.time() + timeout_s
+        while proc and proc.get("state") != "succeeded":
+            if proc.get("state") == "failed":
+                raise TwitterMediaError(f"Media {media_id} processing failed: {proc.get('error')}")
+            if time.time() >= deadline:
+                raise TwitterMediaError(f"Media {media_id} still processing after {timeout_s}s")
+            time.sleep(min(2, proc.get("check_after_secs", 2)))
+            st = self._get(
+                MEDIA_UPLOAD_PATH,
+                params={"command": "STATUS", "media_id": media_id},
+                timeout=10,
                 )
-            if finalize.status_code // 100 != 2:
-                raise RuntimeError(f"FINALIZE failed: {finalize.status_code} {finalize.text}")
-
-            # Optional: poll STATUS if finalize returns processing_info (mainly video)
-            proc = finalize.json().get("data", {}).get("processing_info")
-            if proc:
-                start = time.time()
-                while time.time() - start < timeout_s:
-                    st = self.session.get(
-                        "https://api.x.com/2/media/upload",
-                        params={"command": "STATUS", "media_id": media_id},
-                        timeout=10,
-                        )
-                    if st.status_code // 100 != 2:
-                        break
-                    proc = st.json().get("data", {}).get("processing_info")
-                    if not proc or proc.get("state") in ("succeeded", "failed"):
-                        break
-                    time.sleep(min(2, proc.get("check_after_secs", 2)))
-
-            return str(media_id)
-        finally:
-            try:
-                os.remove(tmp_path)
-            except Exception:
-                pass
+            if st.status_code // 100 != 2:
+                raise TwitterHTTPError(f"STATUS failed: {st.status_code} {st.text}", st)
+            proc = st.json().get("data", {}).get("processing_info")
+
+        # Stop reusing the id a little before X forgets it
+        lifetime = int(data.get("expires_after_secs") or MEDIA_LIFETIME_SECONDS)
+        if lifetime > MEDIA_EXPIRY_MARGIN:
+            cache.set(cache_key, media_id, lifetime - MEDIA_EXPIRY_MARGIN)
+        return media_id
 
     # ---------- Tweet creation ----------
     def post_tweet(self, text: str, media_ids: Optional[List[str]] = None,
                    reply_to_id: Optional[str] = None) -> dict:
-        self._ensure_session()
         text = safe_text(text)
         payload = {"text": text}
         if media_ids:
@@ -336,17 +484,18 @@ class TwitterAPI:
         if reply_to_id:
             payload["reply"] = {"in_reply_to_tweet_id": reply_to_id}
 
-        resp = self._post(TWEET_URL, json=payload)
+        resp = self._post(TWEET_PATH, json=payload)
         try:
             body = resp.json()
         except Exception:
             body = {"raw": resp.text}
-        print("DEBUG /2/tweets status:", resp.status_code, json.dumps(body, indent=2))
+        log.debug("/2/tweets status: %s %s", resp.status_code, json.dumps(body))
 
         if resp.status_code not in (200, 201):
             try:
                 body = resp.json()
             except Exception:
                 body = {"raw": resp.text}
-            raise RuntimeError(f"Tweet failed: HTTP {resp.status_code} {json.dumps(body, indent=2)}")
+            raise TwitterHTTPError(
+                f"Tweet failed: HTTP {resp.status_code} {json.dumps(body, indent=2)}", resp)
         return resp.json()
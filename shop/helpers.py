@@ -1,8 +1,14 @@
+from typing import Iterable
+
 from django.contrib.auth.models import User, Group
-from .models import Profile, Product
+from .models import Profile, Product, Review
 from django.contrib.auth.decorators import user_passes_test
 from django.urls import reverse_lazy
 from django.conf import settings  
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast
 
 
 def _assign_role(user, role: str) -> None:
@@ -26,26 +32,60 @@ def ensure_profile(user: User) -> Profile:
     return prof
 
 
+def _role_cache_key(user_id: int) -> str:
+    return f"shop:role:vendor:{user_id}"
+
+
 def _is_vendor(user: User) -> bool:
     """
     Return True if the user is considered a vendor 
     (role='vendor' OR in 'Vendors' group OR owns any stores).
+
+    The answer is memoized on the user object (so once per request) and,
+    when SHOP_ROLE_CACHE_TIMEOUT is set, in the cache across requests;
+    shop.signals forgets it when groups or store ownership change.
     """
     if not user.is_authenticated:
         return False
-    role_flag = getattr(user, "role", "") == "vendor"
-    group_flag = user.groups.filter(name="Vendors").exists()
-    owns_store = hasattr(user, "stores") and user.stores.exists()
-    return role_flag or group_flag or owns_store
+    if getattr(user, "role", "") == "vendor":
+        return True
+
+    memo = getattr(user, "_shop_is_vendor", None)
+    if memo is not None:
+        return memo
+
+    timeout = getattr(settings, "SHOP_ROLE_CACHE_TIMEOUT", 0)
+    result = cache.get(_role_cache_key(user.pk)) if timeout else None
+    if result is None:
+        result = (user.groups.filter(name="Vendors").exists()
+                  or (hasattr(user, "stores") and user.stores.exists()))
+        if timeout:
+            cache.set(_role_cache_key(user.pk), result, timeout)
+
+    user._shop_is_vendor = result
+    return result
+
+
+def forget_role(user_id: int, user: User | None = None) -> None:
+    """
+    Drop the cached vendor flag for a user (and its per-request memo).
+    The cache entry goes once the current transaction commits, so a
+    concurrent request cannot re-cache the role from before the change.
+    """
+    key = _role_cache_key(user_id)
+    transaction.on_commit(lambda: cache.delete(key))
+    if user is not None:
+        user.__dict__.pop("_shop_is_vendor", None)
 
 
 def _is_product_owner(user: User, product: Product) -> bool:
     """
     Return True if the user owns the store for this product.
     """
+    if not user.is_authenticated:
+        return False
     store = getattr(product, "store", None)
-    owner = getattr(store, "owner", None)
-    return user.is_authenticated and (owner == user)
+    return store is not None and store.owner_id == user.pk
 
 
 def _currency_symbol() -> str:
@@ -83,4 +123,45 @@ def has_purchased_product(user: User, product: Product) -> bool:
     prof = getattr(user, "profile", None)
     if not prof:
         return False
-    return prof.purchased_products.filter(pk=product.pk).exists()
\ No newline at end of file
+    return prof.purchased_products.filter(pk=product.pk).exists()
+
+
+def verified_reviewer_ids(product: Product, reviews: Iterable[Review]) -> set[int]:
+    """
+    Return the ids of the review authors who have purchased this product.
+    Resolves every review in a single query against the
+    Profile.purchased_products through table.
+    """
+    user_ids = {r.user_id for r in reviews}
+    if not user_ids:
+        return set()
+    through = Profile.purchased_products.through
+    return set(
+        through.objects.filter(product_id=product.pk,
+                               profile__user_id__in=user_ids)
+        .values_list("profile__user_id", flat=True)
+    )
+
+
+RATING_AVG_EXPR = Case(
+    When(rating_count=0, then=Value(0.0)),
+    default=Cast("rating_sum", FloatField()) / F("rating_count"),
+    output_field=FloatField(),
+)
+
+
+def apply_review_rating(product_id: int, rating: int, sign: int) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) one rating from a product's review
+    aggregates with set-based UPDATEs (no read-modify-write). Call inside
+    the transaction that writes the Review.
+    """
+    updated = Product.objects.filter(pk=product_id).update(
+        rating_count=F("rating_count") + sign,
+        rating_sum=F("rating_sum") + sign * rating,
+        **{f"stars_{rating}": F(f"stars_{rating}") + sign},
+    )
+    if updated:
+        # Separate statement: MySQL would evaluate the average against the
+        # already-updated columns in a single UPDATE, other backends not.
+        Product.objects.filter(pk=product_id).update(rating_avg=RATING_AVG_EXPR)
@@ -0,0 +1,177 @@
+import csv
+import json
+import time
+from typing import Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from rest_framework.exceptions import ValidationError
+
+from . import page_cache
+from .models import Product, ProductImportSerializer, Store
+from .search import fallback_index
+
+FORMATS = ("csv", "json", "ndjson")
+# Fields an import row may set; the SKU is the upsert key
+IMPORT_FIELDS = ("name", "description", "price", "stock")
+IMPORT_BATCH_SIZE = getattr(settings, "SHOP_IMPORT_BATCH_SIZE", 1000)
+# The report lists at most this many failing rows (the count is always exact)
+MAX_REPORTED_ERRORS = 1000
+
+_EXTENSIONS = {".csv": "csv", ".json": "json", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+_CONTENT_TYPES = {"text/csv": "csv", "application/json": "json",
+                  "application/x-ndjson": "ndjson", "application/jsonl": "ndjson"}
+
+
+def detect_format(filename: str = "", content_type: str = "") -> Optional[str]:
+    for ext, fmt in _EXTENSIONS.items():
+        if filename.lower().endswith(ext):
+            return fmt
+    return _CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+
+
+class RowError:
+    """
+    Stands in for a row that could not even be parsed.
+    """
+    def __init__(self, message: str):
+        self.message = message
+
+
+def read_rows(lines: Iterable[bytes], fmt: str) -> Iterator:
+    """
+    Parse an upload given as an iterable of byte lines (an UploadedFile or
+    the request stream) into row dicts. CSV and NDJSON are parsed line by
+    line; a JSON document must be an array and is loaded whole.
+    Unparseable rows come through as RowError so numbering stays aligned.
+    An empty CSV cell in an optional column counts as omitted, like a key
+    missing from a JSON row.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown import format {fmt!r}; expected one of {FORMATS}.")
+    text = (line.decode("utf-8-sig") for line in lines)
+    if fmt == "csv":
+        optional = {name for name, field in ProductImportSerializer().fields.items()
+                    if not field.required}
+        for row in csv.DictReader(text):
+            yield {k: v for k, v in row.items() if not (v == "" and k in optional)}
+        return
+    if fmt == "json":
+        data = json.loads("".join(text) or "null")
+        if not isinstance(data, list):
+            raise ValueError("A JSON import must be an array of objects.")
+        yield from data
+        return
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield RowError(f"Invalid JSON: {exc}")
+
+
+class ImportReport:
+    """
+    Outcome of import_products: counts, timing and per-row errors
+    (row numbers are 1-based data rows, header excluded).
+    """
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors: list[dict] = []
+        self.seconds = 0.0
+
+    def add_error(self, row: int, sku, errors) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "sku": sku, "errors": errors})
+
+    @property
+    def rows_per_second(self) -> float:
+        done = self.created + self.updated + self.failed
+        return done / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+def _write_batch(store: Store, batch: list[dict], report: ImportReport) -> None:
+    """
+    Upsert one validated batch on (store, sku) with INSERT ... ON CONFLICT
+    / ON DUPLICATE KEY UPDATE: one statement per set of supplied fields,
+    so a row that omits e.g. stock leaves the stored stock alone.
+    """
+    skus = [data["sku"] for data in batch]
+    groups: dict[tuple, list[Product]] = {}
+    for data in batch:
+        fields = tuple(f for f in IMPORT_FIELDS if f in data)
+        groups.setdefault(fields, []).append(Product(store=store, **data))
+    # MySQL upserts on any unique key and takes no conflict target
+    target = (["store", "sku"] if connection.features.supports_update_conflicts_with_target
+              else None)
+
+    with transaction.atomic():
+        existing = store.products.filter(sku__in=skus).count()
+        for fields, products in groups.items():
+            Product.objects.bulk_create(products, update_conflicts=True,
+                                        unique_fields=target, update_fields=fields)
+    report.created += len(batch) - existing
+    report.updated += existing
+
+    # bulk writes send no post_save, so keep the search fallback current here
+    if fallback_index.built:
+        rows = store.products.filter(sku__in=skus).values_list("id", "name", "description")
+        for pk, name, description in rows:
+            fallback_index.update(pk, name, description)
+
+
+def import_products(store: Store, rows: Iterable, batch_size: int = IMPORT_BATCH_SIZE) -> ImportReport:
+    """
+    Validate `rows` with ProductImportSerializer (ProductSerializer's
+    rules) and upsert them into `store` by SKU, `batch_size` rows per
+    transaction. Invalid rows, and repeats of a SKU earlier in the same
+    import, are reported and skipped; valid rows are written regardless.
+    """
+    report = ImportReport()
+    start = time.perf_counter()
+    validator = ProductImportSerializer()
+    seen: dict[str, int] = {}
+    batch: list[dict] = []
+
+    for row_no, row in enumerate(rows, start=1):
+        if isinstance(row, RowError):
+            report.add_error(row_no, None, {"non_field_errors": [row.message]})
+            continue
+        if not isinstance(row, dict):
+            report.add_error(row_no, None, {"non_field_errors": ["Expected an object."]})
+            continue
+        try:
+            data = validator.run_validation(row)
+        except ValidationError as exc:
+            report.add_error(row_no, row.get("sku"), exc.detail)
+            continue
+        sku = data["sku"]
+        if sku in seen:
+            report.add_error(row_no, sku, {"sku": [f"Duplicate of row {seen[sku]}."]})
+            continue
+        seen[sku] = row_no
+        batch.append(data)
+        if len(batch) >= batch_size:
+            _write_batch(store, batch, report)
+            batch = []
+    if batch:
+        _write_batch(store, batch, report)
+
+    if report.created or report.updated:
+        page_cache.invalidate(page_cache.CATALOG)
+    report.seconds = time.perf_counter() - start
+    return report
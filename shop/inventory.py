@@ -0,0 +1,92 @@
+from typing import Iterable
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models import Case, DecimalField, F, IntegerField, Value, When
+from django.db.models.functions import Cast, Greatest
+from rest_framework.exceptions import ValidationError
+
+from . import page_cache
+from .models import Product, StockPriceUpdateSerializer, Store
+
+# Upper bound on lines per request, and ids per CASE in one UPDATE
+BULK_UPDATE_MAX_ITEMS = getattr(settings, "SHOP_BULK_UPDATE_MAX_ITEMS", 10_000)
+CASE_CHUNK_SIZE = 500
+
+
+def _chunks(items: list, size: int = CASE_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _case(pairs: list[tuple], output_field) -> Case:
+    return Case(*[When(pk=pk, then=Value(v)) for pk, v in pairs],
+                output_field=output_field)
+
+
+def apply_stock_price_updates(user: User, items: Iterable) -> dict:
+    """
+    Apply a batch of StockPriceUpdateSerializer lines to the user's own
+    products in one transaction. Each kind of change is one UPDATE ...
+    SET col = CASE id WHEN ... END per CASE_CHUNK_SIZE ids. Deltas are
+    applied in SQL and clamped at zero. Returns counts plus the ids that
+    were invalid, not found, not owned or clamped.
+    """
+    validator = StockPriceUpdateSerializer()
+    valid: dict[int, dict] = {}
+    invalid = []
+    for index, item in enumerate(items):
+        try:
+            data = validator.run_validation(item)
+        except ValidationError as exc:
+            invalid.append({"index": index, "errors": exc.detail})
+            continue
+        if data["id"] in valid:
+            invalid.append({"index": index, "errors": {"id": ["Duplicate id in this batch."]}})
+            continue
+        valid[data["id"]] = data
+
+    with transaction.atomic():
+        # Lock the caller's rows (not the joined Store/User rows) so the
+        # clamp report matches what is written
+        if connections[Product.objects.db].features.has_select_for_update_of:
+            locked = (Product.objects.select_for_update(of=("self",))
+                      .filter(pk__in=list(valid), store__owner=user))
+        else:
+            # No FOR UPDATE OF (MariaDB): keep the join out of the locking
+            # read, the owner check is an unlocked subquery
+            locked = (Product.objects.select_for_update()
+                      .filter(pk__in=list(valid),
+                              store__in=Store.objects.filter(owner=user).values("pk")))
+        owned = dict(locked.values_list("pk", "stock"))
+        missing = valid.keys() - owned.keys()
+        exists = set(Product.objects.filter(pk__in=missing).values_list("pk", flat=True))
+
+        lines = [valid[pk] for pk in sorted(owned)]
+        absolute = [(d["id"], d["stock"]) for d in lines if "stock" in d]
+        deltas = [(d["id"], d["stock_delta"]) for d in lines if "stock_delta" in d]
+        prices = [(d["id"], d["price"]) for d in lines if "price" in d]
+
+        for chunk in _chunks(absolute):
+            Product.objects.filter(pk__in=[pk for pk, _ in chunk]).update(
+                stock=_case(chunk, IntegerField()))
+        for chunk in _chunks(deltas):
+            Product.objects.filter(pk__in=[pk for pk, _ in chunk]).update(
+                # Signed arithmetic: MySQL errors on an UNSIGNED column going below 0
+                stock=Greatest(Cast(F("stock"), IntegerField()) + _case(chunk, IntegerField()),
+                               Value(0)))
+        for chunk in _chunks(prices):
+            Product.objects.filter(pk__in=[pk for pk, _ in chunk]).update(
+                price=_case(chunk, DecimalField(max_digits=10, decimal_places=2)))
+
+        if lines:
+            page_cache.invalidate(page_cache.CATALOG)
+
+    return {
+        "updated": len(lines),
+        "not_found": sorted(missing - exists),
+        "not_owned": sorted(exists),
+        "clamped": sorted(pk for pk, delta in deltas if owned[pk] + delta < 0),
+        "invalid": invalid,
+    }
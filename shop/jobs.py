@@ -0,0 +1,49 @@
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.db import models, transaction
+
+
+class RetryPolicy(NamedTuple):
+    """
+    Retry rules for a queue table (OutboundEmail, AnnouncementJob): rows
+    back off exponentially, base, 2*base, 4*base, ... up to `backoff_max`
+    seconds, and are given up on after `max_attempts`.
+    """
+    max_attempts: int
+    backoff_base: int
+    backoff_max: int
+
+    def backoff(self, attempts: int) -> timedelta:
+        return timedelta(seconds=min(self.backoff_base * 2 ** (attempts - 1), self.backoff_max))
+
+    def record_failure(self, job: models.Model, exc: Exception, now, given_up: str,
+                       permanent: bool = False) -> None:
+        """
+        Count a failed attempt on `job` (not saved): schedule the retry,
+        or set its status to `given_up` when out of attempts or `permanent`.
+        """
+        job.attempts += 1
+        job.last_error = f"{type(exc).__name__}: {exc}"[:2000]
+        if permanent or job.attempts >= self.max_attempts:
+            job.status = given_up
+        else:
+            job.next_attempt_at = now + self.backoff(job.attempts)
+
+
+def claim(model: type[models.Model], batch_size: int, now, lease_seconds: int) -> list:
+    """
+    Take up to `batch_size` due PENDING rows of `model` with SELECT ...
+    FOR UPDATE SKIP LOCKED and lease them by pushing next_attempt_at
+    forward, so the slow work runs outside the transaction and a crashed
+    worker's rows come due again once the lease expires.
+    """
+    with transaction.atomic():
+        rows = list(
+            model.objects.select_for_update(skip_locked=True)
+            .filter(status=model.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        model.objects.filter(pk__in=[row.pk for row in rows]).update(
+            next_attempt_at=now + timedelta(seconds=lease_seconds))
+    return rows
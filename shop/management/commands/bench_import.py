@@ -0,0 +1,59 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from shop.importer import IMPORT_BATCH_SIZE, import_products, read_rows
+from shop.models import ProductSerializer, Store
+
+BENCH_STORE = "bench-import"
+
+
+class Command(BaseCommand):
+    help = ("Measure bulk import throughput (create pass, then an update pass "
+            "over the same SKUs) against one ProductSerializer.save() per row.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50_000)
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument("--baseline-rows", type=int, default=1000,
+                            help="Rows saved one at a time for comparison.")
+
+    def handle(self, *args, **options):
+        owner, _ = get_user_model().objects.get_or_create(username=BENCH_STORE)
+        store, _ = Store.objects.get_or_create(owner=owner, name=BENCH_STORE)
+        self.stdout.write(f"backend={connection.vendor} rows={options['rows']} "
+                          f"batch={options['batch_size']}")
+        try:
+            for label, price in (("create", "9.99"), ("update", "12.50")):
+                lines = self._ndjson(options["rows"], price)
+                report = import_products(store, read_rows(lines, "ndjson"),
+                                         options["batch_size"])
+                self.stdout.write(f"bulk {label:8} {report.rows_per_second:10.0f} rows/s "
+                                  f"({report.created} created, {report.updated} updated)")
+
+            n = options["baseline_rows"]
+            start = time.perf_counter()
+            for i in range(n):
+                serializer = ProductSerializer(
+                    data={"sku": f"one-{i}", "name": f"One {i}", "description": "d",
+                          "price": "1.00", "stock": 1},
+                    context={"store": store})
+                serializer.is_valid(raise_exception=True)
+                serializer.save(store=store)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"per-row  save   {n / elapsed:10.0f} rows/s")
+        finally:
+            # Plain DELETE: skip per-row signals for synthetic rows that
+            # nothing references
+            products = store.products.all()
+            products._raw_delete(products.db)
+            store.delete()
+
+    def _ndjson(self, n: int, price: str):
+        for i in range(n):
+            row = {"sku": f"SKU-{i:07d}", "name": f"Imported product {i}",
+                   "description": "Bulk imported", "price": price, "stock": i % 50}
+            yield (json.dumps(row) + "\n").encode()
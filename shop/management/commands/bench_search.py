@@ -0,0 +1,93 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from shop.models import Product, Store
+from shop.search import fallback_index, search_products
+
+BENCH_STORE = "bench-search"
+WORDS = ("red blue green black white steel wooden cotton leather organic "
+         "vintage compact wireless portable premium classic modern rustic "
+         "lamp chair table kettle jacket boots speaker blender backpack "
+         "notebook candle mug scarf watch helmet drone").split()
+
+
+class Command(BaseCommand):
+    help = ("Compare full-text product search against name__icontains on a "
+            "synthetic catalog (rows are created in a dedicated store).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument("--keep", action="store_true",
+                            help="Leave the synthetic store in place for reruns.")
+
+    def handle(self, *args, **options):
+        store = self._populate(options["products"])
+        queries = ["wireless speaker", "leather", "vintage wooden chair", "drone"]
+        page = options["page_size"]
+        self.stdout.write(f"backend={connection.vendor} "
+                          f"products={Product.objects.count()}")
+
+        if connection.vendor != "mysql":
+            start = time.perf_counter()
+            fallback_index.build()
+            self.stdout.write(f"inverted index build: "
+                              f"{(time.perf_counter() - start) * 1000:.0f} ms")
+
+        # Each sample is what stores_products_api does: count + first page
+        def first_page(results):
+            count = results.count()
+            return count, list(results[:page])
+
+        for q in queries:
+            icontains = self._time(options["repeat"], lambda: first_page(
+                Product.objects.filter(name__icontains=q).order_by("name")))
+            fulltext = self._time(options["repeat"], lambda: first_page(
+                search_products(Product.objects.all(), q)))
+            self.stdout.write(f"{q!r:28} icontains {icontains:8.2f} ms   "
+                              f"fulltext {fulltext:8.2f} ms")
+
+        if not options["keep"]:
+            # Plain DELETE: skip per-row signals for synthetic rows that
+            # nothing references
+            products = store.products.all()
+            products._raw_delete(products.db)
+            store.delete()
+            fallback_index.reset()
+
+    def _time(self, repeat, fn) -> float:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
+
+    def _populate(self, n: int) -> Store:
+        owner, _ = get_user_model().objects.get_or_create(username=BENCH_STORE)
+        store, _ = Store.objects.get_or_create(owner=owner, name=BENCH_STORE)
+        have = store.products.count()
+        rng = random.Random(42)
+        batch = []
+        for i in range(have, n):
+            words = rng.sample(WORDS, 6)
+            batch.append(Product(
+                store=store,
+                name=" ".join(words[:3]).title(),
+                description=" ".join(words[2:] + rng.sample(WORDS, 10)),
+                price=Decimal(rng.randint(100, 99_999)) / 100,
+                stock=rng.randint(0, 50),
+            ))
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Product.objects.bulk_create(batch)
+        return store
@@ -0,0 +1,81 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+
+from shop.models import (PRODUCT_PUBLIC_FIELDS, STORE_PUBLIC_FIELDS, Product,
+                         ProductPublicSerializer, Store, StorePublicSerializer,
+                         product_public_data, store_public_data)
+
+BENCH_STORE = "bench-serializers"
+
+
+class Command(BaseCommand):
+    help = ("Time the public catalog serializers against the lean .values() "
+            "read paths, reported per 1,000 rows (query + serialization).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--keep", action="store_true",
+                            help="Leave the synthetic rows in place for reruns.")
+
+    def handle(self, *args, **options):
+        n = options["rows"]
+        owner, stores = self._populate(n)
+        request = RequestFactory().get("/")
+        products = Product.objects.filter(store__owner=owner).order_by("name", "id")[:n]
+        store_qs = Store.objects.filter(owner=owner).order_by("name", "id")[:n]
+        self.stdout.write(f"backend={connection.vendor} rows={n}")
+
+        # .all() per sample so no run reuses an earlier result cache
+        cases = [
+            ("products", lambda: ProductPublicSerializer(
+                products.all(), many=True, context={"request": request}).data,
+             lambda: product_public_data(products.values(*PRODUCT_PUBLIC_FIELDS), request)),
+            ("stores", lambda: StorePublicSerializer(
+                store_qs.select_related("owner__vendor"), many=True).data,
+             lambda: store_public_data(store_qs.values(*STORE_PUBLIC_FIELDS))),
+        ]
+        for name, before, after in cases:
+            slow = self._time(options["repeat"], before) * 1000 / n
+            fast = self._time(options["repeat"], after) * 1000 / n
+            self.stdout.write(f"{name:10} serializer {slow:8.2f} ms/1k   "
+                              f"lean {fast:8.2f} ms/1k   x{slow / fast:.1f}")
+
+        if not options["keep"]:
+            # Plain DELETE: skip per-row signals for synthetic rows that
+            # nothing references
+            for store in stores:
+                rows = store.products.all()
+                rows._raw_delete(rows.db)
+            owner.delete()
+
+    def _time(self, repeat, fn) -> float:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
+
+    def _populate(self, n: int):
+        owner, _ = get_user_model().objects.get_or_create(username=BENCH_STORE)
+        have = Store.objects.filter(owner=owner).count()
+        Store.objects.bulk_create([
+            Store(owner=owner, name=f"{BENCH_STORE}-{i}", slug=f"{BENCH_STORE}-{i}")
+            for i in range(have, n)
+        ])
+        stores = list(Store.objects.filter(owner=owner).order_by("id")[:1])
+        have = Product.objects.filter(store=stores[0]).count()
+        Product.objects.bulk_create([
+            Product(store=stores[0], name=f"Bench product {i}",
+                    description="Synthetic row", price=Decimal(i % 500) + Decimal("0.99"),
+                    stock=i % 40)
+            for i in range(have, n)
+        ], batch_size=1000)
+        return owner, Store.objects.filter(owner=owner)
@@ -0,0 +1,134 @@
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# name -> (command line, extra environment); {addr} is host:port
+SERVERS = {
+    "runserver": ([sys.executable, "manage.py", "runserver", "--noreload", "{addr}"], {}),
+    "gunicorn-wsgi": ([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+                       "--bind", "{addr}"], {"SERVER_INTERFACE": "wsgi"}),
+    "gunicorn-asgi": ([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+                       "--bind", "{addr}"], {"SERVER_INTERFACE": "asgi"}),
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = ("Load-test a page under runserver and under gunicorn (ecommerce.wsgi "
+            "and ecommerce.asgi), reporting requests/second and latency.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--servers", nargs="+", choices=list(SERVERS), default=list(SERVERS))
+        parser.add_argument("--path", default="/", help="Page to request.")
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=16,
+                            help="Client threads, each on its own keep-alive connection.")
+        parser.add_argument("--workers", type=int, default=4,
+                            help="GUNICORN_WORKERS for the gunicorn runs.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"path={options['path']} requests={options['requests']} "
+                          f"concurrency={options['concurrency']}")
+        for name in options["servers"]:
+            port = _free_port()
+            argv, extra = SERVERS[name]
+            env = {**os.environ, **extra,
+                   "GUNICORN_WORKERS": str(options["workers"]),
+                   "GUNICORN_ACCESS_LOG": "",
+                   "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE",
+                                                            settings.SETTINGS_MODULE)}
+            proc = subprocess.Popen([a.format(addr=f"127.0.0.1:{port}") for a in argv],
+                                    cwd=settings.BASE_DIR, env=env,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                self._wait_ready(port, options["path"], proc)
+                self._load(port, options["path"], options["concurrency"], 100)  # warm-up
+                elapsed, latencies, errors = self._load(port, options["path"],
+                                                        options["concurrency"], options["requests"])
+            except CommandError as exc:
+                self.stdout.write(f"{name:14} skipped: {exc}")
+                continue
+            finally:
+                proc.terminate()
+                proc.wait(10)
+            latencies.sort()
+            p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+            self.stdout.write(
+                f"{name:14} {len(latencies) / elapsed:8.1f} req/s   "
+                f"p50 {statistics.median(latencies) * 1000 if latencies else 0:6.1f} ms   "
+                f"p99 {p99 * 1000:6.1f} ms   errors {errors}")
+
+    def _wait_ready(self, port: int, path: str, proc, timeout: float = 30) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise CommandError(f"server exited with status {proc.returncode}")
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+                conn.request("GET", path)
+                conn.getresponse().read()
+                conn.close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError("server did not answer in time")
+
+    def _load(self, port: int, path: str, concurrency: int, total: int):
+        """
+        `total` GETs of `path` spread over `concurrency` threads. Returns
+        (seconds, per-request latencies, failed requests).
+        """
+        latencies: list[float] = []
+        errors = 0
+        remaining = [total]
+        lock = threading.Lock()
+
+        def worker():
+            nonlocal errors
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            mine = []
+            while True:
+                with lock:
+                    if not remaining[0]:
+                        break
+                    remaining[0] -= 1
+                start = time.perf_counter()
+                try:
+                    conn.request("GET", path)
+                    resp = conn.getresponse()
+                    resp.read()
+                    ok = resp.status < 500
+                    if resp.will_close:
+                        conn.close()
+                except (OSError, http.client.HTTPException):
+                    ok = False
+                    conn.close()
+                if ok:
+                    mine.append(time.perf_counter() - start)
+                else:
+                    with lock:
+                        errors += 1
+            conn.close()
+            with lock:
+                latencies.extend(mine)
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return time.perf_counter() - start, latencies, errors
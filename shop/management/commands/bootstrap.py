@@ -0,0 +1,103 @@
+import os
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db.migrations.executor import MigrationExecutor
+
+# Named lock shared by every replica starting against the same database
+MIGRATION_LOCK = "shop_bootstrap_migrate"
+
+
+@contextmanager
+def migration_lock(connection, timeout: int):
+    """
+    Hold MySQL's GET_LOCK(MIGRATION_LOCK) so only one replica migrates at
+    a time. Other backends have no cross-host replicas and skip it.
+    """
+    if connection.vendor != "mysql":
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", [MIGRATION_LOCK, timeout])
+        if cursor.fetchone()[0] != 1:
+            raise CommandError(f"Timed out after {timeout}s waiting for the migration lock.")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", [MIGRATION_LOCK])
+
+
+def pending_migrations(connection) -> list:
+    executor = MigrationExecutor(connection)
+    return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+class Command(BaseCommand):
+    help = ("Prepare the database for the app in one process: wait for it, apply "
+            "migrations under a lock, and create the admin user if missing. "
+            "Safe to run on every container start.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument("--wait", type=float, default=60,
+                            help="Seconds to wait for the database to accept connections.")
+        parser.add_argument("--lock-timeout", type=int, default=300,
+                            help="Seconds to wait while another replica migrates.")
+        parser.add_argument("--no-superuser", action="store_true",
+                            help="Skip creating DJANGO_SUPERUSER_USERNAME.")
+        parser.add_argument("--collectstatic", action="store_true",
+                            help="Also collect static files (the Docker image does this at build).")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        connection = connections[options["database"]]
+        self._wait_for_db(connection, options["wait"])
+
+        if pending_migrations(connection):
+            with migration_lock(connection, options["lock_timeout"]):
+                # Another replica may have applied them while we waited
+                if pending_migrations(connection):
+                    call_command("migrate", database=options["database"], interactive=False,
+                                 verbosity=options["verbosity"])
+                else:
+                    self.stdout.write("Migrations applied by another process.")
+        else:
+            self.stdout.write("Migrations up to date.")
+
+        if not options["no_superuser"]:
+            self._ensure_superuser(options["database"])
+        if options["collectstatic"]:
+            call_command("collectstatic", interactive=False, verbosity=0)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Bootstrap finished in {time.perf_counter() - start:.2f}s."))
+
+    def _wait_for_db(self, connection, wait: float) -> None:
+        deadline = time.monotonic() + wait
+        while True:
+            try:
+                connection.ensure_connection()
+                return
+            except OperationalError as exc:
+                connection.close()
+                if time.monotonic() >= deadline:
+                    raise CommandError(f"Database not reachable after {wait:.0f}s: {exc}")
+                self.stdout.write(f"Waiting for database: {exc}")
+                time.sleep(1)
+
+    def _ensure_superuser(self, database: str) -> None:
+        username = os.environ.get("DJANGO_SUPERUSER_USERNAME", "admin")
+        User = get_user_model()
+        if User.objects.using(database).filter(username=username).exists():
+            return
+        User.objects.db_manager(database).create_superuser(
+            username,
+            os.environ.get("DJANGO_SUPERUSER_EMAIL", "admin@example.com"),
+            os.environ.get("DJANGO_SUPERUSER_PASSWORD", "admin123"),
+        )
+        self.stdout.write(f"Superuser created: {username}")
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop.renditions import mark_stale, process_pending
+
+
+class Command(BaseCommand):
+    help = "Build thumbnail/card/detail renditions (WebP + JPEG) of product images."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backfill", action="store_true",
+                            help="First queue every product whose renditions are missing or stale.")
+        parser.add_argument("--batch-size", type=int, default=20,
+                            help="Products processed per round.")
+        parser.add_argument("--loop", action="store_true",
+                            help="Keep polling for newly saved images instead of exiting.")
+        parser.add_argument("--interval", type=float, default=5.0,
+                            help="Seconds to sleep when nothing is queued (with --loop).")
+
+    def handle(self, *args, **options):
+        if options["backfill"]:
+            self.stdout.write(f"Queued {mark_stale()} product(s).")
+        total_done = total_failed = 0
+        while True:
+            done, failed = process_pending(batch_size=options["batch_size"])
+            total_done += done
+            total_failed += failed
+            if done or failed:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated renditions of {total_done} product(s); {total_failed} failed."))
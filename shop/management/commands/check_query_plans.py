@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from shop.models import Product, Review
+from shop.query_plans import API_PLAN_CASES, plan_issues
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the public API queries and fail on unexpected full scans or filesorts."
+
+    def handle(self, *args, **options):
+        review = Review.objects.select_related("product__store__owner__vendor").first()
+        product = review.product if review else Product.objects.select_related(
+            "store__owner__vendor").exclude(store=None).first()
+        if product is None:
+            raise CommandError("Need at least one product with a store to sample ids from.")
+        owner = product.store.owner
+        ids = {
+            "store": product.store_id,
+            "vendor": getattr(getattr(owner, "vendor", None), "id", 0),
+            "owner": owner.pk,
+            "product": product.pk,
+        }
+
+        failures = {}
+        for case in API_PLAN_CASES:
+            issues = plan_issues(case.build(ids))
+            label = ", ".join(sorted(issues)) or "ok"
+            self.stdout.write(f"{case.name:<36} {label}")
+            if issues - case.allowed:
+                failures[case.name] = issues - case.allowed
+
+        if failures:
+            raise CommandError(
+                f"Unexpected plans on {connection.vendor}: "
+                + "; ".join(f"{name} ({', '.join(sorted(v))})" for name, v in failures.items())
+            )
+        self.stdout.write(self.style.SUCCESS("All query plans use their indexes."))
@@ -0,0 +1,55 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shop import export
+from shop.models import Store
+
+
+class Command(BaseCommand):
+    help = ("Stream a store's or vendor's products (optionally with reviews) "
+            "as CSV or NDJSON, optionally gzipped, to a file or stdout.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--store", type=int, action="append", default=[],
+                            help="Store id to export (repeatable).")
+        parser.add_argument("--owner", help="Export every store of this username.")
+        parser.add_argument("--format", choices=export.FORMATS, default="csv")
+        parser.add_argument("--reviews", action="store_true")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--output", "-o", help="File path (default: stdout).")
+        parser.add_argument("--chunk-size", type=int, default=export.STREAM_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        stores = Store.objects.all()
+        if options["store"]:
+            stores = stores.filter(id__in=options["store"])
+        if options["owner"]:
+            stores = stores.filter(owner__username=options["owner"])
+        if not (options["store"] or options["owner"]):
+            raise CommandError("Pass --store and/or --owner.")
+        store_ids = list(stores.values_list("id", flat=True))
+        if not store_ids:
+            raise CommandError("No matching stores.")
+
+        records = export.export_records(store_ids, options["reviews"], options["chunk_size"])
+        chunks = export.export_chunks(records, options["format"], options["gzip"],
+                                      options["chunk_size"])
+        path = options["output"]
+        if path is None:
+            if options["gzip"]:
+                for chunk in chunks:
+                    sys.stdout.buffer.write(chunk)
+                sys.stdout.buffer.flush()
+            else:
+                for chunk in chunks:
+                    self.stdout.write(chunk, ending="")
+            return
+        if options["gzip"]:
+            out = open(path, "wb")
+        else:
+            out = open(path, "w", encoding="utf-8", newline="")
+        with out:
+            for chunk in chunks:
+                out.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Exported {len(store_ids)} store(s) to {path}."))
@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shop import importer
+from shop.models import Store
+
+
+class Command(BaseCommand):
+    help = "Bulk upsert products into a store from a CSV, JSON or NDJSON file, keyed on SKU."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--store", type=int, required=True)
+        parser.add_argument("--format", choices=importer.FORMATS,
+                            help="Defaults to the file extension.")
+        parser.add_argument("--batch-size", type=int, default=importer.IMPORT_BATCH_SIZE)
+        parser.add_argument("--report", help="Write the full JSON report to this path.")
+
+    def handle(self, *args, **options):
+        try:
+            store = Store.objects.get(pk=options["store"])
+        except Store.DoesNotExist:
+            raise CommandError(f"Store {options['store']} does not exist.")
+        fmt = options["format"] or importer.detect_format(options["path"])
+        if fmt is None:
+            raise CommandError("Cannot tell the format from the file name; pass --format.")
+
+        try:
+            with open(options["path"], "rb") as f:
+                report = importer.import_products(store, importer.read_rows(f, fmt),
+                                                  options["batch_size"])
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        if options["report"]:
+            with open(options["report"], "w", encoding="utf-8") as out:
+                json.dump(report.as_dict(), out, indent=2)
+        for error in report.errors:
+            self.stderr.write(f"row {error['row']} ({error['sku']}): {json.dumps(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.created} created, {report.updated} updated, {report.failed} failed "
+            f"in {report.seconds:.2f}s ({report.rows_per_second:.0f} rows/s)."))
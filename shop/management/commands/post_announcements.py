@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop.functions.announce import process_pending
+
+
+class Command(BaseCommand):
+    help = "Post queued store/product announcements to X, with retries and backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10,
+                            help="Jobs claimed per round.")
+        parser.add_argument("--loop", action="store_true",
+                            help="Keep polling for new jobs instead of exiting.")
+        parser.add_argument("--interval", type=float, default=5.0,
+                            help="Seconds to sleep when nothing is due (with --loop).")
+
+    def handle(self, *args, **options):
+        total_posted = total_failed = 0
+        while True:
+            posted, failed = process_pending(batch_size=options["batch_size"])
+            total_posted += posted
+            total_failed += failed
+            if posted or failed:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Posted {total_posted} announcement(s); {total_failed} failed attempt(s)."))
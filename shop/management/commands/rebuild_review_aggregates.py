@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from shop import page_cache
+from shop.helpers import RATING_AVG_EXPR
+from shop.models import Product, Review
+
+AGGREGATE_FIELDS = ["rating_count", "rating_sum",
+                    "stars_1", "stars_2", "stars_3", "stars_4", "stars_5"]
+
+
+class Command(BaseCommand):
+    help = "Recompute Product rating count/sum/histogram/average from Review."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Products recomputed per transaction.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = 0
+        total = 0
+        while True:
+            ids = list(
+                Product.objects.filter(pk__gt=last_id).order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                self._rebuild(ids)
+            total += len(ids)
+            last_id = ids[-1]
+        # bulk_update sends no signals; catalog cards show these numbers
+        page_cache.invalidate(page_cache.CATALOG)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt review aggregates for {total} products."))
+
+    def _rebuild(self, ids):
+        rows = (
+            Review.objects.filter(product_id__in=ids)
+            .values("product_id")
+            .annotate(
+                rating_count=Count("id"),
+                rating_sum=Sum("rating"),
+                **{f"stars_{i}": Count("id", filter=Q(rating=i)) for i in range(1, 6)},
+            )
+        )
+        by_product = {row.pop("product_id"): row for row in rows}
+
+        products = list(Product.objects.filter(pk__in=ids).only("pk"))
+        for p in products:
+            row = by_product.get(p.pk, {})
+            for field in AGGREGATE_FIELDS:
+                setattr(p, field, row.get(field) or 0)
+        Product.objects.bulk_update(products, AGGREGATE_FIELDS)
+        Product.objects.filter(pk__in=ids).update(rating_avg=RATING_AVG_EXPR)
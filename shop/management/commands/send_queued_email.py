@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop.outbox import send_pending
+
+
+class Command(BaseCommand):
+    help = "Deliver queued OutboundEmail rows in batches over one SMTP connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50,
+                            help="Messages sent per SMTP connection.")
+        parser.add_argument("--loop", action="store_true",
+                            help="Keep polling for new mail instead of exiting.")
+        parser.add_argument("--interval", type=float, default=5.0,
+                            help="Seconds to sleep when the queue is empty (with --loop).")
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = send_pending(batch_size=options["batch_size"])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {total_sent} email(s); {total_failed} failed attempt(s)."))
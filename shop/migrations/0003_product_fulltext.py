@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+INDEX_NAME = "product_name_desc_ft"
+
+
+def add_fulltext_index(apps, schema_editor):
+    # FULLTEXT is MySQL/MariaDB only; other backends use shop.search's
+    # in-process inverted index instead.
+    if schema_editor.connection.vendor != "mysql":
+        return
+    schema_editor.execute(
+        f"CREATE FULLTEXT INDEX {INDEX_NAME} ON shop_product (name, description)"
+    )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "mysql":
+        return
+    schema_editor.execute(f"DROP INDEX {INDEX_NAME} ON shop_product")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0002_catalog_ratings_orders_outbox"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_fulltext_index, drop_fulltext_index),
+    ]
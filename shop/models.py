@@ -1,4 +1,6 @@
 
+from decimal import Decimal
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.conf import settings
@@ -9,7 +11,7 @@ from rest_framework import serializers
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
 from django.utils.text import slugify
 from rest_framework import serializers
 
@@ -62,6 +64,10 @@ class Store(models.Model):
         # Store name is unique per owner (as in your original code)
         unique_together = ("owner", "name")
         ordering = ["name"]
+        indexes = [
+            # Keyset pages and streams of the store lists (name, id)
+            models.Index(fields=["name", "id"], name="store_name_id_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -84,15 +90,61 @@ class Product(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.ImageField(upload_to="products/", blank=True, null=True)
+    # Resized copies of `image` built by `manage.py build_renditions`
+    # (see shop.renditions): {size: {"width", "height", "webp", "jpeg"}}
+    # for the image named in renditions_source. Saving a new image sets
+    # renditions_pending until the worker catches up.
+    renditions = models.JSONField(default=dict, blank=True)
+    renditions_source = models.CharField(max_length=255, blank=True, default="")
+    renditions_pending = models.BooleanField(default=False)
     stock = models.PositiveIntegerField(default=0)
+    # Vendor's own product code, unique within a store; bulk imports
+    # upsert on it (see shop.importer)
+    sku = models.CharField(max_length=64, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Review aggregates, maintained alongside every Review write
+    # (see helpers.apply_review_rating); rebuild with
+    # `manage.py rebuild_review_aggregates`.
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_avg = models.FloatField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+
     class Meta:
-        ordering = ["name"]
+        ordering = ["name", "id"]
+        indexes = [
+            # Backs keyset pagination of the catalog (see shop.pagination)
+            models.Index(fields=["name", "id"], name="product_name_id_idx"),
+            models.Index(fields=["-rating_avg", "name", "id"],
+                         name="product_rating_idx"),
+            # stores_products_api filters (see shop.query_plans)
+            models.Index(fields=["store", "name", "id"],
+                         name="product_store_name_idx"),
+            models.Index(fields=["price", "name", "id"],
+                         name="product_price_name_idx"),
+            # Work queue of shop.renditions
+            models.Index(fields=["renditions_pending", "id"],
+                         name="product_renditions_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["store", "sku"], name="product_store_sku_uniq"),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def rating_histogram(self) -> dict[int, int]:
+        """
+        Number of reviews per star, 1 through 5.
+        """
+        return {i: getattr(self, f"stars_{i}") for i in range(1, 6)}
+
 
 class Order(models.Model):
     """
@@ -112,6 +164,8 @@ class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    # Unit price at checkout time
+    price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
 
 class Review(models.Model):
@@ -125,8 +179,23 @@ class Review(models.Model):
     comment = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # my_product_reviews filters, newest first with a descending id
+            # tie-breaker (see shop.query_plans)
+            models.Index(fields=["product", "-created_at", "-id"],
+                         name="review_product_created_idx"),
+            models.Index(fields=["product", "rating", "-created_at", "-id"],
+                         name="review_product_rating_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.product.name} ({self.rating})"
+
+    def save(self, *args, **kwargs):
+        # The rating aggregate receivers run inside this transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
     
 
 class ResetToken(models.Model):
@@ -149,6 +218,72 @@ class ResetToken(models.Model):
 
 
 
+class OutboundEmail(models.Model):
+    """
+    An email queued by a request and delivered later by
+    `manage.py send_queued_email` (see shop.outbox).
+    """
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (SENT, "Sent"), (FAILED, "Failed")]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255, blank=True)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+
+class AnnouncementJob(models.Model):
+    """
+    A store/product announcement queued for X by a request and posted
+    later by `manage.py post_announcements` (see shop.functions.announce).
+    Jobs that exhaust their retries, or fail permanently, end up DEAD.
+    """
+    PENDING = "pending"
+    POSTED = "posted"
+    DEAD = "dead"
+    STATUS_CHOICES = [(PENDING, "Pending"), (POSTED, "Posted"), (DEAD, "Dead letter")]
+
+    store = models.ForeignKey(Store, on_delete=models.SET_NULL, null=True, blank=True,
+                              related_name="+")
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name="+")
+    text = models.TextField()
+    # Storage name of the image to attach, captured at enqueue time
+    image = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    tweet_id = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    posted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.text[:40]} ({self.status})"
+
+
 # ----------------- Serializers (annotated only) -----------------
 
 class StoreSerializer(serializers.ModelSerializer):
@@ -170,9 +305,21 @@ class ProductSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Product
-        fields = ["id", "store", "name", "description", "price", 
+        fields = ["id", "store", "sku", "name", "description", "price", 
                   "image", "stock", "created_at"]
         read_only_fields = ["id", "store", "created_at"]
+        # SKU uniqueness needs the store, which the view supplies: see validate_sku
+        validators = []
+
+    def validate_sku(self, v):
+        store = self.context.get("store")
+        if v and store is not None:
+            clash = store.products.filter(sku=v)
+            if self.instance is not None:
+                clash = clash.exclude(pk=self.instance.pk)
+            if clash.exists():
+                raise serializers.ValidationError("This store already has a product with this SKU.")
+        return v
 
     def validate_price(self, v):
         if v < 0:
@@ -183,6 +330,47 @@ class ProductSerializer(serializers.ModelSerializer):
         if v < 0:
             raise serializers.ValidationError("Stock must be ≥ 0.")
         return v
+
+
+class ProductImportSerializer(ProductSerializer):
+    """
+    One row of a bulk import (see shop.importer): the product fields a
+    vendor supplies, keyed by a required SKU. Reuses ProductSerializer's
+    price/stock rules.
+    """
+    class Meta(ProductSerializer.Meta):
+        fields = ["sku", "name", "description", "price", "stock"]
+        read_only_fields = []
+        extra_kwargs = {"sku": {"required": True, "allow_null": False, "allow_blank": False}}
+
+    def validate_sku(self, v):
+        # An existing SKU is an update, not a clash
+        return v
+
+
+# Largest stock/delta accepted from the API: fits a signed INT, so the
+# clamped `stock + delta` arithmetic in shop.inventory stays in range
+STOCK_MAX = 2_147_483_647
+
+
+class StockPriceUpdateSerializer(serializers.Serializer):
+    """
+    One line of a bulk inventory update (see shop.inventory): a product id
+    with an absolute `stock` or a relative `stock_delta`, and/or a `price`.
+    """
+    id = serializers.IntegerField(min_value=1, max_value=2 ** 63 - 1)
+    stock = serializers.IntegerField(required=False, min_value=0, max_value=STOCK_MAX)
+    stock_delta = serializers.IntegerField(required=False, min_value=-STOCK_MAX, max_value=STOCK_MAX)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+
+    validate_price = ProductSerializer.validate_price
+
+    def validate(self, attrs):
+        if "stock" in attrs and "stock_delta" in attrs:
+            raise serializers.ValidationError("Send either stock or stock_delta, not both.")
+        if not {"stock", "stock_delta", "price"} & attrs.keys():
+            raise serializers.ValidationError("Nothing to update.")
+        return attrs
     
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -224,4 +412,80 @@ class ProductPublicSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = ["id", "store", "name", "description", "price", 
-                  "image", "stock", "created_at"]
\ No newline at end of file
+                  "image", "stock", "created_at"]
+
+# ---------- lean read paths ----------
+# Plain-dict equivalents of the public serializers for list endpoints:
+# rows come from .values() (no model instances, no per-row method calls)
+# and produce exactly the same JSON.
+
+_CENTS = Decimal("0.01")
+
+
+def _price_repr(value: Decimal) -> str:
+    return f"{value.quantize(_CENTS):f}"
+
+
+def _datetime_repr(value, tz) -> str:
+    """
+    DRF's default DateTimeField output: ISO 8601 in the current time
+    zone, with UTC written as "Z". `tz` is looked up once per batch.
+    """
+    value = value.astimezone(tz).isoformat()
+    return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+STORE_FIELDS = ("id", "name", "bio", "slug")
+STORE_PUBLIC_FIELDS = ("id", "name", "bio", "slug", "created_at",
+                       "owner__username", "owner__vendor__id", "owner__vendor__vendor_name")
+PRODUCT_PUBLIC_FIELDS = ("id", "store_id", "name", "description", "price",
+                         "image", "stock", "created_at")
+
+
+def store_public_data(rows) -> list[dict]:
+    """
+    StorePublicSerializer(many=True).data for rows of
+    Store.objects.values(*STORE_PUBLIC_FIELDS).
+    """
+    tz = timezone.get_current_timezone()
+    out = []
+    for r in rows:
+        if r["owner__vendor__id"] is None:
+            vendor = {"id": None, "vendor_name": r["owner__username"]}
+        else:
+            vendor = {"id": r["owner__vendor__id"], "vendor_name": r["owner__vendor__vendor_name"]}
+        out.append({
+            "id": r["id"],
+            "name": r["name"],
+            "bio": r["bio"],
+            "slug": r["slug"],
+            "created_at": _datetime_repr(r["created_at"], tz),
+            "vendor": vendor,
+        })
+    return out
+
+
+def product_public_data(rows, request=None) -> list[dict]:
+    """
+    ProductPublicSerializer(many=True).data for rows of
+    Product.objects.values(*PRODUCT_PUBLIC_FIELDS).
+    """
+    storage = Product._meta.get_field("image").storage
+    tz = timezone.get_current_timezone()
+    out = []
+    for r in rows:
+        image = None
+        if r["image"]:
+            image = storage.url(r["image"])
+            if request is not None:
+                image = request.build_absolute_uri(image)
+        out.append({
+            "id": r["id"],
+            "store": r["store_id"],
+            "name": r["name"],
+            "description": r["description"],
+            "price": _price_repr(r["price"]),
+            "image": image,
+            "stock": r["stock"],
+            "created_at": _datetime_repr(r["created_at"], tz),
+        })
+    return out
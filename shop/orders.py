@@ -0,0 +1,51 @@
+from decimal import Decimal
+from typing import Iterable
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+
+from .helpers import mark_user_has_purchased
+from .models import Order, OrderItem, Product
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when a checkout would drive a product's stock below zero.
+    """
+    def __init__(self, product: Product, requested: int):
+        self.product = product
+        self.requested = requested
+        super().__init__(f"Not enough stock for {product.name} "
+                         f"(requested {requested}).")
+
+
+def place_order(user: User, items: Iterable[dict]) -> Order:
+    """
+    Persist an order for basket lines ({'product', 'quantity', 'price'})
+    in one transaction: conditionally decrement each product's stock,
+    create the Order, bulk-create its OrderItems and record the purchase.
+    Raises InsufficientStock (and rolls everything back) if any line
+    cannot be fulfilled.
+    """
+    # Lock rows in a stable order so concurrent checkouts can't deadlock
+    lines = sorted(items, key=lambda it: it["product"].pk)
+
+    with transaction.atomic():
+        for it in lines:
+            qty = it["quantity"]
+            # Single conditional UPDATE: no read-modify-write race
+            updated = Product.objects.filter(
+                pk=it["product"].pk, stock__gte=qty
+            ).update(stock=F("stock") - qty)
+            if not updated:
+                raise InsufficientStock(it["product"], qty)
+
+        order = Order.objects.create(user=user)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=it["product"],
+                      quantity=it["quantity"], price=Decimal(it["price"]))
+            for it in lines
+        ])
+        mark_user_has_purchased(user, products=[it["product"] for it in lines])
+    return order
@@ -0,0 +1,89 @@
+import logging
+from typing import Optional, Sequence
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+
+from .jobs import RetryPolicy, claim
+from .models import OutboundEmail
+
+log = logging.getLogger(__name__)
+
+
+def enqueue_email(subject: str, body: str, to: Sequence[str],
+                  from_email: Optional[str] = None,
+                  html_body: str = "") -> OutboundEmail:
+    """
+    Queue an email for the outbox worker instead of talking SMTP
+    inside the request.
+    """
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        from_email=from_email or getattr(settings, "DEFAULT_FROM_EMAIL", "") or "",
+        to=list(to),
+    )
+
+
+def _to_message(msg: OutboundEmail, connection) -> EmailMultiAlternatives:
+    email = EmailMultiAlternatives(msg.subject, msg.body, msg.from_email or None,
+                                   msg.to, connection=connection)
+    if msg.html_body:
+        email.attach_alternative(msg.html_body, "text/html")
+    return email
+
+
+def _policy(max_attempts: Optional[int]) -> RetryPolicy:
+    return RetryPolicy(
+        max_attempts if max_attempts is not None else getattr(settings, "OUTBOX_MAX_ATTEMPTS", 5),
+        getattr(settings, "OUTBOX_BACKOFF_SECONDS", 30),
+        getattr(settings, "OUTBOX_BACKOFF_MAX_SECONDS", 3600),
+    )
+
+
+def send_pending(batch_size: int = 50, max_attempts: Optional[int] = None) -> tuple[int, int]:
+    """
+    Deliver up to `batch_size` due messages over one SMTP connection.
+    Rows are claimed under a lease (see jobs.claim) so several workers can
+    drain the same table, and each message's result is committed as soon
+    as it is known: a crash mid-batch never resends delivered mail.
+    Returns (sent, failed_attempts).
+    """
+    policy = _policy(max_attempts)
+    now = timezone.now()
+    batch = claim(OutboundEmail, batch_size, now, getattr(settings, "OUTBOX_LEASE_SECONDS", 300))
+    if not batch:
+        return 0, 0
+    fields = ["attempts", "last_error", "status", "next_attempt_at", "sent_at"]
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as exc:
+        log.warning("Outbox could not connect to the mail server: %s", exc)
+        for msg in batch:
+            policy.record_failure(msg, exc, now, OutboundEmail.FAILED)
+        OutboundEmail.objects.bulk_update(batch, fields)
+        return 0, len(batch)
+
+    sent = failed = 0
+    try:
+        for msg in batch:
+            try:
+                connection.send_messages([_to_message(msg, connection)])
+            except Exception as exc:
+                log.warning("Outbox message %s failed: %s", msg.pk, exc)
+                policy.record_failure(msg, exc, now, OutboundEmail.FAILED)
+                failed += 1
+            else:
+                msg.attempts += 1
+                msg.status = OutboundEmail.SENT
+                msg.sent_at = timezone.now()
+                msg.last_error = ""
+                sent += 1
+            msg.save(update_fields=fields)
+    finally:
+        connection.close()
+    return sent, failed
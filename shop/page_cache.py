@@ -0,0 +1,155 @@
+import hashlib
+from typing import Optional
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpRequest, HttpResponse
+
+# Which entry of settings.CACHES holds rendered catalog pages
+CACHE_ALIAS = getattr(settings, "SHOP_PAGE_CACHE_ALIAS", "default")
+CACHE_TIMEOUT = getattr(settings, "SHOP_PAGE_CACHE_TIMEOUT", 300)
+
+_PREFIX = "shop:pc"
+CATALOG = "catalog"
+STAT_NAMES = ("product_list", "product_detail")
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+# ---------- generations ----------
+# Keys embed a generation number; invalidating bumps the number so every
+# key built from the old one is simply never read again (and expires).
+
+def product_scope(product_id: int) -> str:
+    return f"product:{product_id}"
+
+
+def _generation(scope: str) -> int:
+    key = f"{_PREFIX}:gen:{scope}"
+    cache = _cache()
+    gen = cache.get(key)
+    if gen is None:
+        cache.add(key, 1, None)
+        gen = cache.get(key, 1)
+    return gen
+
+
+def _bump(scope: str) -> None:
+    key = f"{_PREFIX}:gen:{scope}"
+    cache = _cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def invalidate(*scopes: str) -> None:
+    """
+    Drop every cached entry under the given scopes. Runs now (so the
+    writing process never reads stale data) and again after commit (so a
+    concurrent reader cannot re-cache pre-commit rows).
+    """
+    for scope in scopes:
+        _bump(scope)
+    transaction.on_commit(lambda: [_bump(s) for s in scopes])
+
+
+# ---------- keys ----------
+
+def list_page_key(params) -> str:
+    """
+    Key for a rendered product_list page: catalog generation plus the
+    (sorted) query string, so each cursor/page_size/filter gets its own slot.
+    """
+    query = "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+    digest = hashlib.sha1(query.encode("utf-8")).hexdigest()
+    return f"{_PREFIX}:list:{_generation(CATALOG)}:{digest}"
+
+
+def reviews_fragment_key(product_id: int) -> str:
+    """
+    Key for the rendered reviews block of one product_detail page.
+    """
+    gen = _generation(product_scope(product_id))
+    return f"{_PREFIX}:reviews:{product_id}:{gen}"
+
+
+# ---------- get/set with hit/miss accounting ----------
+
+def _count(stat: str, outcome: str) -> None:
+    key = f"{_PREFIX}:stats:{stat}:{outcome}"
+    cache = _cache()
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def fetch(key: str, stat: str):
+    value = _cache().get(key)
+    _count(stat, "misses" if value is None else "hits")
+    return value
+
+
+def store(key: str, value) -> None:
+    _cache().set(key, value, CACHE_TIMEOUT)
+
+
+def stats() -> dict:
+    """
+    Hit/miss counters per cached page type, with the hit rate.
+    """
+    cache = _cache()
+    out = {}
+    for stat in STAT_NAMES:
+        hits = cache.get(f"{_PREFIX}:stats:{stat}:hits", 0)
+        misses = cache.get(f"{_PREFIX}:stats:{stat}:misses", 0)
+        total = hits + misses
+        out[stat] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else None,
+        }
+    return out
+
+
+def reset_stats() -> None:
+    _cache().delete_many([f"{_PREFIX}:stats:{stat}:{outcome}"
+                          for stat in STAT_NAMES
+                          for outcome in ("hits", "misses")])
+
+
+# ---------- full-page helpers ----------
+
+def is_cacheable_request(request: HttpRequest) -> bool:
+    """
+    Only anonymous GETs with no pending flash messages share a page.
+    """
+    return (
+        request.method == "GET"
+        and not request.user.is_authenticated
+        and not len(messages.get_messages(request))
+    )
+
+
+def is_cacheable_response(request: HttpRequest, response: HttpResponse) -> bool:
+    """
+    Never store responses that set cookies or embed a CSRF token.
+    """
+    return (
+        response.status_code == 200
+        and not response.cookies
+        and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+    )
+
+
+def cached_response(key: str, stat: str) -> Optional[HttpResponse]:
+    content = fetch(key, stat)
+    if content is None:
+        return None
+    return HttpResponse(content)
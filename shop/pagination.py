@@ -0,0 +1,219 @@
+import base64
+import hashlib
+import json
+from typing import Any, Optional, Sequence
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.cache import caches
+from django.db.models import Q, QuerySet
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Seconds an API result count is reused before COUNT(*) runs again
+COUNT_CACHE_TIMEOUT = getattr(settings, "SHOP_API_COUNT_TIMEOUT", 60)
+COUNT_CACHE_ALIAS = getattr(settings, "SHOP_PAGE_CACHE_ALIAS", "default")
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Encode the ordering key of a row as an opaque, URL-safe token.
+    """
+    raw = json.dumps(list(values), separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode().rstrip("=")
+
+
+def decode_cursor(token: Optional[str], size: int) -> Optional[list]:
+    """
+    Decode a token produced by encode_cursor. Return None if the token is
+    missing or malformed (callers fall back to the first page).
+    """
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode("utf-8"))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+def _bare(field: str) -> str:
+    return field.lstrip("-")
+
+
+def _typed(qs: QuerySet, fields: Sequence[str], values: Optional[list]) -> Optional[list]:
+    """
+    Convert decoded cursor values to the ordering fields' Python types.
+    Return None if any does not fit (callers fall back to the first
+    page), so a crafted cursor never reaches the query.
+    """
+    if values is None:
+        return None
+    typed = []
+    for field_name, value in zip(fields, values):
+        if value is None or isinstance(value, (list, dict)):
+            return None
+        field = qs.model._meta.get_field(_bare(field_name))
+        try:
+            value = field.to_python(value)
+            field.run_validators(value)
+        except (ValidationError, TypeError, ValueError):
+            return None
+        typed.append(value)
+    return typed
+
+
+def _flip(field: str) -> str:
+    return _bare(field) if field.startswith("-") else f"-{field}"
+
+
+def _seek(fields: Sequence[str], values: Sequence[Any], forward: bool) -> Q:
+    """
+    Build the row-value comparison "comes after (v1, v2, ...)" in the
+    ordering `fields` ("-" prefix = descending) as a chain of ORs, which
+    MySQL can satisfy from a matching composite index.
+    """
+    cond = Q()
+    for i, field in enumerate(fields):
+        ascending = not field.startswith("-")
+        op = "gt" if ascending == forward else "lt"
+        term = Q(**{f"{_bare(field)}__{op}": values[i]})
+        for prev_field, prev_value in zip(fields[:i], values[:i]):
+            term &= Q(**{_bare(prev_field): prev_value})
+        cond |= term
+    return cond
+
+
+def row_key(obj, fields: Sequence[str]) -> list:
+    """
+    Values of the ordering `fields` for a model instance or .values() dict.
+    """
+    if isinstance(obj, dict):
+        return [obj[_bare(f)] for f in fields]
+    return [getattr(obj, _bare(f)) for f in fields]
+
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated queryset plus the cursors needed to
+    navigate to its neighbours.
+    """
+    def __init__(self, items: list, page_size: int,
+                 next_cursor: Optional[str], prev_cursor: Optional[str]):
+        self.items = items
+        self.page_size = page_size
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.prev_cursor is not None
+
+
+def page_size_from(params, default_size: int, max_size: int) -> int:
+    """
+    Read ?page_size=, clamped to [1, max_size].
+    """
+    try:
+        size = int(params.get("page_size", default_size))
+    except (TypeError, ValueError):
+        return default_size
+    return max(1, min(size, max_size))
+
+
+def keyset_paginate(qs: QuerySet, params, fields: Sequence[str] = ("name", "id"),
+                    default_size: int = 24, max_size: int = 96) -> KeysetPage:
+    """
+    Seek-paginate `qs` on `fields` ("-" prefix = descending, last field
+    unique). ?after=<cursor> moves forward, ?before=<cursor> moves backward; each
+    page costs one indexed range scan of page_size + 1 rows, however deep.
+    """
+    size = page_size_from(params, default_size, max_size)
+    after = _typed(qs, fields, decode_cursor(params.get("after"), len(fields)))
+    before = (_typed(qs, fields, decode_cursor(params.get("before"), len(fields)))
+              if after is None else None)
+
+    def key(obj):
+        return row_key(obj, fields)
+
+    if before is not None:
+        rows = list(
+            qs.filter(_seek(fields, before, forward=False))
+            .order_by(*[_flip(f) for f in fields])[:size + 1]
+        )
+        has_more = len(rows) > size
+        items = rows[:size][::-1]
+        prev_cursor = encode_cursor(key(items[0])) if has_more and items else None
+        next_cursor = encode_cursor(key(items[-1])) if items else None
+        return KeysetPage(items, size, next_cursor, prev_cursor)
+
+    if after is not None:
+        qs = qs.filter(_seek(fields, after, forward=True))
+    rows = list(qs.order_by(*fields)[:size + 1])
+    items = rows[:size]
+    next_cursor = encode_cursor(key(items[-1])) if len(rows) > size else None
+    prev_cursor = encode_cursor(key(items[0])) if after is not None and items else None
+    return KeysetPage(items, size, next_cursor, prev_cursor)
+
+
+def cached_count(qs: QuerySet) -> int:
+    """
+    COUNT(*) of `qs`, shared for COUNT_CACHE_TIMEOUT seconds between all
+    requests that build the same SQL.
+    """
+    sql, params = qs.order_by().query.sql_with_params()
+    digest = hashlib.sha1(f"{sql}|{params!r}".encode("utf-8")).hexdigest()
+    key = f"shop:count:{digest}"
+    cache = caches[COUNT_CACHE_ALIAS]
+    count = cache.get(key)
+    if count is None:
+        count = qs.count()
+        cache.set(key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class KeysetPagination:
+    """
+    DRF paginator with the interface of PageNumberPagination that pages
+    with keyset_paginate: opaque ?after=/?before= tokens in next/previous
+    links, no COUNT(*) and no OFFSET. ?with_count=1 adds a cached "count".
+    """
+    def __init__(self, fields: Sequence[str], default_size: int, max_size: int):
+        self.fields = fields
+        self.default_size = default_size
+        self.max_size = max_size
+
+    def paginate_queryset(self, qs: QuerySet, request, view=None) -> list:
+        self.request = request
+        params = request.query_params
+        self.page = keyset_paginate(qs, params, self.fields,
+                                    self.default_size, self.max_size)
+        self.count = None
+        if params.get("with_count") in ("1", "true", "True"):
+            self.count = cached_count(qs)
+        return self.page.items
+
+    def _link(self, param: str, cursor: Optional[str]) -> Optional[str]:
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        for stale in ("after", "before", "page"):
+            url = remove_query_param(url, stale)
+        return replace_query_param(url, param, cursor)
+
+    def get_paginated_response(self, data) -> Response:
+        body = {
+            "next": self._link("after", self.page.next_cursor),
+            "previous": self._link("before", self.page.prev_cursor),
+            "results": data,
+        }
+        if self.count is not None:
+            body = {"count": self.count, **body}
+        return Response(body)
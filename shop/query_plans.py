@@ -0,0 +1,147 @@
+import json
+import re
+from typing import Callable, NamedTuple
+
+from django.db import connections
+from django.db.models import QuerySet
+
+from .models import Product, Review, Store
+from .pagination import _seek, row_key
+from .streaming import STREAM_CHUNK_SIZE
+from .views import API_PRODUCT_ORDERING, CATALOG_SORTS, REVIEW_ORDERING, STORE_ORDERING
+
+FULL_SCAN = "full scan"
+FILESORT = "filesort"
+
+_SQLITE_TABLE_SCAN = re.compile(r"\bSCAN (\w+)$")
+
+
+def _walk(node):
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value)
+
+
+def plan_issues(qs: QuerySet) -> set[str]:
+    """
+    EXPLAIN `qs` and report FULL_SCAN (a table read row by row without an
+    index) and/or FILESORT (rows sorted after fetching instead of read in
+    index order). Backends other than MySQL and SQLite report nothing.
+    """
+    vendor = connections[qs.db].vendor
+    issues = set()
+    if vendor == "mysql":
+        for node in _walk(json.loads(qs.explain(format="json"))):
+            if node.get("access_type") == "ALL":
+                issues.add(FULL_SCAN)
+            if node.get("using_filesort"):
+                issues.add(FILESORT)
+    elif vendor == "sqlite":
+        for line in qs.explain().splitlines():
+            detail = line.split(" ", 3)[-1]
+            if _SQLITE_TABLE_SCAN.search(detail):
+                issues.add(FULL_SCAN)
+            # Also "... FOR RIGHT PART OF ORDER BY": an index serving
+            # only the leading ORDER BY columns
+            if "USE TEMP B-TREE FOR" in detail:
+                issues.add(FILESORT)
+    return issues
+
+
+class PlanCase(NamedTuple):
+    """
+    One API access pattern: a queryset builder taking sample ids
+    (store, vendor, owner, product) and the plan issues it may have.
+    """
+    name: str
+    build: Callable[[dict], QuerySet]
+    allowed: frozenset = frozenset()
+
+
+def _after(qs: QuerySet, ordering, row) -> QuerySet:
+    """
+    `qs` seeked past `row` in `ordering`, as a cursor page reads it.
+    """
+    return qs.filter(_seek(ordering, row_key(row, ordering), forward=True)).order_by(*ordering)
+
+
+def _pages(label: str, qs: Callable[[dict], QuerySet], ordering,
+           row: Callable[[dict], object]) -> list[PlanCase]:
+    # First page and a page after a cursor: both must read in index order
+    return [
+        PlanCase(f"{label} page", lambda ids: qs(ids).order_by(*ordering)[:20]),
+        PlanCase(f"{label} page after cursor",
+                 lambda ids: _after(qs(ids), ordering, row(ids))[:20]),
+    ]
+
+
+def _product(ids):
+    return Product.objects.get(pk=ids["product"])
+
+
+def _store(ids):
+    return Store.objects.get(pk=ids["store"])
+
+
+# Access patterns of product_list, stores_products_api, vendor_stores,
+# view_stores and my_product_reviews, built from the orderings those views
+# use; each is backed by a Meta.indexes entry.
+API_PLAN_CASES = [
+    *[case for sort, ordering in CATALOG_SORTS.items()
+      for case in _pages(f"catalog by {sort}", lambda ids: Product.objects.all(), ordering,
+                         _product)],
+    *_pages("products by store", lambda ids: Product.objects.filter(store_id=ids["store"]),
+            API_PRODUCT_ORDERING, _product),
+    PlanCase("products in stock by store",
+             lambda ids: Product.objects.filter(store_id=ids["store"], stock__gt=0)
+                                        .order_by(*API_PRODUCT_ORDERING)),
+    # A range on price can't also deliver name order: reading the price
+    # index then sorting the (bounded) match set is the intended plan.
+    PlanCase("products by price range",
+             lambda ids: Product.objects.filter(price__gte=10, price__lte=20)
+                                        .order_by(*API_PRODUCT_ORDERING),
+             frozenset({FILESORT})),
+    # Products from several stores of one vendor are merged, then sorted
+    PlanCase("products by vendor",
+             lambda ids: Product.objects.filter(store__owner__vendor__id=ids["vendor"])
+                                        .order_by(*API_PRODUCT_ORDERING),
+             frozenset({FILESORT})),
+    *_pages("stores", lambda ids: Store.objects.all(), STORE_ORDERING, _store),
+    # One chunk of view_stores?stream=1 (shop.streaming.iter_rows)
+    PlanCase("stores stream chunk",
+             lambda ids: _after(Store.objects.all(), STORE_ORDERING, _store(ids))
+                         [:STREAM_CHUNK_SIZE]),
+    PlanCase("stores by vendor",
+             lambda ids: Store.objects.filter(owner__vendor__id=ids["vendor"])
+                                      .order_by(*STORE_ORDERING)),
+    PlanCase("reviews of one product",
+             lambda ids: Review.objects.filter(product__store__owner_id=ids["owner"],
+                                               product_id=ids["product"])
+                                       .order_by(*REVIEW_ORDERING)),
+    PlanCase("reviews of one product by rating",
+             lambda ids: Review.objects.filter(product__store__owner_id=ids["owner"],
+                                               product_id=ids["product"], rating=5)
+                                       .order_by(*REVIEW_ORDERING)),
+    # Reviews across all of an owner's products are merged, then sorted
+    PlanCase("reviews by owner",
+             lambda ids: Review.objects.filter(product__store__owner_id=ids["owner"])
+                                       .order_by(*REVIEW_ORDERING),
+             frozenset({FILESORT})),
+]
+
+
+def check_plans(ids: dict, cases=API_PLAN_CASES) -> dict[str, set[str]]:
+    """
+    Return {case name: unexpected issues} for every case whose plan has
+    issues beyond the ones it allows.
+    """
+    failures = {}
+    for case in cases:
+        unexpected = plan_issues(case.build(ids)) - case.allowed
+        if unexpected:
+            failures[case.name] = unexpected
+    return failures
@@ -0,0 +1,157 @@
+import hashlib
+import io
+import logging
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+from PIL import Image, ImageOps
+
+from . import page_cache
+from .models import Product
+
+log = logging.getLogger(__name__)
+
+
+class RenditionSize(NamedTuple):
+    name: str
+    width: int
+    # `sizes` attribute used when a template does not pass its own
+    sizes: str
+
+
+# Widest first; every size is emitted in each of FORMATS
+SIZES = (
+    RenditionSize("detail", 1200, "(min-width: 768px) 50vw, 100vw"),
+    RenditionSize("card", 480, "(min-width: 768px) 33vw, 100vw"),
+    RenditionSize("thumb", 160, "160px"),
+)
+SIZES_BY_NAME = {size.name: size for size in SIZES}
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+# Part of every file name: bump it when encoder settings change so
+# browsers and CDNs holding the old files forever see new names
+RENDITION_VERSION = "1"
+RENDITION_DIR = getattr(settings, "SHOP_RENDITION_DIR", "renditions")
+
+
+def rendition_name(digest: str, width: int, fmt: str) -> str:
+    """
+    Content-addressed storage name: the same source bytes always map to
+    the same names, so the files can be served with a far-future expiry.
+    """
+    return f"{RENDITION_DIR}/{digest[:2]}/{digest}-{width}w.{fmt}"
+
+
+def _flatten(im: Image.Image) -> Image.Image:
+    if im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info):
+        rgba = im.convert("RGBA")
+        bg = Image.new("RGB", im.size, (255, 255, 255))
+        bg.paste(rgba, mask=rgba.getchannel("A"))
+        return bg
+    return im if im.mode == "RGB" else im.convert("RGB")
+
+
+def build_renditions(source_name: str, storage=default_storage) -> dict:
+    """
+    Decode `source_name` once and write every size in every format,
+    skipping files that already exist (same content, same name).
+    Sizes wider than the source are capped at the source's width.
+    """
+    with storage.open(source_name, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(RENDITION_VERSION.encode() + data).hexdigest()[:32]
+
+    im = Image.open(io.BytesIO(data))
+    if im.format == "JPEG":
+        # Decode at the smallest libjpeg scale still covering the widest
+        # size whichever way EXIF rotates it
+        im.draft("RGB", (SIZES[0].width, SIZES[0].width))
+    im = ImageOps.exif_transpose(im)
+    has_alpha = im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info)
+    base = im.convert("RGBA") if has_alpha else _flatten(im)
+
+    out = {}
+    for size in SIZES:
+        width = min(size.width, base.width)
+        height = max(1, round(base.height * width / base.width))
+        resized = base if width == base.width else base.resize((width, height), Image.LANCZOS,
+                                                               reducing_gap=3.0)
+        entry = {"width": width, "height": height}
+        for fmt, (pil_format, options) in FORMATS.items():
+            name = rendition_name(digest, width, fmt)
+            if not storage.exists(name):
+                buf = io.BytesIO()
+                frame = resized if fmt == "webp" else _flatten(resized)
+                frame.save(buf, pil_format, **options)
+                storage.save(name, ContentFile(buf.getvalue()))
+            entry[fmt] = name
+        out[size.name] = entry
+        base = resized  # each smaller size is resized from the previous one
+    return out
+
+
+def mark_stale() -> int:
+    """
+    Queue every product whose renditions are missing or were built from
+    a different image (the backfill). Returns how many were queued.
+    """
+    return (Product.objects.exclude(image="").exclude(image__isnull=True)
+            .filter(renditions_pending=False)
+            .exclude(renditions_source=F("image"))
+            .update(renditions_pending=True))
+
+
+def process_pending(batch_size: int = 20) -> tuple[int, int]:
+    """
+    Build renditions for up to `batch_size` queued products. Results are
+    written only if the product still has the image they were built from,
+    so a concurrent upload is never overwritten with stale renditions.
+    Products whose image was removed just have their renditions cleared.
+    Returns (done, failed).
+    """
+    rows = list(Product.objects.filter(renditions_pending=True)
+                .order_by("id").values_list("id", "image")[:batch_size])
+    done = failed = 0
+    for pk, source in rows:
+        renditions: dict = {}
+        if source:
+            try:
+                renditions = build_renditions(source)
+            except Exception:
+                # Any decoder error (Pillow also raises ValueError/SyntaxError
+                # on malformed files) fails this product only, not the batch.
+                # Not retried until the image changes or a --backfill
+                log.exception("Renditions for product %s failed", pk)
+                failed += 1
+        same_image = Q(image=source) if source else Q(image="") | Q(image__isnull=True)
+        updated = (Product.objects.filter(same_image, pk=pk)
+                   .update(renditions=renditions, renditions_source=source if renditions else "",
+                           renditions_pending=False))
+        if updated and renditions:
+            page_cache.invalidate(page_cache.CATALOG, page_cache.product_scope(pk))
+        if updated and (renditions or not source):
+            done += 1
+    return done, failed
+
+
+def srcset(product: Product, fmt: str) -> Optional[str]:
+    """
+    "url 160w, url 480w, ..." for `product`'s current image, or None
+    when its renditions are missing or stale.
+    """
+    if not product.image or product.renditions_source != product.image.name:
+        return None
+    entries = sorted(product.renditions.values(), key=lambda e: e["width"])
+    seen = set()
+    parts = []
+    for entry in entries:
+        if entry["width"] in seen or fmt not in entry:
+            continue
+        seen.add(entry["width"])
+        parts.append(f"{default_storage.url(entry[fmt])} {entry['width']}w")
+    return ", ".join(parts) or None
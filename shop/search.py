@@ -0,0 +1,200 @@
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Optional
+
+from django.db import connection
+from django.db.models import FloatField, Func, QuerySet
+
+from .models import Product
+
+# InnoDB's default innodb_ft_min_token_size; shorter words are not indexed
+MIN_TOKEN_LEN = 3
+# A hit in the name counts this many times a hit in the description
+NAME_WEIGHT = 3
+# Above this many hits, filter in Python rather than with a huge IN (...)
+IN_CLAUSE_LIMIT = 500
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if len(t) >= MIN_TOKEN_LEN]
+
+
+# ---------- MySQL FULLTEXT ----------
+
+class MatchAgainst(Func):
+    """
+    MATCH (col, ...) AGAINST (%s IN NATURAL LANGUAGE MODE): the relevance
+    score from the product_name_desc_ft index (migration 0003).
+    """
+    output_field = FloatField()
+
+    def __init__(self, *expressions, query: str):
+        self.query = query
+        super().__init__(*expressions)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = super().as_sql(
+            compiler, connection,
+            template="MATCH (%(expressions)s) AGAINST (%%s IN NATURAL LANGUAGE MODE)",
+            **extra_context,
+        )
+        return sql, (*params, self.query)
+
+
+# ---------- in-process fallback (SQLite / tests) ----------
+
+class InvertedIndex:
+    """
+    Minimal in-memory inverted index over Product name + description,
+    ranked with tf-idf. Built lazily on first search and kept current by
+    the Product receivers in shop.signals.
+    """
+    def __init__(self):
+        self.postings: dict[str, dict[int, int]] = defaultdict(dict)
+        self.doc_terms: dict[int, set[str]] = {}
+        self.built = False
+        self.lock = threading.RLock()
+
+    def build(self, chunk_size: int = 2000) -> None:
+        with self.lock:
+            self.postings.clear()
+            self.doc_terms.clear()
+            rows = Product.objects.values_list("id", "name", "description")
+            for pk, name, description in rows.iterator(chunk_size=chunk_size):
+                self._add(pk, name, description)
+            self.built = True
+
+    def reset(self) -> None:
+        """
+        Forget everything; the next search rebuilds from the database.
+        """
+        with self.lock:
+            self.postings.clear()
+            self.doc_terms.clear()
+            self.built = False
+
+    def _add(self, pk: int, name: str, description: str) -> None:
+        weights: dict[str, int] = defaultdict(int)
+        for term in tokenize(name):
+            weights[term] += NAME_WEIGHT
+        for term in tokenize(description):
+            weights[term] += 1
+        for term, tf in weights.items():
+            self.postings[term][pk] = tf
+        self.doc_terms[pk] = set(weights)
+
+    def remove(self, pk: int) -> None:
+        with self.lock:
+            for term in self.doc_terms.pop(pk, ()):
+                docs = self.postings.get(term)
+                if docs is not None:
+                    docs.pop(pk, None)
+                    if not docs:
+                        del self.postings[term]
+
+    def update(self, pk: int, name: str, description: str) -> None:
+        with self.lock:
+            if not self.built:
+                return
+            self.remove(pk)
+            self._add(pk, name, description)
+
+    def search(self, query: str) -> dict[int, float]:
+        """
+        Return {product_id: score} for products matching any query term.
+        """
+        with self.lock:
+            if not self.built:
+                self.build()
+            n_docs = max(len(self.doc_terms), 1)
+            scores: dict[int, float] = defaultdict(float)
+            for term in set(tokenize(query)):
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + n_docs / len(docs))
+                for pk, tf in docs.items():
+                    scores[pk] += (1 + math.log(tf)) * idf
+            return dict(scores)
+
+
+fallback_index = InvertedIndex()
+
+
+class RankedResults:
+    """
+    List-like view of fallback search hits, ordered by relevance, that
+    only loads the Product rows of the slice being paginated.
+    """
+    def __init__(self, qs: QuerySet, scores: dict[int, float]):
+        self.qs = qs
+        self.scores = scores
+        self._ids: Optional[list[int]] = None
+
+    def _ranked_ids(self) -> list[int]:
+        if self._ids is None:
+            # Apply the caller's other filters to the candidate ids
+            if not self.scores:
+                allowed = set()
+            elif not self.qs.query.where:
+                allowed = self.scores.keys()
+            elif len(self.scores) <= IN_CLAUSE_LIMIT:
+                allowed = set(self.qs.filter(id__in=list(self.scores))
+                              .values_list("id", flat=True))
+            else:
+                allowed = set(self.qs.values_list("id", flat=True)) & self.scores.keys()
+            self._ids = sorted(allowed, key=lambda pk: (-self.scores[pk], pk))
+        return self._ids
+
+    def count(self) -> int:
+        return len(self._ranked_ids())
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, index):
+        ids = self._ranked_ids()[index]
+        if not isinstance(index, slice):
+            ids = [ids]
+        # The caller's queryset may yield instances or .values() dicts
+        rows = {}
+        for row in self.qs.filter(id__in=ids):
+            if isinstance(row, dict):
+                rows[row["id"]] = row
+            else:
+                rows[row.id] = row
+        out = []
+        for pk in ids:
+            if pk in rows:
+                if isinstance(rows[pk], dict):
+                    rows[pk]["relevance"] = self.scores[pk]
+                else:
+                    rows[pk].relevance = self.scores[pk]
+                out.append(rows[pk])
+        return out if isinstance(index, slice) else out[0]
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+def search_products(qs: QuerySet, query: str):
+    """
+    Full-text search of `qs` over name and description, most relevant
+    first. Uses the MySQL FULLTEXT index when available and the
+    in-process inverted index otherwise. Queries with no indexable word
+    (all shorter than MIN_TOKEN_LEN) fall back to a name substring match.
+    """
+    if not tokenize(query):
+        return qs.filter(name__icontains=query)
+
+    if connection.vendor == "mysql":
+        relevance = MatchAgainst("name", "description", query=query)
+        return (qs.annotate(relevance=relevance)
+                  .filter(relevance__gt=0)
+                  .order_by("-relevance", "name", "id"))
+
+    return RankedResults(qs, fallback_index.search(query))
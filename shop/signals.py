@@ -1,8 +1,12 @@
-
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
-from .models import Profile
+from . import page_cache
+from .search import fallback_index
+from .helpers import apply_review_rating, forget_role
+from .models import Product, Profile, Review, Store
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
@@ -12,4 +16,147 @@ def create_or_update_profile(sender, instance, created, **kwargs):
         Profile.objects.create(user=instance)
     else:
         # user saved again -> make sure a profile exists
-        Profile.objects.get_or_create(user=instance)
\ No newline at end of file
+        Profile.objects.get_or_create(user=instance)
+
+
+# ---------- catalog page cache invalidation ----------
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_pages(sender, instance, **kwargs):
+    page_cache.invalidate(page_cache.CATALOG,
+                          page_cache.product_scope(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Store)
+def invalidate_store_pages(sender, instance, **kwargs):
+    # Deleting a store cascades to its products, which invalidate themselves
+    page_cache.invalidate(page_cache.CATALOG)
+
+
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_review_pages(sender, instance, **kwargs):
+    # Catalog cards show the rating summary too
+    page_cache.invalidate(page_cache.CATALOG,
+                          page_cache.product_scope(instance.product_id))
+
+
+@receiver(m2m_changed, sender=Profile.purchased_products.through)
+def invalidate_verified_badges(sender, instance, action, reverse, pk_set, **kwargs):
+    # A purchase flips the reviewer's "Verified" badge on that product
+    if action in ("post_add", "post_remove"):
+        product_ids = [instance.pk] if reverse else pk_set
+    elif action == "post_clear" and reverse:
+        product_ids = [instance.pk]
+    elif action == "pre_clear" and not reverse:
+        product_ids = list(instance.purchased_products.values_list("pk", flat=True))
+    else:
+        return
+    page_cache.invalidate(*[page_cache.product_scope(pk) for pk in product_ids])
+
+
+
+# ---------- Product review aggregates ----------
+
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance, **kwargs):
+    instance._previous_rating = None
+    if instance.pk and not instance._state.adding:
+        instance._previous_rating = (
+            Review.objects.filter(pk=instance.pk)
+            .values_list("product_id", "rating").first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def add_review_to_aggregates(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_rating", None)
+    if previous == (instance.product_id, instance.rating):
+        return
+    if previous:
+        apply_review_rating(previous[0], previous[1], -1)
+    apply_review_rating(instance.product_id, instance.rating, 1)
+
+
+def _deleting_products(origin) -> bool:
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model in (Product, Store)
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_from_aggregates(sender, instance, origin=None, **kwargs):
+    # Skip when the product itself is going away with its reviews
+    if origin is not None and _deleting_products(origin):
+        return
+    apply_review_rating(instance.product_id, instance.rating, -1)
+
+
+
+# ---------- cached vendor role (helpers._is_vendor) ----------
+
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+def forget_role_on_group_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            forget_role(instance.pk, instance)
+        return
+    # Changed from the group side: instance is a Group
+    if action in ("post_add", "post_remove"):
+        user_ids = pk_set or ()
+    elif action == "pre_clear":
+        user_ids = list(instance.user_set.values_list("pk", flat=True))
+    else:
+        return
+    for user_id in user_ids:
+        forget_role(user_id)
+
+
+@receiver(pre_save, sender=Store)
+def remember_previous_owner(sender, instance, **kwargs):
+    instance._previous_owner_id = None
+    if instance.pk and not instance._state.adding:
+        instance._previous_owner_id = (
+            Store.objects.filter(pk=instance.pk).values_list("owner_id", flat=True).first()
+        )
+
+
+@receiver([post_save, post_delete], sender=Store)
+def forget_role_on_store_change(sender, instance, **kwargs):
+    forget_role(instance.owner_id)
+    # Ownership moved: the old owner may no longer be a vendor
+    previous = getattr(instance, "_previous_owner_id", None)
+    if previous and previous != instance.owner_id:
+        forget_role(previous)
+
+
+
+# ---------- in-process search index (shop.search fallback) ----------
+
+@receiver(post_save, sender=Product)
+def reindex_product(sender, instance, **kwargs):
+    fallback_index.update(instance.pk, instance.name, instance.description)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    fallback_index.remove(instance.pk)
+
+
+
+# ---------- image renditions (shop.renditions) ----------
+
+@receiver(pre_save, sender=Product)
+def queue_renditions(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and "image" not in update_fields):
+        return
+    if instance._state.adding:
+        previous = None
+    else:
+        previous = Product.objects.filter(pk=instance.pk).values_list("image", flat=True).first()
+    current = instance.image.name if instance.image else ""
+    if current != (previous or "") and current != instance.renditions_source:
+        instance.renditions_pending = True
+        if update_fields is not None:
+            # save(update_fields=...) would not write the flag itself
+            Product.objects.filter(pk=instance.pk).update(renditions_pending=True)
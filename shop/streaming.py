@@ -0,0 +1,105 @@
+import csv
+import io
+import zlib
+from typing import Iterable, Iterator, Sequence
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+
+from .pagination import _seek, row_key
+
+# Rows fetched per round trip and emitted per chunk of a streamed body
+STREAM_CHUNK_SIZE = getattr(settings, "SHOP_STREAM_CHUNK_SIZE", 500)
+
+
+def iter_rows(qs: QuerySet, ordering: Sequence[str] = ("id",),
+              chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator:
+    """
+    Rows of `qs` in `ordering` (last field unique), read `chunk_size` at a
+    time with keyset seeks. A bare .iterator() is buffered whole by the
+    MySQL client; this keeps memory bounded on every backend. Each chunk
+    is one index range read only if `ordering` matches an index (for
+    view_stores, store_name_id_idx); shop.query_plans checks that.
+    """
+    qs = qs.order_by(*ordering)
+    last = None
+    while True:
+        chunk = qs if last is None else qs.filter(_seek(ordering, last, forward=True))
+        rows = list(chunk[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last = row_key(rows[-1], ordering)
+
+
+def _batched(rows: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def json_array_chunks(rows: Iterable, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Encode `rows` as one JSON array, yielding a string every
+    `chunk_size` rows instead of building the whole body.
+    """
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    yield "["
+    for i, batch in enumerate(_batched(rows, chunk_size)):
+        yield ("," if i else "") + ",".join(encoder.encode(row) for row in batch)
+    yield "]"
+
+
+def ndjson_chunks(rows: Iterable, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """
+    One JSON object per line, `chunk_size` lines per yielded string.
+    """
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    for batch in _batched(rows, chunk_size):
+        yield "".join(encoder.encode(row) + "\n" for row in batch)
+
+
+def csv_chunks(header: Sequence[str], rows: Iterable,
+               chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """
+    CSV with a `header` line; each row is a dict keyed by header names
+    (missing keys are left empty). `chunk_size` rows per yielded string.
+    """
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=header, extrasaction="ignore")
+    writer.writeheader()
+    for batch in _batched(rows, chunk_size):
+        writer.writerows(batch)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def gzip_chunks(chunks: Iterable[str], level: int = 6) -> Iterator[bytes]:
+    """
+    Gzip a stream of text chunks incrementally (one compressor, no
+    buffering of the whole body).
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_json_array(qs: QuerySet, ordering: Sequence[str] = ("id",),
+                      chunk_size: int = STREAM_CHUNK_SIZE) -> StreamingHttpResponse:
+    return StreamingHttpResponse(
+        json_array_chunks(iter_rows(qs, ordering, chunk_size), chunk_size),
+        content_type="application/json",
+    )
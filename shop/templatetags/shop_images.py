@@ -0,0 +1,42 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from ..renditions import SIZES_BY_NAME, srcset
+
+register = template.Library()
+
+
+@register.simple_tag
+def product_image(product, size: str = "card", sizes: str = "", **attrs):
+    """
+    <picture> for a product image: WebP and JPEG srcsets over every
+    rendition, `size` picking the fallback src and default `sizes`.
+    Products whose renditions are not built yet get a plain <img> of the
+    original upload. Extra keyword arguments become <img> attributes:
+
+        {% product_image product "card" class="card-img-top" %}
+    """
+    if not product.image:
+        return ""
+    attrs.setdefault("alt", product.name)
+    attrs.setdefault("loading", "lazy")
+    jpeg_srcset = srcset(product, "jpeg")
+    if jpeg_srcset is None:
+        return format_html("<img{}>", flatatt({"src": product.image.url, **attrs}))
+
+    spec = SIZES_BY_NAME[size]
+    sizes = sizes or spec.sizes
+    entry = product.renditions.get(size) or next(iter(product.renditions.values()))
+    img = {
+        "src": product.image.storage.url(entry["jpeg"]),
+        "srcset": jpeg_srcset,
+        "sizes": sizes,
+        "width": entry["width"],
+        "height": entry["height"],
+        **attrs,
+    }
+    webp_srcset = srcset(product, "webp")
+    source = (format_html('<source type="image/webp" srcset="{}" sizes="{}">', webp_srcset, sizes)
+              if webp_srcset else "")
+    return format_html("<picture>{}<img{}></picture>", source, flatatt(img))
@@ -1,3 +1,1549 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import multiprocessing
+import os
+import re
+import runpy
+import tempfile
+import time
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.backends.sqlite3 import base as sqlite_base
+import threading
+from contextlib import contextmanager
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.test import (RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings, skipUnlessDBFeature)
+from django.template import Context, Template
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from unittest import skipUnless
+from PIL import Image
+
+from . import page_cache, renditions
+from .basket import Basket, CacheBasketStore, SessionBasketStore
+from .functions.announce import enqueue_announcement, process_pending
+from .functions.token_store import FileTokenStore
+from .functions.tweet import (TwitterAPI, TwitterClient, TwitterHTTPError, TwitterMediaError,
+                              prepare_image)
+from .dbconn import (InstrumentedConnectionMixin, PooledConnectionMixin,
+                     connect_stats, reset_connect_stats)
+from .helpers import _is_vendor, mark_user_has_purchased, verified_reviewer_ids
+from .management.commands import bootstrap
+from .models import (PRODUCT_PUBLIC_FIELDS, STORE_PUBLIC_FIELDS, AnnouncementJob, Order,
+                     OrderItem, OutboundEmail, Product, ProductPublicSerializer,
+                     Review, Store, StorePublicSerializer, StoreSerializer,
+                     Vendor, product_public_data, store_public_data)
+from .orders import InsufficientStock, place_order
+from .outbox import enqueue_email, send_pending
+from .pagination import decode_cursor, encode_cursor
+from .query_plans import FILESORT, FULL_SCAN, check_plans, plan_issues
+from .renditions import mark_stale as mark_stale_renditions
+from .renditions import process_pending as process_renditions
+from .search import fallback_index, search_products
+from .streaming import json_array_chunks
+
+
+def make_store(username="vendor", name="Store"):
+    owner = User.objects.create_user(username=username, password="pw")
+    return Store.objects.create(owner=owner, name=name)
+
+
+def make_product(store, name="Widget", price="9.99", stock=10):
+    return Product.objects.create(store=store, name=name, description="desc",
+                                  price=Decimal(price), stock=stock)
+
+
+class VerifiedReviewersTests(TestCase):
+    def setUp(self):
+        self.product = make_product(make_store())
+
+    def _add_reviews(self, n, purchased_every=2):
+        for i in range(n):
+            user = User.objects.create_user(username=f"u{i}-{n}", password="pw")
+            if i % purchased_every == 0:
+                mark_user_has_purchased(user, products=[self.product])
+            Review.objects.create(product=self.product, user=user, rating=5)
+
+    def test_returns_only_buyers(self):
+        self._add_reviews(4)
+        reviews = list(self.product.reviews.all())
+        with self.assertNumQueries(1):
+            verified = verified_reviewer_ids(self.product, reviews)
+        expected = {r.user_id for r in reviews if r.user.username in ("u0-4", "u2-4")}
+        self.assertEqual(verified, expected)
+
+    def test_product_detail_query_count_is_constant(self):
+        url = reverse("product_detail", args=[self.product.id])
+        self._add_reviews(2)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        self._add_reviews(20)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(len(response.context["reviews"]), 22)
+
+
+class ProductListKeysetTests(TestCase):
+    def setUp(self):
+        store = make_store()
+        # Duplicate names make `id` the tie-breaker
+        for i in range(7):
+            make_product(store, name=f"P{i // 2}")
+        self.url = reverse("product_list")
+        self.expected = list(Product.objects.order_by("name", "id"))
+
+    def _walk(self, direction, params):
+        pages = []
+        while params:
+            response = self.client.get(self.url, params)
+            page = response.context["page"]
+            pages.append([p.id for p in page.items])
+            cursor = page.next_cursor if direction == "after" else page.prev_cursor
+            params = {direction: cursor, "page_size": 3} if cursor else None
+        return pages
+
+    def test_forward_walk_visits_every_product_once(self):
+        pages = self._walk("after", {"page_size": 3})
+        self.assertEqual(pages[0], [p.id for p in self.expected[:3]])
+        self.assertEqual(sum(pages, []), [p.id for p in self.expected])
+
+    def test_backward_walk_from_last_page(self):
+        last = self.expected[-1]
+        before = encode_cursor([last.name, last.id])
+        pages = self._walk("before", {"before": before, "page_size": 3})
+        flat = sum(reversed(pages), [])
+        self.assertEqual(flat, [p.id for p in self.expected[:-1]])
+
+    def test_page_size_is_clamped_and_bad_cursor_ignored(self):
+        response = self.client.get(self.url, {"page_size": 10_000, "after": "!!"})
+        self.assertEqual(response.context["page"].page_size, 96)
+        self.assertEqual(len(response.context["products"]), 7)
+        self.assertIsNone(decode_cursor("!!", 2))
+
+    def test_cursor_with_wrong_types_falls_back_to_first_page(self):
+        first = [p.id for p in self.expected[:3]]
+        for values in (["x", "abc"], [["x"], 1], ["x", 2 ** 70], ["x", None]):
+            for direction in ("after", "before"):
+                response = self.client.get(self.url, {direction: encode_cursor(values),
+                                                      "page_size": 3})
+                self.assertEqual([p.id for p in response.context["page"].items], first)
+
+    def test_deep_page_query_count_matches_first_page(self):
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(self.url, {"page_size": 2})
+        mid = self.expected[4]
+        with CaptureQueriesContext(connection) as deep:
+            self.client.get(self.url, {"page_size": 2,
+                                       "after": encode_cursor([mid.name, mid.id])})
+        self.assertEqual(len(first), len(deep))
+
+
+class CatalogPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.store = make_store()
+        self.product = make_product(self.store)
+        self.list_url = reverse("product_list")
+        self.detail_url = reverse("product_detail", args=[self.product.id])
+
+    def test_anonymous_list_is_served_from_cache(self):
+        self.client.get(self.list_url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url)
+        self.assertContains(response, "Widget")
+        self.assertEqual(page_cache.stats()["product_list"]["hits"], 1)
+        self.assertEqual(page_cache.stats()["product_list"]["misses"], 1)
+
+    def test_product_save_invalidates_list(self):
+        self.client.get(self.list_url)
+        self.product.name = "Gadget"
+        self.product.save()
+        self.assertContains(self.client.get(self.list_url), "Gadget")
+
+    def test_authenticated_list_is_not_cached(self):
+        self.client.force_login(User.objects.create_user("shopper", password="pw"))
+        self.client.get(self.list_url)
+        self.client.get(self.list_url)
+        self.assertEqual(page_cache.stats()["product_list"]["hits"], 0)
+
+    def test_reviews_fragment_cached_and_invalidated_by_review(self):
+        self.client.get(self.detail_url)
+        with self.assertNumQueries(1):  # the product itself
+            self.client.get(self.detail_url)
+        buyer = User.objects.create_user("buyer", password="pw")
+        Review.objects.create(product=self.product, user=buyer, rating=4,
+                              comment="Solid")
+        self.assertContains(self.client.get(self.detail_url), "Solid")
+
+    def test_purchase_flips_verified_badge(self):
+        buyer = User.objects.create_user("buyer", password="pw")
+        Review.objects.create(product=self.product, user=buyer, rating=4)
+        self.assertContains(self.client.get(self.detail_url), "Unverified")
+        mark_user_has_purchased(buyer, products=[self.product])
+        self.assertNotContains(self.client.get(self.detail_url), "Unverified")
+
+
+class ReviewAggregateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = make_product(make_store())
+        self.users = [User.objects.create_user(f"r{i}", password="pw") for i in range(3)]
+
+    def _assert_aggregates(self, count, total, hist):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_count, count)
+        self.assertEqual(self.product.rating_sum, total)
+        self.assertEqual(self.product.rating_histogram, hist)
+        self.assertAlmostEqual(self.product.rating_avg, total / count if count else 0)
+
+    def test_insert_update_delete_keep_aggregates_in_step(self):
+        a = Review.objects.create(product=self.product, user=self.users[0], rating=5)
+        Review.objects.create(product=self.product, user=self.users[1], rating=2)
+        self._assert_aggregates(2, 7, {1: 0, 2: 1, 3: 0, 4: 0, 5: 1})
+
+        a.rating = 4
+        a.save()
+        self._assert_aggregates(2, 6, {1: 0, 2: 1, 3: 0, 4: 1, 5: 0})
+
+        a.delete()
+        self._assert_aggregates(1, 2, {1: 0, 2: 1, 3: 0, 4: 0, 5: 0})
+
+        Review.objects.filter(product=self.product).delete()
+        self._assert_aggregates(0, 0, {1: 0, 2: 0, 3: 0, 4: 0, 5: 0})
+
+    def test_rebuild_command_restores_drifted_aggregates(self):
+        for user, rating in zip(self.users, (1, 3, 3)):
+            Review.objects.create(product=self.product, user=user, rating=rating)
+        Product.objects.update(rating_count=0, rating_sum=0, stars_3=9, rating_avg=0)
+        call_command("rebuild_review_aggregates", batch_size=1, stdout=StringIO())
+        self._assert_aggregates(3, 7, {1: 1, 2: 0, 3: 2, 4: 0, 5: 0})
+
+    def test_catalog_sorts_by_average_rating(self):
+        other = make_product(self.product.store, name="Another")
+        Review.objects.create(product=self.product, user=self.users[0], rating=2)
+        Review.objects.create(product=other, user=self.users[0], rating=5)
+        response = self.client.get(reverse("product_list"), {"sort": "rating"})
+        self.assertEqual([p.id for p in response.context["products"]],
+                         [other.id, self.product.id])
+
+    def test_vendor_review_summary_reads_aggregates(self):
+        owner = self.product.store.owner
+        Vendor.objects.create(user=owner, vendor_name="V")
+        for user, rating in zip(self.users, (4, 4, 1)):
+            Review.objects.create(product=self.product, user=user, rating=rating)
+        self.client.force_login(owner)
+        url = reverse("my_product_reviews")
+        summary = self.client.get(url).json()["summary"]
+        self.assertEqual(summary, {"count": 3, "avg_rating": 3.0})
+        summary = self.client.get(url, {"rating": 4}).json()["summary"]
+        self.assertEqual(summary, {"count": 2, "avg_rating": 4.0})
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.product = make_product(make_store(), stock=3)
+        self.buyer = User.objects.create_user("buyer", email="b@example.com",
+                                              password="pw")
+        self.client.force_login(self.buyer)
+
+    def _checkout_with(self, quantity):
+        self.client.post(reverse("add_to_basket", args=[self.product.id]))
+        session = self.client.session
+        session["basket"][str(self.product.id)]["quantity"] = quantity
+        session.save()
+        return self.client.post(reverse("checkout"))
+
+    def test_checkout_persists_order_and_decrements_stock(self):
+        self._checkout_with(2)
+        order = Order.objects.get(user=self.buyer)
+        item = order.items.get()
+        self.assertEqual((item.product_id, item.quantity, item.price),
+                         (self.product.id, 2, Decimal("9.99")))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+        self.assertEqual(OutboundEmail.objects.filter(to=["b@example.com"]).count(), 1)
+        self.assertTrue(self.buyer.profile.purchased_products.filter(pk=self.product.pk).exists())
+
+    def test_oversell_fails_cleanly(self):
+        response = self._checkout_with(4)
+        self.assertRedirects(response, reverse("basket_detail"))
+        self.assertFalse(Order.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_failed_line_rolls_back_earlier_lines(self):
+        other = make_product(self.product.store, name="Other", stock=1)
+        items = [{"product": self.product, "quantity": 1, "price": "9.99"},
+                 {"product": other, "quantity": 2, "price": "9.99"}]
+        with self.assertRaises(InsufficientStock):
+            place_order(self.buyer, items)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+        self.assertFalse(OrderItem.objects.exists())
+
+
+@skipUnlessDBFeature("test_db_allows_multiple_connections")
+class ConcurrentCheckoutTests(TransactionTestCase):
+    def test_parallel_checkouts_never_oversell(self):
+        stock, buyers = 5, 12
+        product = make_product(make_store(), stock=stock)
+        users = [User.objects.create_user(f"c{i}", password="pw") for i in range(buyers)]
+        outcomes = []
+        barrier = threading.Barrier(buyers)
+
+        def buy(user):
+            try:
+                barrier.wait()
+                place_order(user, [{"product": product, "quantity": 1,
+                                    "price": product.price}])
+                outcomes.append("ok")
+            except InsufficientStock:
+                outcomes.append("sold out")
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy, args=(u,)) for u in users]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        product.refresh_from_db()
+        self.assertEqual(outcomes.count("ok"), stock)
+        self.assertEqual(outcomes.count("sold out"), buyers - stock)
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(OrderItem.objects.filter(product=product).count(), stock)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError("relay down")
+
+
+class WorkerCrash(BaseException):
+    """
+    Stands in for the worker dying mid-batch (not caught per message).
+    """
+
+
+class CrashingEmailBackend(BaseEmailBackend):
+    """
+    Delivers the first message it is given, then the worker "dies".
+    """
+    delivered: list = []
+
+    def send_messages(self, email_messages):
+        if CrashingEmailBackend.delivered:
+            raise WorkerCrash()
+        CrashingEmailBackend.delivered.extend(email_messages)
+        return len(email_messages)
+
+
+class OutboxTests(TestCase):
+    def test_views_only_enqueue(self):
+        User.objects.create_user("forgetful", email="f@example.com", password="pw")
+        self.client.post(reverse("forgot_username"), {"email": "f@example.com"})
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmail.PENDING)
+
+    def test_worker_sends_batch_over_locmem(self):
+        for i in range(3):
+            enqueue_email(f"Hello {i}", "body", [f"u{i}@example.com"],
+                          html_body="<p>body</p>")
+        call_command("send_queued_email", batch_size=2, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], "text/html")
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.SENT).exists())
+
+    @override_settings(EMAIL_BACKEND="shop.tests.FailingEmailBackend",
+                       OUTBOX_MAX_ATTEMPTS=2)
+    def test_failures_back_off_then_give_up(self):
+        msg = enqueue_email("Hi", "body", ["x@example.com"])
+        self.assertEqual(send_pending(), (0, 1))
+        msg.refresh_from_db()
+        self.assertEqual((msg.status, msg.attempts), (OutboundEmail.PENDING, 1))
+        self.assertIn("relay down", msg.last_error)
+        # Not due yet: backoff holds it back
+        self.assertEqual(send_pending(), (0, 0))
+
+        OutboundEmail.objects.update(next_attempt_at=msg.created_at)
+        send_pending()
+        msg.refresh_from_db()
+        self.assertEqual((msg.status, msg.attempts), (OutboundEmail.FAILED, 2))
+
+    @override_settings(EMAIL_BACKEND="shop.tests.CrashingEmailBackend")
+    def test_crash_mid_batch_keeps_delivered_marks_and_leases_the_rest(self):
+        CrashingEmailBackend.delivered = []
+        first, second = (enqueue_email(f"Hi {i}", "body", ["x@example.com"]) for i in range(2))
+        with self.assertRaises(WorkerCrash):
+            send_pending()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, OutboundEmail.SENT)
+        # Still leased: no other worker picks it up until the lease expires
+        self.assertEqual(second.status, OutboundEmail.PENDING)
+        self.assertGreater(second.next_attempt_at, timezone.now())
+        self.assertEqual(send_pending(), (0, 0))
+
+
+class BasketStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = make_product(make_store(), price="2.50")
+
+    def test_cache_store_is_independent_of_session(self):
+        basket = Basket(store=CacheBasketStore("user:42"))
+        basket.add(self.product, quantity=2)
+        again = Basket(store=CacheBasketStore("user:42"))
+        self.assertEqual(len(again), 2)
+        self.assertEqual(again.get_total_price(), Decimal("5.00"))
+        again.clear()
+        self.assertEqual(len(Basket(store=CacheBasketStore("user:42"))), 0)
+
+    def test_snapshot_lines_render_with_one_existence_query(self):
+        basket = Basket(store=CacheBasketStore("user:7"))
+        basket.add(self.product)
+        with self.assertNumQueries(1):
+            (line,) = list(basket)
+        self.assertEqual((line["product"].id, line["product"].name),
+                         (self.product.id, "Widget"))
+        (line,) = list(basket.lines(fetch_products=True))
+        self.assertIsInstance(line["product"], Product)
+
+    def test_reading_session_basket_does_not_dirty_session(self):
+        session = SessionStore()
+        Basket(store=SessionBasketStore(session))
+        self.assertFalse(session.modified)
+
+    @override_settings(BASKET_STORE="shop.basket.CacheBasketStore")
+    def test_views_use_configured_store(self):
+        buyer = User.objects.create_user("shopper", password="pw")
+        self.client.force_login(buyer)
+        self.client.post(reverse("add_to_basket", args=[self.product.id]))
+        response = self.client.get(reverse("basket_detail"))
+        self.assertNotIn("basket", self.client.session)
+        self.assertContains(response, "Widget")
+        self.assertEqual(len(Basket(store=CacheBasketStore(f"user:{buyer.pk}"))), 1)
+
+
+class BasketSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        store = make_store()
+        self.a = make_product(store, name="A", price="1.50")
+        self.b = make_product(store, name="B", price="2.00")
+        self.basket = Basket(store=CacheBasketStore("user:summary"))
+        self.basket.add(self.a, quantity=2)
+        self.basket.add(self.b)
+
+    def test_fetch_pass_is_single_query_and_memoized(self):
+        with self.assertNumQueries(1):
+            lines = self.basket.lines(fetch_products=True)
+            list(self.basket)
+            self.basket.lines(fetch_products=True)
+            total, count = self.basket.get_total_price(), len(self.basket)
+        self.assertEqual(len(lines), 2)
+        self.assertEqual((total, count), (Decimal("5.00"), 3))
+
+    def test_changes_invalidate_memo(self):
+        self.assertEqual(len(self.basket), 3)
+        self.basket.remove(self.a)
+        self.assertEqual(len(self.basket), 1)
+        self.assertEqual(self.basket.get_total_price(), Decimal("2.00"))
+        self.basket.clear()
+        self.assertEqual(list(self.basket), [])
+
+    def test_deleted_products_are_pruned(self):
+        self.b.delete()
+        lines = self.basket.lines(fetch_products=True)
+        self.assertEqual([line["product"].id for line in lines], [self.a.id])
+        self.assertEqual(self.basket.get_total_price(), Decimal("3.00"))
+        self.assertEqual(len(Basket(store=CacheBasketStore("user:summary"))), 2)
+
+    def test_deleted_products_are_pruned_from_snapshot_lines(self):
+        self.b.delete()
+        self.assertEqual([line["product"].id for line in self.basket], [self.a.id])
+        self.assertEqual(len(Basket(store=CacheBasketStore("user:summary"))), 2)
+
+    @override_settings(BASKET_STORE="shop.basket.CacheBasketStore")
+    def test_remove_view_accepts_deleted_product(self):
+        buyer = User.objects.create_user("shopper", password="pw")
+        self.client.force_login(buyer)
+        url = reverse("remove_from_basket", args=[self.b.id])
+        self.client.post(reverse("add_to_basket", args=[self.b.id]))
+        self.b.delete()
+        response = self.client.post(url)
+        self.assertRedirects(response, reverse("basket_detail"))
+        self.assertEqual(len(Basket(store=CacheBasketStore(f"user:{buyer.pk}"))), 0)
+
+
+@override_settings(SHOP_ROLE_CACHE_TIMEOUT=300)
+class RoleCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("maybe", password="pw")
+
+    def fresh(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_resolved_once_then_served_from_cache(self):
+        user = self.fresh()
+        with self.assertNumQueries(2):  # groups + stores
+            self.assertFalse(_is_vendor(user))
+            self.assertFalse(_is_vendor(user))
+        user = self.fresh()
+        with self.assertNumQueries(0):
+            self.assertFalse(_is_vendor(user))
+
+    def test_group_membership_change_invalidates(self):
+        self.assertFalse(_is_vendor(self.fresh()))
+        group, _ = Group.objects.get_or_create(name="Vendors")
+        with self.captureOnCommitCallbacks(execute=True):
+            group.user_set.add(self.user)
+        self.assertTrue(_is_vendor(self.fresh()))
+        with self.captureOnCommitCallbacks(execute=True):
+            group.user_set.clear()
+        self.assertFalse(_is_vendor(self.fresh()))
+
+    def test_store_ownership_change_invalidates(self):
+        self.assertFalse(_is_vendor(self.fresh()))
+        with self.captureOnCommitCallbacks(execute=True):
+            store = Store.objects.create(owner=self.user, name="Mine")
+        self.assertTrue(_is_vendor(self.fresh()))
+        with self.captureOnCommitCallbacks(execute=True):
+            store.delete()
+        self.assertFalse(_is_vendor(self.fresh()))
+
+    def test_cache_forgotten_only_on_commit(self):
+        self.assertFalse(_is_vendor(self.fresh()))
+        with self.captureOnCommitCallbacks(execute=True):
+            Store.objects.create(owner=self.user, name="Mine")
+            # Not committed yet: a concurrent request still reads the old role
+            self.assertFalse(_is_vendor(self.fresh()))
+        self.assertTrue(_is_vendor(self.fresh()))
+
+    def test_ownership_transfer_forgets_previous_owner(self):
+        store = Store.objects.create(owner=self.user, name="Mine")
+        self.assertTrue(_is_vendor(self.fresh()))
+        buyer = User.objects.create_user("buyer", password="pw")
+        store.owner = buyer
+        with self.captureOnCommitCallbacks(execute=True):
+            store.save()
+        self.assertFalse(_is_vendor(self.fresh()))
+        self.assertTrue(_is_vendor(User.objects.get(pk=buyer.pk)))
+
+    def test_hot_page_role_checks_cost_no_queries_when_warm(self):
+        product = make_product(make_store())
+        self.client.force_login(self.user)
+        url = reverse("product_detail", args=[product.id])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        self.assertFalse(any("auth_user_groups" in q["sql"] for q in ctx.captured_queries))
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        fallback_index.reset()
+        store = make_store()
+        self.lamp = make_product(store, name="Desk Lamp")
+        self.lamp.description = "Warm light for your desk"
+        self.lamp.save()
+        self.kettle = make_product(store, name="Kettle")
+        self.kettle.description = "Boils water; pairs with a lamp-lit kitchen"
+        self.kettle.save()
+        make_product(store, name="Chair")
+        self.url = reverse("stores_products_api")
+
+    def test_matches_description_and_ranks_name_hits_first(self):
+        ids = [p.id for p in search_products(Product.objects.all(), "lamp")]
+        self.assertEqual(ids, [self.lamp.id, self.kettle.id])
+
+    def test_endpoint_keeps_filters_and_pagination(self):
+        data = self.client.get(self.url, {"q": "lamp", "page_size": 1}).json()
+        self.assertEqual(data["count"], 2)
+        self.assertEqual([r["id"] for r in data["results"]], [self.lamp.id])
+        data = self.client.get(self.url, {"q": "lamp", "max_price": "5"}).json()
+        self.assertEqual(data["count"], 0)
+
+    def test_index_follows_product_changes(self):
+        search_products(Product.objects.all(), "warm")  # build the index
+        self.lamp.description = "Bright"
+        self.lamp.save()
+        self.assertEqual(list(search_products(Product.objects.all(), "warm")), [])
+        self.kettle.delete()
+        self.assertEqual([p.id for p in search_products(Product.objects.all(), "water")], [])
+
+    def test_short_queries_fall_back_to_substring(self):
+        ids = [p.id for p in search_products(Product.objects.all(), "ke")]
+        self.assertEqual(ids, [self.kettle.id])
+
+
+class QueryPlanTests(TestCase):
+    def setUp(self):
+        store = make_store()
+        self.user = store.owner
+        self.vendor = Vendor.objects.create(user=self.user, vendor_name="V")
+        self.products = [make_product(store, name=f"P{i}", price=str(5 + i)) for i in range(20)]
+        for product in self.products[:5]:
+            Review.objects.create(product=product, user=self.user, rating=5)
+        self.ids = {"store": store.id, "vendor": self.vendor.id,
+                    "owner": self.user.id, "product": self.products[0].id}
+
+    def test_api_queries_use_their_indexes(self):
+        if connection.vendor not in ("mysql", "sqlite"):
+            self.skipTest("EXPLAIN parsing only covers MySQL and SQLite")
+        self.assertEqual(check_plans(self.ids), {})
+
+    def test_detects_full_scan_and_filesort(self):
+        if connection.vendor not in ("mysql", "sqlite"):
+            self.skipTest("EXPLAIN parsing only covers MySQL and SQLite")
+        issues = plan_issues(Product.objects.filter(description="x").order_by("stock"))
+        self.assertIn(FILESORT, issues)
+        issues = plan_issues(Review.objects.filter(comment="x").order_by("id"))
+        self.assertIn(FULL_SCAN, issues)
+        # The index serves -created_at but not an ascending tie-breaker
+        issues = plan_issues(Review.objects.filter(product_id=self.products[0].id)
+                             .order_by("-created_at", "id"))
+        self.assertIn(FILESORT, issues)
+
+
+class ApiCursorPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.store = make_store()
+        # Duplicate names exercise the id tie-breaker
+        self.products = [make_product(self.store, name=f"P{i % 4}") for i in range(10)]
+        self.url = reverse("stores_products_api")
+
+    def walk(self, url, params):
+        ids, pages = [], 0
+        data = self.client.get(url, params).json()
+        while True:
+            pages += 1
+            ids += [row["id"] for row in data["results"]]
+            if not data["next"]:
+                return ids, pages, data
+            data = self.client.get(data["next"]).json()
+
+    def test_walks_every_row_once_without_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            ids, pages, last = self.walk(self.url, {"pagination": "cursor", "page_size": 3})
+        expected = [p.id for p in sorted(self.products, key=lambda p: (p.name, p.id))]
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 4)
+        self.assertNotIn("count", last)
+        self.assertFalse(any("COUNT(" in q["sql"] for q in ctx.captured_queries))
+
+        back = self.client.get(last["previous"]).json()
+        self.assertEqual([r["id"] for r in back["results"]], expected[6:9])
+
+    def test_crafted_cursor_is_ignored(self):
+        response = self.client.get(self.url, {"pagination": "cursor", "page_size": 3,
+                                              "after": encode_cursor(["P0", "abc"])})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 3)
+
+    def test_count_is_cached_when_requested(self):
+        params = {"pagination": "cursor", "with_count": "1", "store": self.store.id}
+        self.assertEqual(self.client.get(self.url, params).json()["count"], 10)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(self.url, params).json()["count"], 10)
+        self.assertFalse(any("COUNT(" in q["sql"] for q in ctx.captured_queries))
+
+    def test_page_numbers_remain_the_default_and_search_uses_them(self):
+        self.assertEqual(self.client.get(self.url).json()["count"], 10)
+        data = self.client.get(self.url, {"pagination": "cursor", "q": "desc"}).json()
+        self.assertEqual(data["count"], 10)
+
+    def test_reviews_and_stores(self):
+        for product in self.products[:5]:
+            Review.objects.create(product=product, user=self.store.owner, rating=4)
+        Vendor.objects.create(user=self.store.owner, vendor_name="V")
+        self.client.force_login(self.store.owner)
+        ids, _, _ = self.walk(reverse("my_product_reviews"),
+                              {"pagination": "cursor", "page_size": 2})
+        self.assertEqual(ids, sorted(Review.objects.values_list("id", flat=True), reverse=True))
+        make_store(username="other", name="Another")
+        ids, _, _ = self.walk(reverse("vendor_stores"), {"pagination": "cursor", "page_size": 1})
+        self.assertEqual(len(ids), 2)
+
+
+class LeanSerializerTests(TestCase):
+    def setUp(self):
+        self.store = make_store()
+        Vendor.objects.create(user=self.store.owner, vendor_name="Acme")
+        make_store(username="plain", name="No Vendor")
+        product = make_product(self.store, price="1234.50")
+        product.image.name = "products/widget.png"
+        product.save()
+        make_product(self.store, name="Bare")
+
+    def test_matches_model_serializers(self):
+        request = RequestFactory().get("/")
+        stores = Store.objects.order_by("id")
+        self.assertEqual(store_public_data(stores.values(*STORE_PUBLIC_FIELDS)),
+                         StorePublicSerializer(stores, many=True).data)
+        products = Product.objects.order_by("id")
+        self.assertEqual(product_public_data(products.values(*PRODUCT_PUBLIC_FIELDS), request),
+                         ProductPublicSerializer(products, many=True,
+                                                 context={"request": request}).data)
+
+    def test_endpoints_keep_their_shape(self):
+        data = self.client.get(reverse("view_stores"), {"all": "1"}).json()
+        self.assertEqual(data, StoreSerializer(Store.objects.all(), many=True).data)
+        data = self.client.get(reverse("vendor_stores")).json()["results"]
+        self.assertEqual([s["vendor"]["vendor_name"] for s in data], ["plain", "Acme"])
+        data = self.client.get(reverse("stores_products_api"), {"q": "desc"}).json()
+        self.assertEqual({p["price"] for p in data["results"]}, {"1234.50", "9.99"})
+
+
+class ViewStoresTests(TestCase):
+    def setUp(self):
+        for i in range(5):
+            make_store(username=f"owner{i}", name=f"Store {i}")
+        self.url = reverse("view_stores")
+        self.legacy = self.client.get(self.url, {"all": "1"}).json()
+
+    def test_paginated_by_default(self):
+        data = self.client.get(self.url, {"page_size": 2}).json()
+        self.assertEqual(data["count"], 5)
+        self.assertEqual(data["results"], self.legacy[:2])
+
+    def test_stream_matches_legacy_shape(self):
+        response = self.client.get(self.url, {"stream": "1"})
+        self.assertTrue(response.streaming)
+        body = b"".join(response.streaming_content)
+        self.assertEqual(json.loads(body), self.legacy)
+
+    def test_chunk_boundaries(self):
+        rows = [{"id": i} for i in range(5)]
+        for size in (1, 2, 5, 10):
+            chunks = list(json_array_chunks(iter(rows), chunk_size=size))
+            self.assertEqual(json.loads("".join(chunks)), rows)
+        self.assertEqual("".join(json_array_chunks(iter([]))), "[]")
+
+
+class CatalogExportTests(TestCase):
+    def setUp(self):
+        self.store = make_store()
+        Vendor.objects.create(user=self.store.owner, vendor_name="V")
+        self.products = [make_product(self.store, name=f"P{i}") for i in range(7)]
+        Review.objects.create(product=self.products[0], user=self.store.owner,
+                              rating=4, comment="Nice, \"really\"")
+        make_product(make_store(username="other"), name="Not mine")
+        self.client.force_login(self.store.owner)
+        self.url = reverse("export_catalog")
+
+    def test_csv_streams_own_products_and_reviews(self):
+        response = self.client.get(self.url, {"reviews": "1"})
+        self.assertTrue(response.streaming)
+        body = b"".join(response.streaming_content).decode()
+        rows = list(csv.DictReader(body.splitlines()))
+        products = [r for r in rows if r["record"] == "product"]
+        self.assertEqual([int(r["id"]) for r in products], [p.id for p in self.products])
+        review, = [r for r in rows if r["record"] == "review"]
+        self.assertEqual(review["comment"], 'Nice, "really"')
+
+    def test_ndjson_gzip(self):
+        response = self.client.get(self.url, {"fmt": "ndjson", "gzip": "1",
+                                              "store": self.store.id})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        lines = gzip.decompress(b"".join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(len(lines), 7)
+        self.assertEqual(json.loads(lines[0])["price"], "9.99")
+
+    def test_rejects_foreign_store_and_bad_format(self):
+        other = Store.objects.get(name="Store", owner__username="other")
+        self.assertEqual(self.client.get(self.url, {"store": other.id}).status_code, 404)
+        self.assertEqual(self.client.get(self.url, {"fmt": "xml"}).status_code, 400)
+        for bad in ("abc", "1.5", "-3", str(2 ** 70)):
+            self.assertEqual(self.client.get(self.url, {"store": bad}).status_code, 400)
+
+    def test_command_reads_in_chunks(self):
+        with tempfile.NamedTemporaryFile(suffix=".ndjson.gz") as f:
+            with CaptureQueriesContext(connection) as ctx:
+                call_command("export_catalog", owner="vendor", format="ndjson", gzip=True,
+                             chunk_size=3, output=f.name, stderr=StringIO())
+            with gzip.open(f.name, "rt") as fh:
+                self.assertEqual(len(fh.readlines()), 7)
+        product_reads = [q for q in ctx.captured_queries if 'FROM "shop_product"' in q["sql"]]
+        self.assertEqual(len(product_reads), 3)
+
+
+class ProductImportTests(TestCase):
+    def setUp(self):
+        self.store = make_store()
+        Vendor.objects.create(user=self.store.owner, vendor_name="V")
+        self.existing = make_product(self.store, name="Old name", stock=7)
+        self.existing.sku = "A-1"
+        self.existing.save()
+        self.client.force_login(self.store.owner)
+        self.url = reverse("import_products", args=[self.store.id])
+
+    def test_csv_upload_upserts_and_reports_bad_rows(self):
+        body = ("sku,name,description,price,stock\n"
+                "A-1,New name,d,5.00,3\n"
+                "B-2,Fresh,d,1.50,2\n"
+                "C-3,Cheap,d,-1,2\n"
+                "B-2,Again,d,1.00,1\n")
+        upload = SimpleUploadedFile("catalog.csv", body.encode(), content_type="text/csv")
+        report = self.client.post(self.url, {"file": upload}).json()
+        self.assertEqual((report["created"], report["updated"], report["failed"]), (1, 1, 2))
+        self.assertEqual([e["row"] for e in report["errors"]], [3, 4])
+        self.assertIn("price", report["errors"][0]["errors"])
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.name, self.existing.stock), ("New name", 3))
+        self.assertEqual(self.store.products.get(sku="B-2").name, "Fresh")
+
+    def test_blank_optional_csv_cell_is_omitted(self):
+        body = ("sku,name,description,price,stock\n"
+                "A-1,Renamed,d,2.00,\n"
+                "D-4,New,d,1.00,\n")
+        upload = SimpleUploadedFile("catalog.csv", body.encode(), content_type="text/csv")
+        report = self.client.post(self.url, {"file": upload}).json()
+        self.assertEqual((report["created"], report["updated"], report["failed"]), (1, 1, 0))
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.name, self.existing.stock), ("Renamed", 7))
+        self.assertEqual(self.store.products.get(sku="D-4").stock, 0)
+
+    def test_raw_ndjson_keeps_omitted_fields(self):
+        body = ('{"sku": "A-1", "name": "Renamed", "description": "d", "price": "2.00"}\n'
+                "not json\n")
+        report = self.client.post(self.url + "?fmt=ndjson", body,
+                                  content_type="application/x-ndjson").json()
+        self.assertEqual((report["updated"], report["failed"]), (1, 1))
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.name, self.existing.stock), ("Renamed", 7))
+
+    def test_command_batches_json(self):
+        rows = [{"sku": f"S{i}", "name": f"N{i}", "description": "d", "price": "1.00"}
+                for i in range(5)]
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as f:
+            json.dump(rows, f)
+            f.flush()
+            out = StringIO()
+            call_command("import_products", f.name, store=self.store.id, batch_size=2,
+                         stdout=out, stderr=StringIO())
+        self.assertIn("5 created, 0 updated, 0 failed", out.getvalue())
+        self.assertEqual(self.store.products.exclude(sku="A-1").count(), 5)
+
+    def test_single_add_rejects_duplicate_sku(self):
+        response = self.client.post(reverse("add_product", args=[self.store.id]),
+                                    {"sku": "A-1", "name": "X", "description": "d",
+                                     "price": "1.00"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("sku", response.json())
+
+
+class BulkStockPriceUpdateTests(TestCase):
+    def setUp(self):
+        self.store = make_store()
+        Vendor.objects.create(user=self.store.owner, vendor_name="V")
+        self.a = make_product(self.store, name="A", stock=10)
+        self.b = make_product(self.store, name="B", stock=2)
+        self.foreign = make_product(make_store(username="other"), name="F")
+        self.client.force_login(self.store.owner)
+        self.url = reverse("bulk_update_products")
+
+    def post(self, updates):
+        return self.client.post(self.url, {"updates": updates}, content_type="application/json")
+
+    def test_applies_absolute_delta_and_price_in_few_statements(self):
+        updates = [{"id": self.a.id, "stock": 4, "price": "3.25"},
+                   {"id": self.b.id, "stock_delta": -5},
+                   {"id": self.foreign.id, "stock": 1},
+                   {"id": 999999, "price": "1.00"},
+                   {"id": self.a.id, "stock": 1},
+                   {"id": self.b.id, "stock": 1, "stock_delta": 1},
+                   {"id": self.b.id, "price": "-1"}]
+        with CaptureQueriesContext(connection) as ctx:
+            report = self.post(updates).json()
+        self.assertEqual(report["updated"], 2)
+        self.assertEqual(report["not_owned"], [self.foreign.id])
+        self.assertEqual(report["not_found"], [999999])
+        self.assertEqual(report["clamped"], [self.b.id])
+        self.assertEqual([e["index"] for e in report["invalid"]], [4, 5, 6])
+        updates_sql = [q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates_sql), 3)
+
+        self.a.refresh_from_db()
+        self.b.refresh_from_db()
+        self.foreign.refresh_from_db()
+        self.assertEqual((self.a.stock, self.a.price), (4, Decimal("3.25")))
+        self.assertEqual(self.b.stock, 0)
+        self.assertEqual(self.foreign.stock, 10)
+
+    def test_requires_vendor_and_list_body(self):
+        self.assertEqual(self.client.post(self.url, {}, content_type="application/json").status_code, 400)
+        self.client.force_login(self.foreign.store.owner)
+        self.assertEqual(self.post([]).status_code, 403)
+
+    def test_out_of_range_values_are_reported_not_written(self):
+        response = self.post([{"id": self.a.id, "stock": 2 ** 40},
+                              {"id": self.b.id, "stock_delta": -(2 ** 40)},
+                              {"id": 2 ** 70, "price": "1.00"}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([e["index"] for e in response.json()["invalid"]], [0, 1, 2])
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.stock, 10)
+
+    def test_backends_without_for_update_of_use_owner_subquery(self):
+        with mock.patch.object(connection.features, "has_select_for_update_of", False), \
+                CaptureQueriesContext(connection) as ctx:
+            report = self.post([{"id": self.a.id, "stock": 1},
+                                {"id": self.foreign.id, "stock": 1}]).json()
+        self.assertEqual((report["updated"], report["not_owned"]), (1, [self.foreign.id]))
+        (locking,) = [q["sql"] for q in ctx.captured_queries if "IN (SELECT" in q["sql"]]
+        self.assertNotIn("JOIN", locking.split("IN (SELECT")[0])
+
+    @skipUnlessDBFeature("has_select_for_update_of")
+    def test_locks_only_product_rows(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.post([{"id": self.a.id, "stock": 1}])
+        (locking,) = [q["sql"] for q in ctx.captured_queries if "FOR UPDATE" in q["sql"]]
+        self.assertNotIn("shop_store", locking.split("FOR UPDATE")[1])
+
+
+
+def image_upload(name="photo.png", size=(1600, 1000), mode="RGB"):
+    buf = BytesIO()
+    Image.new(mode, size, "green").save(buf, "PNG")
+    return SimpleUploadedFile(name, buf.getvalue(), content_type="image/png")
+
+
+class ProductRenditionTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        media = override_settings(MEDIA_ROOT=tmp.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.product = make_product(make_store())
+
+    def test_saving_an_image_queues_and_worker_builds_every_size(self):
+        self.product.image = image_upload()
+        self.product.save()
+        self.assertTrue(Product.objects.get().renditions_pending)
+        self.assertEqual(process_renditions(), (1, 0))
+
+        product = Product.objects.get()
+        self.assertFalse(product.renditions_pending)
+        self.assertEqual(product.renditions_source, product.image.name)
+        self.assertEqual([product.renditions[s]["width"] for s in ("detail", "card", "thumb")],
+                         [1200, 480, 160])
+        for entry in product.renditions.values():
+            for fmt in ("webp", "jpeg"):
+                self.assertTrue(entry[fmt].endswith(f"-{entry['width']}w.{fmt}"))
+                with Image.open(default_storage.path(entry[fmt])) as im:
+                    self.assertEqual(im.size, (entry["width"], entry["height"]))
+
+    def test_names_follow_content_and_small_sources_are_not_upscaled(self):
+        self.product.image = image_upload(size=(300, 200))
+        self.product.save()
+        other = make_product(self.product.store, name="Copy")
+        other.image = image_upload(name="copy.png", size=(300, 200))
+        other.save()
+        process_renditions()
+        first, second = (p.renditions for p in Product.objects.order_by("id"))
+        self.assertEqual(first, second)
+        self.assertEqual((first["detail"]["width"], first["thumb"]["width"]), (300, 160))
+
+    def test_tag_emits_srcset_once_built_and_falls_back_before(self):
+        self.product.image = image_upload()
+        self.product.save()
+        tpl = Template('{% load shop_images %}{% product_image product "card" class="c" %}')
+        html = tpl.render(Context({"product": Product.objects.get()}))
+        self.assertNotIn("srcset", html)
+        self.assertIn(self.product.image.url, html)
+
+        process_renditions()
+        html = tpl.render(Context({"product": Product.objects.get()}))
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn("160w", html)
+        self.assertIn('width="480"', html)
+        self.assertIn('class="c"', html)
+
+    def test_backfill_queues_stale_products_and_removed_images_clear(self):
+        self.product.image = image_upload()
+        self.product.save()
+        Product.objects.update(renditions_pending=False)
+        self.assertEqual(mark_stale_renditions(), 1)
+        process_renditions()
+        self.assertEqual(mark_stale_renditions(), 0)
+
+        product = Product.objects.get()
+        product.image = None
+        product.save()
+        process_renditions()
+        product.refresh_from_db()
+        self.assertEqual((product.renditions, product.renditions_source), ({}, ""))
+
+    def test_undecodable_image_fails_alone(self):
+        self.product.image = image_upload()
+        self.product.save()
+        poison = make_product(self.product.store, name="Poison")
+        poison.image = image_upload(name="poison.png")
+        poison.save()
+        build = renditions.build_renditions
+
+        def build_or_choke(source, *args):
+            if "poison" in source:
+                raise SyntaxError("broken PNG chunk")  # as Pillow raises for some files
+            return build(source, *args)
+
+        with mock.patch.object(renditions, "build_renditions", build_or_choke), \
+                self.assertLogs("shop.renditions", "ERROR"):
+            self.assertEqual(process_renditions(), (1, 1))
+        poison.refresh_from_db()
+        self.assertFalse(poison.renditions_pending)
+        self.assertTrue(Product.objects.get(pk=self.product.pk).renditions)
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeTwitterAPI:
+    """
+    Stands in for TwitterAPI in the announcement worker; `errors` are
+    raised by successive post_tweet calls before it starts succeeding.
+    """
+    token = {"access_token": "x"}
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.posted = []
+
+    def upload_media(self, path):
+        return "media-1"
+
+    def post_tweet(self, text, media_ids=None):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.posted.append((text, media_ids))
+        return {"data": {"id": str(len(self.posted))}}
+
+
+class CrashingTwitterAPI(FakeTwitterAPI):
+    """
+    Posts the first tweet, then the worker "dies" (see WorkerCrash).
+    """
+    def post_tweet(self, text, media_ids=None):
+        if self.posted:
+            raise WorkerCrash()
+        return super().post_tweet(text, media_ids)
+
+
+class AnnouncementQueueTests(TestCase):
+    def setUp(self):
+        self.store = make_store()
+
+    def run_worker(self, api, **kwargs):
+        return process_pending(api_factory=lambda: api, **kwargs)
+
+    @override_settings(TWITTER_ENABLED=True)
+    def test_product_add_only_enqueues(self):
+        self.client.force_login(self.store.owner)
+        url = reverse("product_add", args=[self.store.pk])
+        response = self.client.post(url, {"name": "Lamp", "description": "d",
+                                          "price": "5.00", "stock": 1})
+        self.assertEqual(response.status_code, 302)
+        job = AnnouncementJob.objects.get()
+        self.assertIn("Lamp", job.text)
+        self.assertEqual(job.status, AnnouncementJob.PENDING)
+
+    def test_posts_and_records_tweet_id(self):
+        enqueue_announcement("Hello", store=self.store)
+        api = FakeTwitterAPI()
+        self.assertEqual(self.run_worker(api), (1, 0))
+        job = AnnouncementJob.objects.get()
+        self.assertEqual((job.status, job.tweet_id), (AnnouncementJob.POSTED, "1"))
+        self.assertEqual(self.run_worker(api), (0, 0))
+
+    def test_crash_mid_batch_keeps_posted_jobs(self):
+        first, second = enqueue_announcement("One"), enqueue_announcement("Two")
+        with self.assertRaises(WorkerCrash):
+            self.run_worker(CrashingTwitterAPI())
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, first.tweet_id), (AnnouncementJob.POSTED, "1"))
+        self.assertEqual(second.status, AnnouncementJob.PENDING)
+
+    def test_retries_with_backoff_then_dead_letters(self):
+        job = enqueue_announcement("Hello")
+        api = FakeTwitterAPI(errors=[RuntimeError("boom")] * 2)
+        self.assertEqual(self.run_worker(api, max_attempts=2), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, AnnouncementJob.PENDING)
+        self.assertGreater(job.next_attempt_at, timezone.now())
+
+        AnnouncementJob.objects.update(next_attempt_at=timezone.now())
+        self.run_worker(api, max_attempts=2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (AnnouncementJob.DEAD, 2))
+
+    def test_permanent_error_dead_letters_immediately(self):
+        job = enqueue_announcement("Dup")
+        self.run_worker(FakeTwitterAPI(errors=[TwitterHTTPError("403", FakeResponse(403))]))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (AnnouncementJob.DEAD, 1))
+
+    def test_rate_limit_defers_whole_queue_without_spending_attempts(self):
+        first = enqueue_announcement("One")
+        enqueue_announcement("Two")
+        reset = int(timezone.now().timestamp()) + 900
+        limited = TwitterHTTPError("429", FakeResponse(429, {"x-rate-limit-reset": str(reset)}))
+        self.assertEqual(self.run_worker(FakeTwitterAPI(errors=[limited]), batch_size=1), (0, 0))
+        first.refresh_from_db()
+        self.assertEqual(first.attempts, 0)
+        self.assertEqual(set(AnnouncementJob.objects.values_list("next_attempt_at", flat=True)),
+                         {first.next_attempt_at})
+        self.assertEqual(int(first.next_attempt_at.timestamp()), reset)
+
+
+class StubXHandler(BaseHTTPRequestHandler):
+    """
+    Minimal api.x.com over HTTP/1.1 keep-alive. Counts TCP connections
+    (one handler per connection), token refreshes and tweets.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        server = self.server
+        if self.path == "/2/oauth2/token":
+            time.sleep(0.05)  # widen the window for racing refreshes
+            with server.lock:
+                server.refreshes += 1
+                server.access_token = f"access-{server.refreshes}"
+            return self.reply(200, {"access_token": server.access_token, "refresh_token": "r2",
+                                    "expires_in": 7200, "token_type": "bearer"})
+        if self.headers.get("Authorization") != f"Bearer {server.access_token}":
+            return self.reply(401, {"title": "Unauthorized"})
+        if self.path == "/2/media/upload/initialize":
+            server.uploads += 1
+            return self.reply(200, {"data": {"id": f"m{server.uploads}"}})
+        if self.path.endswith("/append"):
+            server.segments.append(len(body))
+            return self.reply(200, {})
+        if self.path.endswith("/finalize"):
+            data = {"id": self.path.split("/")[-2], "expires_after_secs": 86400}
+            if server.processing:
+                data["processing_info"] = {"state": "pending", "check_after_secs": 0}
+            return self.reply(200, {"data": data})
+        with server.lock:
+            server.tweets += 1
+            tweet_id = server.tweets
+        self.reply(201, {"data": {"id": str(tweet_id)}})
+
+    def do_GET(self):
+        # Media STATUS: walks through the states queued in server.processing
+        state = self.server.processing.pop(0) if self.server.processing else "succeeded"
+        self.reply(200, {"data": {"processing_info": {"state": state, "check_after_secs": 0}}})
+
+
+@override_settings(TWITTER_CLIENT_ID="client-id", TWITTER_CLIENT_SECRET=None)
+class SharedTwitterClientTests(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubXHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.connections = self.server.refreshes = self.server.tweets = 0
+        self.server.uploads = 0
+        self.server.segments = []
+        self.server.processing = []
+        self.server.access_token = "access-0"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.token_path = os.path.join(tmp.name, "tokens.json")
+
+    def make_client(self, expires_in=7200):
+        with open(self.token_path, "w") as f:
+            json.dump({"access_token": "access-0", "refresh_token": "r1",
+                       "expires_at": time.time() + expires_in}, f)
+        client = TwitterClient(base_url=f"http://127.0.0.1:{self.server.server_port}",
+                               token_path=self.token_path)
+        self.addCleanup(client.http.close)
+        return client
+
+    def test_posts_reuse_one_pooled_connection(self):
+        client = self.make_client()
+        for i in range(20):
+            # a fresh TwitterAPI per post, as the worker builds per batch
+            TwitterAPI(client=client).post_tweet(f"post {i}")
+        self.assertEqual((self.server.tweets, self.server.connections), (20, 1))
+
+    def test_concurrent_expired_token_refreshes_once(self):
+        client = self.make_client(expires_in=0)
+        threads = [threading.Thread(target=TwitterAPI(client=client).post_tweet, args=("hi",))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual((self.server.refreshes, self.server.tweets), (1, 8))
+        with open(self.token_path) as f:
+            self.assertEqual(json.load(f)["access_token"], "access-1")
+
+    def test_revoked_token_refreshes_and_retries_once(self):
+        client = self.make_client()
+        self.server.access_token = "rotated"
+        self.assertEqual(TwitterAPI(client=client).post_tweet("hi")["data"]["id"], "1")
+        self.assertEqual(client.token["access_token"], "access-1")
+
+    def test_media_is_chunked_and_cached_by_content(self):
+        cache.clear()
+        client = self.make_client()
+        path = os.path.join(os.path.dirname(self.token_path), "photo.png")
+        Image.effect_noise((400, 300), 64).convert("RGBA").save(path)
+        api = TwitterAPI(client=client)
+        self.assertEqual(api.upload_media(path, chunk_size=16 * 1024), "m1")
+        self.assertGreater(len(self.server.segments), 1)
+        self.assertEqual(api.upload_media(path, chunk_size=16 * 1024), "m1")
+        self.assertEqual(self.server.uploads, 1)
+
+    def test_failed_processing_raises_and_is_not_cached(self):
+        cache.clear()
+        path = os.path.join(os.path.dirname(self.token_path), "photo.png")
+        Image.new("RGB", (40, 30), "red").save(path)
+        api = TwitterAPI(client=self.make_client())
+        self.server.processing = ["in_progress", "failed"]
+        with self.assertRaises(TwitterMediaError):
+            api.upload_media(path)
+        self.server.processing = ["in_progress", "succeeded"]
+        self.assertEqual(api.upload_media(path), "m2")
+        self.assertEqual(api.upload_media(path), "m2")
+        self.assertEqual(self.server.uploads, 2)
+
+
+
+def _refresh_in_child(path, log_path, start):
+    """
+    Runs in a forked process: refresh the token every process read as
+    stale, logging each real exchange to `log_path`.
+    """
+    store = FileTokenStore(path)
+    stale = store.load()
+    start.wait()
+
+    def exchange(token):
+        with open(log_path, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        time.sleep(0.1)
+        return {"access_token": f"access-{os.getpid()}", "refresh_token": "r2"}
+
+    store.refresh(stale, exchange)
+
+
+class FileTokenStoreTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "tokens.json")
+
+    def test_load_is_cached_until_the_file_changes(self):
+        store = FileTokenStore(self.path)
+        self.assertIsNone(store.load())
+        store.save({"access_token": "a"})
+        first = store.load()
+        self.assertIs(store.load(), first)
+        FileTokenStore(self.path).save({"access_token": "b"})  # another process
+        self.assertEqual(store.load(), {"access_token": "b"})
+        self.assertEqual([n for n in os.listdir(os.path.dirname(self.path))
+                          if n.startswith(".tokens-")], [])
+
+    @skipUnless(hasattr(os, "fork"), "needs fork and fcntl")
+    def test_only_one_process_refreshes(self):
+        FileTokenStore(self.path).save({"access_token": "access-0", "refresh_token": "r1"})
+        log_path = self.path + ".log"
+        ctx = multiprocessing.get_context("fork")
+        start = ctx.Event()
+        children = [ctx.Process(target=_refresh_in_child, args=(self.path, log_path, start))
+                    for _ in range(4)]
+        for child in children:
+            child.start()
+        start.set()
+        for child in children:
+            child.join(10)
+        self.assertEqual([c.exitcode for c in children], [0] * 4)
+        with open(log_path) as f:
+            refreshed_by = f.read().split()
+        self.assertEqual(len(refreshed_by), 1)
+        self.assertEqual(FileTokenStore(self.path).load()["access_token"],
+                         f"access-{refreshed_by[0]}")
+
+class PrepareImageTests(SimpleTestCase):
+    def encode(self, im, fmt):
+        buf = BytesIO()
+        im.save(buf, fmt)
+        return buf.getvalue()
+
+    def test_small_jpeg_passes_through_untouched(self):
+        data = self.encode(Image.new("RGB", (120, 80), "red"), "JPEG")
+        self.assertIs(prepare_image(data, max_side=200), data)
+
+    def test_large_jpeg_is_downscaled(self):
+        data = self.encode(Image.new("RGB", (1600, 1200), "blue"), "JPEG")
+        out = Image.open(BytesIO(prepare_image(data, max_side=400)))
+        self.assertEqual(out.format, "JPEG")
+        self.assertLessEqual(max(out.size), 400)
+
+    def test_alpha_is_flattened_onto_white(self):
+        data = self.encode(Image.new("RGBA", (10, 10), (0, 0, 0, 0)), "PNG")
+        out = Image.open(BytesIO(prepare_image(data)))
+        self.assertEqual(out.mode, "RGB")
+        self.assertGreater(out.getpixel((5, 5))[0], 240)
+
+    def test_unreadable_image_raises(self):
+        with self.assertRaises(RuntimeError):
+            prepare_image(b"not an image")
+
+
+class GunicornConfigTests(SimpleTestCase):
+    def load(self, **env):
+        saved = {k: os.environ.get(k) for k in env}
+        os.environ.update(env)
+        try:
+            return runpy.run_path(str(settings.BASE_DIR / "gunicorn.conf.py"))
+        finally:
+            for k, v in saved.items():
+                if v is None:
+                    os.environ.pop(k)
+                else:
+                    os.environ[k] = v
+
+    def test_wsgi_threads_and_keepalive_from_env(self):
+        conf = self.load(SERVER_INTERFACE="wsgi", GUNICORN_WORKERS="3",
+                         GUNICORN_THREADS="8", GUNICORN_KEEPALIVE="10")
+        self.assertEqual((conf["wsgi_app"], conf["worker_class"]),
+                         ("ecommerce.wsgi:application", "gthread"))
+        self.assertEqual((conf["workers"], conf["threads"], conf["keepalive"]), (3, 8, 10))
+
+    def test_asgi_runs_uvicorn_workers(self):
+        conf = self.load(SERVER_INTERFACE="asgi")
+        self.assertEqual((conf["wsgi_app"], conf["worker_class"]),
+                         ("ecommerce.asgi:application", "uvicorn.workers.UvicornWorker"))
+
+
+class ManifestStaticFilesTests(TestCase):
+    """
+    Pages rendered with the storage SERVE_STATIC turns on, against a
+    STATIC_ROOT filled by collectstatic as the Docker image build does.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        tmp = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(tmp.cleanup)
+        storages = {**settings.STORAGES, "staticfiles": {
+            "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"}}
+        # The manifest is under test, not the .gz/.br variants (slow to build)
+        override = override_settings(STATIC_ROOT=tmp.name, STORAGES=storages,
+                                     WHITENOISE_SKIP_COMPRESS_EXTENSIONS=["css", "js", "png", "svg",
+                                                                          "txt", "md", "html"])
+        override.enable()
+        cls.addClassCleanup(override.disable)
+        call_command("collectstatic", interactive=False, verbosity=0)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_static_tags_resolve_to_hashed_names(self):
+        html = Template("{% load static %}{% static 'img/placeholder.png' %} "
+                        "{% static 'admin/css/base.css' %}").render(Context())
+        self.assertRegex(html, r"^/static/img/placeholder\.[0-9a-f]{12}\.png "
+                               r"/static/admin/css/base\.[0-9a-f]{12}\.css$")
+
+    def test_catalog_placeholder_and_admin_render(self):
+        make_product(make_store())
+        response = self.client.get(reverse("product_list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response.content.decode(), r"/static/img/placeholder\.[0-9a-f]{12}\.png")
+        self.assertEqual(self.client.get("/admin/login/").status_code, 200)
+
+
+
+class PooledSQLiteWrapper(PooledConnectionMixin, InstrumentedConnectionMixin,
+                          sqlite_base.DatabaseWrapper):
+    """
+    The pooled/instrumented mixins of shop.backends.mysql over SQLite.
+    """
+
+
+class DatabaseConnectionTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.settings_dict = {**connection.settings_dict, "NAME": os.path.join(tmp.name, "db.sqlite3"),
+                              "CONN_MAX_AGE": 0,
+                              "OPTIONS": {"pool": {"max_size": 2, "timeout": 5}}}
+        reset_connect_stats()
+
+    def wrapper(self):
+        return PooledSQLiteWrapper(self.settings_dict, alias=f"pool-{id(self)}")
+
+    def query(self, db):
+        with db.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        db.close()
+
+    def test_close_returns_connection_to_pool(self):
+        db = self.wrapper()
+        for _ in range(5):
+            self.query(db)
+        stats = connect_stats()
+        self.assertEqual((stats["connects"], stats["pool_checkouts"]), (1, 4))
+
+    def test_threads_share_at_most_max_size_connections(self):
+        def work():
+            db = self.wrapper()
+            for _ in range(10):
+                self.query(db)
+
+        threads = [threading.Thread(target=work) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        stats = connect_stats()
+        self.assertLessEqual(stats["connects"], 2)
+        self.assertEqual(stats["connects"] + stats["pool_checkouts"], 60)
+
+    def test_failed_connection_is_not_reused(self):
+        db = self.wrapper()
+        db.ensure_connection()
+        db.errors_occurred = True
+        db.close()
+        self.query(db)
+        self.assertEqual(connect_stats()["connects"], 2)
+
+
+class ConnectStatsMiddlewareTests(TestCase):
+    def test_reports_connects_per_request(self):
+        reset_connect_stats()
+        response = self.client.get(reverse("product_list"))
+        self.assertRegex(response["Server-Timing"], r'^db-connect;dur=[0-9.]+;desc="0 new, 0 pooled"$')
+        self.assertEqual(connect_stats()["requests"], 1)
+
+
+class FakeLockConnection:
+    """
+    Just enough of a MySQL connection for migration_lock: GET_LOCK
+    answers `granted`, and every statement is recorded.
+    """
+    vendor = "mysql"
+
+    def __init__(self, granted=1):
+        self.granted = granted
+        self.executed = []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        self.executed.append(sql.split("(")[0])
+
+    def fetchone(self):
+        return (self.granted,)
+
+
+class BootstrapCommandTests(TestCase):
+    def run_bootstrap(self, *args):
+        out = StringIO()
+        call_command("bootstrap", *args, stdout=out)
+        return out.getvalue()
+
+    def test_repeat_runs_skip_migrate_and_existing_superuser(self):
+        first = self.run_bootstrap()
+        self.assertIn("Migrations up to date.", first)
+        self.assertIn("Superuser created: admin", first)
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.run_bootstrap()
+        self.assertNotIn("Superuser created", second)
+        self.assertEqual(User.objects.filter(username="admin").count(), 1)
+        # Startup cost of a warm container: reading the migration table and
+        # checking the admin user, nothing else
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+        elapsed = float(re.search(r"Bootstrap finished in ([0-9.]+)s\.", second).group(1))
+        self.assertLess(elapsed, 5.0)  # generous: ~0.02s locally
+
+    def test_pending_migrations_rechecked_under_lock(self):
+        events = []
+
+        @contextmanager
+        def lock(conn, timeout):
+            events.append("lock")
+            yield
+            events.append("unlock")
+
+        # Pending before the lock; another replica finished them meanwhile
+        plans = iter([["0008"], []])
+        with mock.patch.object(bootstrap, "migration_lock", lock), \
+                mock.patch.object(bootstrap, "pending_migrations", lambda conn: next(plans)), \
+                mock.patch.object(bootstrap, "call_command") as migrate:
+            out = self.run_bootstrap("--no-superuser")
+        self.assertEqual(events, ["lock", "unlock"])
+        self.assertIn("Migrations applied by another process.", out)
+        migrate.assert_not_called()
+
+        plans = iter([["0008"], ["0008"]])
+        with mock.patch.object(bootstrap, "migration_lock", lock), \
+                mock.patch.object(bootstrap, "pending_migrations", lambda conn: next(plans)), \
+                mock.patch.object(bootstrap, "call_command") as migrate:
+            self.run_bootstrap("--no-superuser")
+        self.assertEqual(migrate.call_args.args, ("migrate",))
+
+    def test_migration_lock_released_and_timeout_raised(self):
+        conn = FakeLockConnection()
+        with bootstrap.migration_lock(conn, 5):
+            self.assertEqual(conn.executed, ["SELECT GET_LOCK"])
+        self.assertEqual(conn.executed, ["SELECT GET_LOCK", "SELECT RELEASE_LOCK"])
+        with self.assertRaises(CommandError):
+            with bootstrap.migration_lock(FakeLockConnection(granted=0), 5):
+                pass
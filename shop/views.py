@@ -13,7 +13,7 @@ from rest_framework.decorators import (
     parser_classes
 )
 from rest_framework.authentication import BasicAuthentication
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
@@ -24,23 +24,31 @@ from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import User, Group
 from django.contrib.auth.forms import SetPasswordForm
-from django.core.mail import send_mail, EmailMultiAlternatives
 from django.db import transaction
-from django.db.models import Avg, Count
+from django.db.models import Sum
 from django.db.models.deletion import ProtectedError
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 from django.utils.html import strip_tags, format_html
+from django.utils.safestring import mark_safe
 
 from django.views.generic.edit import FormView
 
 
-from .functions.tweet import TwitterAPI
+from . import export, importer, inventory, page_cache
+from .dbconn import connect_stats
+from .functions.announce import enqueue_announcement
+from .functions.tweet import has_saved_token
 from .permissions import IsVendor
 from .basket import Basket
+from .orders import InsufficientStock, place_order
+from .outbox import enqueue_email
+from .pagination import KeysetPagination, keyset_paginate
+from .search import search_products
+from .streaming import stream_json_array
 from .forms import (
     CustomerRegisterForm,
     VendorRegisterForm,
@@ -52,11 +60,12 @@ from .forms import (
 )
 from .models import Vendor, Product, ResetToken, Store, StoreSerializer, \
                     ProductSerializer, Review, ReviewSerializer,\
-                    StorePublicSerializer, ProductPublicSerializer
+                    STORE_FIELDS, STORE_PUBLIC_FIELDS, PRODUCT_PUBLIC_FIELDS, \
+                    store_public_data, product_public_data
 from .utils import create_reset_token, build_reset_url, \
                         validate_and_consume_token, lookup_reset_token, \
                         consume_reset_token
-from .helpers import mark_user_has_purchased, has_purchased_product, \
+from .helpers import verified_reviewer_ids, \
                     _assign_role, _is_vendor , _is_product_owner, \
                     _currency_symbol, vendor_required
 
@@ -123,13 +132,40 @@ def register_vendor(request: HttpRequest) -> HttpResponse:
 
 # ---------- catalog & product detail ----------
 
+# ?sort= choices for the catalog; each has a matching Product index
+# Keyset orderings of the API lists (last field unique); shop.query_plans
+# EXPLAINs exactly these, each backed by a Meta.indexes entry
+API_PRODUCT_ORDERING = ("name", "id")
+STORE_ORDERING = ("name", "id")
+REVIEW_ORDERING = ("-created_at", "-id")
+
+CATALOG_SORTS = {
+    "name": ("name", "id"),
+    "rating": ("-rating_avg", "name", "id"),
+}
+
+
 def product_list(request: HttpRequest) -> HttpResponse:
     """
-    Display all products to customers.
-    """
-    products = Product.objects.all()
-    return render(request, "shop/product_list.html", 
-                  {"products": products})
+    Display the catalog to customers, one keyset page at a time
+    (?after=/?before= cursors, ?page_size= capped, ?sort=name|rating).
+    """
+    cacheable = page_cache.is_cacheable_request(request)
+    if cacheable:
+        key = page_cache.list_page_key(request.GET)
+        cached = page_cache.cached_response(key, "product_list")
+        if cached is not None:
+            return cached
+
+    sort = request.GET.get("sort")
+    fields = CATALOG_SORTS.get(sort, CATALOG_SORTS["name"])
+    page = keyset_paginate(Product.objects.all(), request.GET, fields=fields)
+    response = render(request, "shop/product_list.html",
+                      {"products": page.items, "page": page,
+                       "sort": sort if sort in CATALOG_SORTS else "name"})
+    if cacheable and page_cache.is_cacheable_response(request, response):
+        page_cache.store(key, response.content)
+    return response
 
 
 def product_detail(request: HttpRequest, product_id: int) \
@@ -137,11 +173,8 @@ def product_detail(request: HttpRequest, product_id: int) \
     """
     Show a single product, its reviews, and handle review submission.
     """
-    product = get_object_or_404(Product, id=product_id)
-    
-    reviews_qs = product.reviews.select_related("user"). \
-                            all().order_by("-created_at")
-    reviews = list(reviews_qs)
+    product = get_object_or_404(Product.objects.select_related("store"),
+                                id=product_id)
 
     if request.method == "POST":
         form = ReviewForm(request.POST)
@@ -154,12 +187,22 @@ def product_detail(request: HttpRequest, product_id: int) \
     else:
         form = ReviewForm()
 
-    for r in reviews:
-        r.is_verified = has_purchased_product(r.user, product)
+    # The reviews block is the same for every visitor: cache it rendered
+    key = page_cache.reviews_fragment_key(product.id)
+    reviews_html = page_cache.fetch(key, "product_detail")
+    if reviews_html is None:
+        reviews = list(product.reviews.select_related("user")
+                       .order_by("-created_at"))
+        verified = verified_reviewer_ids(product, reviews)
+        for r in reviews:
+            r.is_verified = r.user_id in verified
+        reviews_html = render_to_string("shop/product_reviews.html",
+                                        {"reviews": reviews})
+        page_cache.store(key, reviews_html)
 
     context = {
         "product": product,
-        "reviews": reviews,
+        "reviews_html": mark_safe(reviews_html),
         "form": form,
         "user_is_vendor": _is_vendor(request.user),
         "user_is_owner": _is_product_owner(request.user, product),
@@ -245,19 +288,18 @@ def add_to_basket(request: HttpRequest, product_id: int) -> HttpResponse:
 def remove_from_basket(request: HttpRequest, product_id: int) \
                                         -> HttpResponse:
     """
-    Remove a product from the basket.
+    Remove a product from the basket, even one deleted since it was added.
     """
-    product = get_object_or_404(Product, id=product_id)
     basket = Basket(request)
-    basket.remove(product)
+    basket.remove(product_id)
     return redirect("basket_detail")
 
 
 @login_required
 def checkout(request: HttpRequest) -> HttpResponse:
     """
-    Email an invoice for the current basket to the logged-in user,
-    then clear the basket and mark the user as having purchased.
+    Persist the current basket as an Order (decrementing stock), email
+    an invoice to the logged-in user, then clear the basket.
     """
     basket = Basket(request)
 
@@ -269,7 +311,9 @@ def checkout(request: HttpRequest) -> HttpResponse:
     if request.method != "POST":
         return redirect("basket_detail")
 
-    if len(basket) == 0:
+    # One pass: loads products, prunes deleted ones, memoizes the total
+    items = basket.lines(fetch_products=True)
+    if not items:
         messages.error(request, "Your basket is empty.")
         return redirect("basket_detail")
 
@@ -277,13 +321,21 @@ def checkout(request: HttpRequest) -> HttpResponse:
         messages.error(request, "Your account has no email address. Please add one to receive the invoice.")
         return redirect("basket_detail")
 
-    now = timezone.now()
-    invoice_no = f"INV-{now.strftime('%Y%m%d%H%M%S')}-{request.user.id}"
-    items = list(basket)              
     total = basket.get_total_price()
 
+    try:
+        order = place_order(request.user, items)
+    except InsufficientStock as exc:
+        messages.error(request, f"Sorry, there isn't enough stock of "
+                                f"{exc.product.name} for your order.")
+        return redirect("basket_detail")
+
+    now = timezone.now()
+    invoice_no = f"INV-{now.strftime('%Y%m%d%H%M%S')}-{order.pk}"
+
     context = {
         "user": request.user,
+        "order": order,
         "items": items,
         "total": total,
         "invoice_no": invoice_no,
@@ -298,16 +350,11 @@ def checkout(request: HttpRequest) -> HttpResponse:
     from_email = getattr(settings, "DEFAULT_FROM_EMAIL", None)
     to_email = [request.user.email]
 
-    email = EmailMultiAlternatives(subject, text_body, from_email, to_email)
-    email.attach_alternative(html_body, "text/html")
-    email.send()
-
-    purchased = [it["product"] for it in items]
-    mark_user_has_purchased(request.user, products=purchased)
+    enqueue_email(subject, text_body, to_email, from_email, html_body=html_body)
 
     basket.clear()
 
-    messages.success(request, f"Invoice {invoice_no} sent to {request.user.email}.")
+    messages.success(request, f"Invoice {invoice_no} will be emailed to {request.user.email}.")
     return redirect("product_list")
 
 
@@ -325,11 +372,11 @@ def forgot_username(request: HttpRequest) -> HttpResponse:
             users = User.objects.filter(email=email)
             if users.exists():
                 username_list = ", ".join(u.username for u in users)
-                send_mail(
+                enqueue_email(
                     "Your Username",
                     f"Your username(s): {username_list}",
-                    settings.DEFAULT_FROM_EMAIL,
                     [email],
+                    settings.DEFAULT_FROM_EMAIL,
                 )
                 message = "Username sent to your email."
             else:
@@ -357,11 +404,9 @@ def send_password_reset(request):
                 from_email = settings.DEFAULT_FROM_EMAIL
                 to = [user.email]
 
-                email = EmailMultiAlternatives(subject, text_body, from_email, to)
                 # (Optional) Add HTML template:
                 # html_body = render_to_string("registration/reset_email.html", {"reset_url": reset_url, "user": user})
-                # email.attach_alternative(html_body, "text/html")
-                email.send()
+                enqueue_email(subject, text_body, to, from_email)
 
             messages.success(request, "If that account exists, a reset link has been sent.")
             return redirect("login")
@@ -414,11 +459,36 @@ def vendor_store_list(request: HttpRequest) -> HttpResponse:
     return render(request, "shop/vendor_store_list.html", {"stores": stores})
 
 
+def _queue_announcement(request, text: str, next_after_auth: str, image=None,
+                        store=None, product=None) -> None:
+    """
+    Queue an X announcement for `manage.py post_announcements` (the form
+    submit never waits on X) and nudge the vendor to connect X if no
+    token has been saved yet.
+    """
+    if not settings.TWITTER_ENABLED:
+        return
+    enqueue_announcement(text, image=image or None, store=store, product=product)
+    if has_saved_token():
+        messages.success(request, "Announcement queued for X.")
+    else:
+        connect_url = f"{reverse('twitter_start_auth')}?next={next_after_auth}"
+        messages.info(
+            request,
+            format_html(
+                'Twitter isn’t connected yet. '
+                '<a href="{}">Connect now</a> so queued announcements can post.',
+                connect_url,
+            ),
+        )
+
+
 @login_required
 @vendor_required
 def store_add(request):
     """
-    Create a new store for the current vendor and (optionally) tweet it via X.
+    Create a new store for the current vendor and (optionally) queue an
+    announcement for X.
     """
     if request.method == "POST":
         form = StoreForm(request.POST, request.FILES)
@@ -430,62 +500,16 @@ def store_add(request):
                 if hasattr(form, "save_m2m"):
                     form.save_m2m()
 
-            # Build tweet text (trim bio a bit)
-            bio = (store.bio or "")[:240]
-            tweet_text = f"New store open on Ecommerce!\n{store.name}\n\n{bio}"
-
-            # After-auth landing page
-            next_after_auth = request.build_absolute_uri(reverse("vendor_store_list"))
-
-            if settings.TWITTER_ENABLED:
-                try:
-                    api = TwitterAPI()  # loads token if present
-                    if not getattr(api, "token", None):
-                        connect_url = f"{reverse('twitter_start_auth')}?next={next_after_auth}"
-                        messages.info(
-                            request,
-                            format_html(
-                                f'Twitter isn’t connected yet. '
-                                f'<a href="{connect_url}">Connect now</a> to auto-post.'
-                            ),
-                        )
-                        return redirect("vendor_store_list")
-
-                    # Optional media: try store.logo then store.image if you have those fields
-                    media_ids = None
-                    store_image = getattr(store, "logo", None) or getattr(store, "image", None)
-                    if store_image:
-                        try:
-                            media_ids = [api.upload_media(store_image)]
-                        except Exception:
-                            log.exception("Twitter media upload failed for store_add")
-                            messages.warning(request, "Couldn’t attach image; posting text only.")
-
-                    try:
-                        api.post_tweet(tweet_text, media_ids=media_ids)
-                        messages.success(request, "Store announcement posted to X.")
-                    except Exception as exc:
-                        msg = str(exc)
-                        if ("unauthorized_client" in msg
-                                or "Missing valid authorization header" in msg):
-                            reconnect_url = f"{reverse('twitter_start_auth')}?next={next_after_auth}"
-                            messages.warning(
-                                request,
-                                format_html(
-                                    f"Twitter session expired. "
-                                    f'<a href="{reconnect_url}">Reconnect</a> to post future announcements.'
-                                ),
-                            )
-                        elif "403" in msg or "Forbidden" in msg:
-                            log.error("Twitter 403 on store_add: %s", msg)
-                            messages.warning(
-                                request,
-                                "Twitter refused the request. Ensure app has Write + media.write scopes and re-authorize."
-                            )
-                        else:
-                            log.exception("Twitter tweet failed on store_add: %s", msg)
-                except Exception:
-                    log.exception("Twitter integration error on store_add")
+                # Build tweet text (trim bio a bit)
+                bio = (store.bio or "")[:240]
+                tweet_text = f"New store open on Ecommerce!\n{store.name}\n\n{bio}"
+                # Optional media: store.logo or store.image if the model grows one
+                store_image = getattr(store, "logo", None) or getattr(store, "image", None)
+                _queue_announcement(
+                    request, tweet_text,
+                    next_after_auth=request.build_absolute_uri(reverse("vendor_store_list")),
+                    image=store_image, store=store,
+                )
 
             return redirect("vendor_store_list")
     else:
@@ -559,77 +583,19 @@ def product_add(request, store_pk: int):
                 if hasattr(form, "save_m2m"):
                     form.save_m2m()
 
-            # Build tweet text
-            desc = (product.description or "")[:240]
-            tweet_text = (
-                f"New product launched!\n"
-                f"{product.name} is available now from {product.store.name}\n\n"
-                f"{desc}"
-            )
-
-            # Where to send the user after connect/reconnect
-            next_after_auth = request.build_absolute_uri(
-                reverse("store_products", args=[store.pk])
-            )
-
-            if settings.TWITTER_ENABLED:
-                try:
-                    api = TwitterAPI()  # OAuth2 mode; will load token if present
-
-                    # If not connected yet, nudge vendor to connect (no crash)
-                    if not getattr(api, "token", None):
-                        connect_url = f"{reverse('twitter_start_auth')}?next={next_after_auth}"
-                        messages.info(
-                            request,
-                            format_html(
-                                f'Twitter isn’t connected yet. '
-                                f'<a href="{connect_url}">Connect now</a> to auto-post.'
-                            ),
-                        )
-                        return redirect("store_products", pk=store.pk)
-
-                    # Optional media upload
-                    media_ids = None
-                    if getattr(product, "image", None):
-                        try:
-                            media_ids = [api.upload_media(product.image)]
-                        except Exception as exc:
-                            log.exception("Twitter media upload failed")
-                            messages.warning(
-                                request,
-                                "Couldn’t attach image to the tweet; posting text only."
-                            )
-
-                    # Post the tweet
-                    try:
-                        api.post_tweet(tweet_text, media_ids=media_ids)
-                        messages.success(request, "Product tweeted to X successfully.")
-                    except Exception as exc:
-                        msg = str(exc)
-                        # Token expired or refresh needs client auth, etc.
-                        if ("unauthorized_client" in msg
-                                or "Missing valid authorization header" in msg):
-                            connect_url = f"{reverse('twitter_start_auth')}?next={next_after_auth}"
-                            messages.warning(
-                                request,
-                                format_html(
-                                    f"Twitter session expired. "
-                                    f'<a href="{connect_url}">Reconnect</a> to post future products.'
-                                ),
-                            )
-                        elif "403" in msg or "Forbidden" in msg:
-                            # Often: missing write/media.write scope or app perms
-                            log.error("Twitter 403 Forbidden: %s", msg)
-                            messages.warning(
-                                request,
-                                "Twitter refused the request. "
-                                "Ensure the app has Write + media.write scopes and re-authorize."
-                            )
-                        else:
-                            log.exception("Twitter tweet failed: %s", msg)
-
-                except Exception:
-                    log.exception("Twitter integration error")
+                # Build tweet text
+                desc = (product.description or "")[:240]
+                tweet_text = (
+                    f"New product launched!\n"
+                    f"{product.name} is available now from {product.store.name}\n\n"
+                    f"{desc}"
+                )
+                _queue_announcement(
+                    request, tweet_text,
+                    next_after_auth=request.build_absolute_uri(
+                        reverse("store_products", args=[store.pk])),
+                    image=product.image, product=product,
+                )
 
             return redirect("store_products", pk=store.pk)
     else:
@@ -661,11 +627,46 @@ def product_delete(request: HttpRequest, store_pk: int, pk: int) \
 
 # ---------- API ----------
 
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def page_cache_stats(request):
+    """
+    Hit/miss counters for the catalog page cache.
+    """
+    return Response(page_cache.stats())
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def db_connect_stats(request):
+    """
+    Database connects per request and connection pool usage for the
+    process that answers.
+    """
+    return Response(connect_stats())
+
+
 @api_view(['GET'])
 def view_stores(request):
+    """
+    List stores, paginated like the other list endpoints (?page=,
+    ?page_size=, ?pagination=cursor). ?stream=1 streams every store as one
+    JSON array with bounded memory; ?all=1 returns the legacy unpaginated
+    array built in memory.
+    """
     if request.method == "GET":
-        serializer = StoreSerializer(Store.objects.all(), many=True)
-        return JsonResponse(data=serializer.data, safe=False)
+        # Same shape as StoreSerializer, without building Store instances
+        ordering = STORE_ORDERING
+        qs = Store.objects.order_by(*ordering).values(*STORE_FIELDS)
+        flags = ("1", "true", "True")
+        if request.query_params.get("stream") in flags:
+            return stream_json_array(qs, ordering)
+        if request.query_params.get("all") in flags:
+            return JsonResponse(data=list(qs), safe=False)
+
+        paginator = _paginator(request, ordering=ordering)
+        page = paginator.paginate_queryset(qs, request)
+        return paginator.get_paginated_response(list(page))
     
 
 @api_view(['POST'])
@@ -691,12 +692,65 @@ def add_store(request):
 def add_product(request, store_id):
     store = get_object_or_404(Store, id=store_id, owner=request.user)
 
-    serializer = ProductSerializer(data=request.data)
+    serializer = ProductSerializer(data=request.data, context={"store": store})
     serializer.is_valid(raise_exception=True)
     product = serializer.save(store=store)
     return Response(ProductSerializer(product).data, status=status.HTTP_201_CREATED)
 
 
+@api_view(["POST"])
+@permission_classes([IsVendor])
+@parser_classes([MultiPartParser])
+def import_products(request, store_id):
+    """
+    Bulk upsert products into one of the vendor's stores, keyed on SKU.
+    Send a multipart `file` upload, or the raw CSV/JSON/NDJSON body; the
+    format comes from ?fmt=, the file name or the Content-Type. Returns
+    counts and a per-row error report.
+    """
+    store = get_object_or_404(Store, id=store_id, owner=request.user)
+
+    if request.content_type.startswith("multipart/"):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"detail": "Attach the import as `file`."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        lines, name, ctype = upload, upload.name, upload.content_type
+    else:
+        # Read the body as a stream; nothing is parsed up front
+        lines, name, ctype = request.stream or [], "", request.content_type
+    fmt = request.query_params.get("fmt") or importer.detect_format(name, ctype)
+    if fmt not in importer.FORMATS:
+        return Response({"detail": f"Pass ?fmt= as one of {', '.join(importer.FORMATS)}."},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        report = importer.import_products(store, importer.read_rows(lines, fmt))
+    except ValueError as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(report.as_dict())
+
+
+@api_view(["POST"])
+@permission_classes([IsVendor])
+def bulk_update_products(request):
+    """
+    Batch inventory sync: {"updates": [{"id", "stock" | "stock_delta",
+    "price"}, ...]} applied to the caller's own products in one
+    transaction. Reports invalid lines and ids not found or not owned.
+    """
+    updates = request.data.get("updates") if isinstance(request.data, dict) else None
+    if not isinstance(updates, list):
+        return Response({"detail": "Send {\"updates\": [...]}."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if len(updates) > inventory.BULK_UPDATE_MAX_ITEMS:
+        return Response(
+            {"detail": f"At most {inventory.BULK_UPDATE_MAX_ITEMS} updates per request."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return Response(inventory.apply_stock_price_updates(request.user, updates))
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def list_products(request, store_id):
@@ -705,7 +759,50 @@ def list_products(request, store_id):
     return Response(ProductSerializer(qs, many=True).data)
 
 
-def _paginator(request, default_size=20, max_size=100):
+@api_view(["GET"])
+@permission_classes([IsVendor])
+def export_catalog(request):
+    """
+    Stream the current vendor's products (all stores, or ?store=<id>) as
+    ?fmt=csv (default) or ?fmt=ndjson. ?reviews=1 appends their reviews,
+    ?gzip=1 compresses the stream.
+    """
+    p = request.query_params
+    fmt = p.get("fmt", "csv")
+    if fmt not in export.FORMATS:
+        return Response({"detail": f"fmt must be one of {', '.join(export.FORMATS)}."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    stores = Store.objects.filter(owner=request.user)
+    if p.get("store"):
+        try:
+            store_id = int(p["store"])
+        except ValueError:
+            store_id = 0
+        if not 0 < store_id < 2 ** 63:
+            return Response({"detail": "store must be a store id."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        stores = stores.filter(id=store_id)
+        if not stores.exists():
+            return Response({"detail": "Store not found."}, status=status.HTTP_404_NOT_FOUND)
+    store_ids = list(stores.values_list("id", flat=True))
+
+    flags = ("1", "true", "True")
+    gzip = p.get("gzip") in flags
+    records = export.export_records(store_ids, include_reviews=p.get("reviews") in flags)
+    response = StreamingHttpResponse(export.export_chunks(records, fmt, gzip),
+                                     content_type=export.content_type(fmt, gzip))
+    response["Content-Disposition"] = f'attachment; filename="{export.filename(fmt, gzip)}"'
+    return response
+
+
+def _paginator(request, default_size=20, max_size=100, ordering=None):
+    """
+    PageNumberPagination by default. With ?pagination=cursor and a unique
+    `ordering`, a KeysetPagination that skips COUNT(*) and stays as fast
+    on deep pages as on the first.
+    """
+    if ordering and request.query_params.get("pagination") == "cursor":
+        return KeysetPagination(ordering, default_size, max_size)
     p = PageNumberPagination()
     try:
         p.page_size = min(int(request.query_params.get("page_size", default_size)), max_size)
@@ -714,6 +811,32 @@ def _paginator(request, default_size=20, max_size=100):
     return p
 
 
+def _review_summary(owner, store_id=None, product_id=None, rating=None) -> dict:
+    """
+    Review count/average for the owner's products, read from the
+    denormalized Product aggregates instead of scanning Review.
+    """
+    products = Product.objects.filter(store__owner=owner)
+    if store_id:
+        products = products.filter(store_id=store_id)
+    if product_id:
+        products = products.filter(id=product_id)
+
+    try:
+        star = int(rating) if rating else None
+    except (TypeError, ValueError):
+        star = None
+    if star in range(1, 6):
+        count = products.aggregate(n=Sum(f"stars_{star}"))["n"] or 0
+        return {"count": count, "avg_rating": float(star) if count else None}
+    if star is not None:
+        return {"count": 0, "avg_rating": None}
+
+    totals = products.aggregate(n=Sum("rating_count"), s=Sum("rating_sum"))
+    count = totals["n"] or 0
+    return {"count": count, "avg_rating": totals["s"] / count if count else None}
+
+
 @api_view(["GET"])
 @permission_classes([IsVendor])  
 def my_product_reviews(request):
@@ -738,10 +861,11 @@ def my_product_reviews(request):
         except (TypeError, ValueError):
             pass
 
-    qs = qs.select_related("user", "product").order_by("-created_at")
-    summary = qs.aggregate(count=Count("id"), avg_rating=Avg("rating"))
+    ordering = REVIEW_ORDERING
+    qs = qs.select_related("user", "product").order_by(*ordering)
+    summary = _review_summary(request.user, store_id, product_id, rating)
 
-    paginator = _paginator(request)
+    paginator = _paginator(request, ordering=ordering)
     page = paginator.paginate_queryset(qs, request)
     data = ReviewSerializer(page, many=True).data
 
@@ -756,17 +880,16 @@ def vendor_stores(request):  # ← no vendor_id here
     """
     List stores and vendors.
     """
-    qs = Store.objects.select_related("owner__vendor").order_by("name")
+    ordering = STORE_ORDERING
+    qs = Store.objects.order_by(*ordering).values(*STORE_PUBLIC_FIELDS)
 
     vendor_id = request.query_params.get("vendor")  # optional filter
     if vendor_id:
         qs = qs.filter(owner__vendor__id=vendor_id)
 
-    paginator = _paginator(request)
+    paginator = _paginator(request, ordering=ordering)
     page = paginator.paginate_queryset(qs, request)
-    return paginator.get_paginated_response(
-        StorePublicSerializer(page, many=True).data
-    )
+    return paginator.get_paginated_response(store_public_data(page))
 
 
 @api_view(["GET"])
@@ -774,24 +897,29 @@ def vendor_stores(request):  # ← no vendor_id here
 def stores_products_api(request):
     """
     List all products for a given store.
+    Optional filters: ?store=&vendor=&q=&min_price=&max_price=&in_stock=
+    ?pagination=cursor switches to COUNT-free keyset pages (not with ?q=).
     """
-    qs = Product.objects.select_related("store", "store__owner__vendor").order_by("name")
+    ordering = API_PRODUCT_ORDERING
+    qs = Product.objects.order_by(*ordering).values(*PRODUCT_PUBLIC_FIELDS)
 
     p = request.query_params
     if p.get("store"):
         qs = qs.filter(store_id=p["store"])
     if p.get("vendor"):
         qs = qs.filter(store__owner__vendor__id=p["vendor"])
-    if p.get("q"):
-        qs = qs.filter(name__icontains=p["q"])
     if p.get("min_price"):
         qs = qs.filter(price__gte=p["min_price"])
     if p.get("max_price"):
         qs = qs.filter(price__lte=p["max_price"])
     if p.get("in_stock") in ("1", "true", "True"):
         qs = qs.filter(stock__gt=0)
+    if p.get("q"):
+        # Full-text over name + description, most relevant first; relevance
+        # order has no stable key to seek on, so search pages by number
+        qs = search_products(qs, p["q"])
+        ordering = None
 
-    paginator = _paginator(request)
+    paginator = _paginator(request, ordering=ordering)
     page = paginator.paginate_queryset(qs, request)
-    data = ProductPublicSerializer(page, many=True, context={"request": request}).data
-    return paginator.get_paginated_response(data)
\ No newline at end of file
+    return paginator.get_paginated_response(product_public_data(page, request))
\ No newline at end of file